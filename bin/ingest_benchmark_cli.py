@@ -0,0 +1,97 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import json
+import logging
+from argparse import ArgumentParser
+
+from src.aws.osml.tile_server_test.load.image_discovery import discover_test_images
+from src.aws.osml.tile_server_test.load.ingest_benchmark import IngestBenchmark
+
+if __name__ == "__main__":
+    """
+    Entry point for the viewpoint ingest benchmark.
+
+    Viewpoints are created at rising levels of concurrency across the test images, or at rising rates when
+    ``--creation_rates`` is given, and each is polled at a fine interval until it is READY or FAILED. For every level
+    the time to READY percentiles, overall and by image size class, the READY/FAILED counts, the READY viewpoints per
+    second, the most viewpoints in flight, and the growth of the server's backlog of REQUESTED viewpoints are reported.
+    Only the creation rates are open-loop, so only they can show a backlog that grows because the server cannot keep
+    up; at a concurrency level the benchmark waits for a viewpoint to finish before creating the next.
+
+    The script accepts the following command-line arguments:
+
+    - ``--endpoint``: Base URL of the tile server.
+    - ``--bucket``: Bucket containing the test images.
+    - ``--image_keys``: JSON list of test image keys. When omitted the images are discovered under ``--prefix``.
+    - ``--prefix``: Prefix to discover test images under, which also provides their sizes (default: "").
+    - ``--concurrency``: Comma separated viewpoints created at once in each step (default: 1,2,4,8,16).
+    - ``--creation_rates``: Comma separated viewpoints created per second in each step. When given the benchmark is
+      open-loop and ``--concurrency`` is ignored.
+    - ``--max_workers``: Create requests, and status polls, sent at once by an open-loop step (default: 32).
+    - ``--step_duration``: Seconds each step keeps creating viewpoints for (default: 120).
+    - ``--poll_interval``: Seconds between status polls, the resolution of the time to READY (default: 0.25).
+    - ``--ready_timeout``: Seconds to wait for a viewpoint before recording a timeout (default: 900).
+    - ``--tile_size``: Tile size of the viewpoints (default: 512).
+    - ``--range_adjustment``: Range adjustment of the viewpoints (default: NONE).
+    - ``--output``: Optional file to write the full results to as JSON.
+
+    Example usage:
+
+    .. code-block:: console
+
+        python -m bin.ingest_benchmark_cli --endpoint http://localhost:8080/latest --bucket <S3 bucket> \\
+            --prefix images/ --concurrency 1,4,16,32 --step_duration 300
+        python -m bin.ingest_benchmark_cli --endpoint http://localhost:8080/latest --bucket <S3 bucket> \\
+            --prefix images/ --creation_rates 0.1,0.5,1,2 --step_duration 300
+    """
+    parser = ArgumentParser("ts_ingest_benchmark")
+    parser.add_argument("--endpoint", help="Base URL of the tile server.", type=str, required=True)
+    parser.add_argument("--bucket", help="Bucket containing the test images.", type=str, required=True)
+    parser.add_argument("--image_keys", help="JSON list of test image keys.", type=str)
+    parser.add_argument("--prefix", help="Prefix to discover test images under.", type=str, default="")
+    parser.add_argument("--concurrency", help="Comma separated concurrency levels.", type=str, default="1,2,4,8,16")
+    parser.add_argument("--creation_rates", help="Comma separated creation rates per second, open-loop.", type=str)
+    parser.add_argument("--max_workers", help="Requests sent at once by an open-loop step.", type=int, default=32)
+    parser.add_argument("--step_duration", help="Seconds each step creates viewpoints for.", type=float, default=120.0)
+    parser.add_argument("--poll_interval", help="Seconds between status polls.", type=float, default=0.25)
+    parser.add_argument("--ready_timeout", help="Seconds to wait for a viewpoint.", type=float, default=900.0)
+    parser.add_argument("--tile_size", help="Tile size of the viewpoints.", type=int, default=512)
+    parser.add_argument("--range_adjustment", help="Range adjustment of the viewpoints.", type=str, default="NONE")
+    parser.add_argument("--output", help="File to write the benchmark results to.", type=str)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.image_keys:
+        image_keys, image_sizes = json.loads(args.image_keys), {}
+    else:
+        images = discover_test_images(args.bucket, prefix=args.prefix)
+        image_keys, image_sizes = [image.key for image in images], {image.key: image.size for image in images}
+    benchmark = IngestBenchmark(
+        args.endpoint,
+        args.bucket,
+        image_keys,
+        image_sizes=image_sizes,
+        tile_size=args.tile_size,
+        range_adjustment=args.range_adjustment,
+        poll_interval=args.poll_interval,
+        ready_timeout=args.ready_timeout,
+        max_workers=args.max_workers,
+    )
+    if args.creation_rates:
+        results = benchmark.run_open_loop([float(rate) for rate in args.creation_rates.split(",")], args.step_duration)
+        level_name = "creation_rate"
+    else:
+        results = benchmark.run([int(level) for level in args.concurrency.split(",")], args.step_duration)
+        level_name = "concurrency"
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    for step in results["steps"]:
+        time_to_ready = step["time_to_ready_seconds"]
+        print(
+            f"{level_name}={step[level_name]}: {step['outcomes']['READY']}/{step['viewpoints']} READY "
+            f"{step['outcomes']['FAILED']} FAILED {step['outcomes']['TIMEOUT']} timed out, "
+            f"time to READY p50={time_to_ready['p50']:.2f}s p99={time_to_ready['p99']:.2f}s, "
+            f"{step['ready_per_second']:.2f} READY/s, max in flight={step['max_in_flight']}, "
+            f"backlog growth={step['backlog_growth_per_minute']:+.1f}/min"
+        )
@@ -4,6 +4,27 @@ from argparse import ArgumentParser
 
 from src.aws.osml.tile_sever_test.integ_processor import TSIntegTestProcessor
 
+
+def list_of_strings(arg) -> list:
+    """
+    Convert a comma-separated string into a list of strings.
+
+    :param arg: A comma-separated string.
+    :return: A list of strings.
+    """
+    return arg.split(",")
+
+
+def list_of_ints(arg) -> list:
+    """
+    Convert a comma-separated string into a list of integers.
+
+    :param arg: A comma-separated string.
+    :return: A list of integers.
+    """
+    return [int(value) for value in arg.split(",")]
+
+
 if __name__ == "__main__":
     """
     Entry point for the tile server integration test processor.
@@ -14,6 +35,13 @@ if __name__ == "__main__":
     The script accepts the following command-line arguments:
 
     - ``--image_uri``: The URI of the container image to test with.
+    - ``--image_uris``: Comma separated S3 URIs of the images to test with, instead of ``--image_uri``.
+    - ``--tile_sizes``: Comma separated tile sizes to create viewpoints with.
+    - ``--range_adjustments``: Comma separated range adjustments to create viewpoints with.
+    - ``--image_formats``: Comma separated output formats to request tiles, crops, and map tiles in.
+    - ``--max_concurrency``: The number of viewpoints tested at once.
+
+    One viewpoint is tested for every combination of image, tile size, range adjustment, and format.
 
     Example usage:
 
@@ -21,8 +49,33 @@ if __name__ == "__main__":
 
         python ts_integ_test.py --image_uri <image_uri>
 
-    The ``image_uri`` is passed to the `TSIntegTestProcessor` for further processing.
+        python ts_integ_test.py --image_uris <image_uri>,<image_uri> --tile_sizes 256,512
+            --range_adjustments NONE,DRA --image_formats PNG,JPEG --max_concurrency 8
+
+    The arguments are passed to the `TSIntegTestProcessor` for further processing.
     """
     parser = ArgumentParser("ts_integ_test")
-    parser.add_argument("--image_uri", help="The image to test with.", type=str)
+    parser.add_argument("--image_uri", help="The image to test with.", type=str, default="")
+    parser.add_argument(
+        "--image_uris", help="Comma separated list of images to test with.", type=list_of_strings, default=[]
+    )
+    parser.add_argument(
+        "--tile_sizes",
+        help="Comma separated list of tile sizes to create viewpoints with.",
+        type=list_of_ints,
+        default=[512],
+    )
+    parser.add_argument(
+        "--range_adjustments",
+        help="Comma separated list of range adjustments to create viewpoints with.",
+        type=list_of_strings,
+        default=["NONE"],
+    )
+    parser.add_argument(
+        "--image_formats",
+        help="Comma separated list of output formats to request tiles, crops, and map tiles in.",
+        type=list_of_strings,
+        default=["PNG"],
+    )
+    parser.add_argument("--max_concurrency", help="Number of viewpoints tested at once.", type=int, default=4)
     TSIntegTestProcessor(vars(parser.parse_args()))
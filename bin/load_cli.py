@@ -32,6 +32,8 @@ if __name__ == "__main__":
     - ``--locust_run_time``: Duration to run the load test, e.g., 300s, 20m, 3h, etc. (default: "5m").
     - ``--locust_spawn_rate``: Rate to spawn users at (users per second) (default: "1").
     - ``--locust_image_keys``: Comma-separated list of image keys to use for the load test.
+    - ``--locust_workers``: Number of Locust worker processes, 0 for a single process or -1 for one per core (default: 0).
+    - ``--locust_capacity_search``: Search for the highest sustainable GetTile arrival rate (default: False).
 
     Example usage:
 
@@ -67,4 +69,16 @@ if __name__ == "__main__":
         type=list_of_strings,
         default=[],
     )
+    parser.add_argument(
+        "--locust_workers",
+        help="Load Test: Number of Locust worker processes, 0 for a single process or -1 for one per CPU core.",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--locust_capacity_search",
+        help="Load Test: Search for the highest GetTile arrival rate sustained within the p99 latency objective.",
+        type=lambda x: bool(strtobool(str(x))),
+        default=False,
+    )
     TSLoadTestProcessor(vars(parser.parse_args()))
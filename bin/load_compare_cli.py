@@ -0,0 +1,73 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import sys
+from argparse import ArgumentParser
+
+from src.aws.osml.tile_server_test.load.regression import (
+    RegressionTolerances,
+    compare_result_sets,
+    format_comparisons,
+    load_result_set,
+)
+
+if __name__ == "__main__":
+    """
+    Entry point for comparing the load test results of a candidate tile server build against a baseline.
+
+    Each endpoint's latency distributions are compared with a Mann-Whitney U test, and the latency effect size,
+    p99, throughput, and failure ratio changes are checked against the configured tolerances.
+
+    The script accepts the following command-line arguments:
+
+    - ``--baseline``: One or more results files from runs of the baseline build.
+    - ``--candidate``: One or more results files from runs of the candidate build.
+    - ``--alpha``: Significance level a latency shift must reach to count as a regression (default: 0.01).
+    - ``--max_effect_size``: Largest tolerated Cliff's delta of the latencies (default: 0.147).
+    - ``--max_p99_increase``: Largest tolerated relative p99 latency increase (default: 0.10).
+    - ``--max_throughput_decrease``: Largest tolerated relative throughput decrease (default: 0.10).
+    - ``--max_failure_ratio_increase``: Largest tolerated absolute failure ratio increase (default: 0.01).
+    - ``--min_requests``: Endpoints with fewer successful requests on either side have their latency left
+      uncompared; their throughput and failures are still compared (default: 100).
+
+    Results files are written by ``--load_results_file`` or are the responses returned by `TSLoadTestProcessor`.
+
+    Example usage:
+
+    .. code-block:: console
+
+        python -m bin.load_compare_cli --baseline baseline.json --candidate candidate-1.json candidate-2.json
+
+    The script exits with status 1 when any endpoint regressed, so it can gate image promotions.
+    """
+    parser = ArgumentParser("ts_load_compare")
+    parser.add_argument("--baseline", help="Results files from runs of the baseline build.", nargs="+", required=True)
+    parser.add_argument("--candidate", help="Results files from runs of the candidate build.", nargs="+", required=True)
+    parser.add_argument("--alpha", help="Significance level of the latency test.", type=float, default=0.01)
+    parser.add_argument("--max_effect_size", help="Largest tolerated Cliff's delta.", type=float, default=0.147)
+    parser.add_argument("--max_p99_increase", help="Largest tolerated relative p99 increase.", type=float, default=0.10)
+    parser.add_argument(
+        "--max_throughput_decrease", help="Largest tolerated relative throughput decrease.", type=float, default=0.10
+    )
+    parser.add_argument(
+        "--max_failure_ratio_increase", help="Largest tolerated failure ratio increase.", type=float, default=0.01
+    )
+    parser.add_argument(
+        "--min_requests", help="Minimum successful requests needed to compare an endpoint's latency.", type=int, default=100
+    )
+    args = parser.parse_args()
+
+    tolerances = RegressionTolerances(
+        alpha=args.alpha,
+        max_effect_size=args.max_effect_size,
+        max_p99_increase=args.max_p99_increase,
+        max_throughput_decrease=args.max_throughput_decrease,
+        max_failure_ratio_increase=args.max_failure_ratio_increase,
+        min_requests=args.min_requests,
+    )
+    comparisons = compare_result_sets(
+        [load_result_set(path) for path in args.baseline],
+        [load_result_set(path) for path in args.candidate],
+        tolerances,
+    )
+    print(format_comparisons(comparisons, tolerances))
+    sys.exit(1 if any(comparison.regressed for comparison in comparisons) else 0)
@@ -0,0 +1,70 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import json
+import logging
+from argparse import ArgumentParser
+
+from src.aws.osml.tile_server_test.load.self_benchmark import run_self_benchmark
+
+if __name__ == "__main__":
+    """
+    Entry point for benchmarking the load generator itself.
+
+    The `TileServerUser` task mix is run against local stub tile servers that respond immediately, so the request
+    rate is limited by the Locust processes rather than a tile server. The result is the highest request rate each
+    load generator core can produce, which bounds the rates a real load test of that size can trust.
+
+    The script accepts the following command-line arguments:
+
+    - ``--users_per_generator``: Simulated users run by each Locust process (default: 500).
+    - ``--spawn_rate``: Users started per second (default: 100).
+    - ``--run_time``: Duration of the benchmark, e.g. 60s (default: 60s).
+    - ``--locust_workers``: Number of Locust worker processes, 0 for a single process or -1 for one per core (default: 0).
+    - ``--stub_processes``: Stub server processes, 0 for one per core not used by a load generator (default: 0).
+    - ``--output``: Optional file to write the full benchmark results to as JSON.
+
+    Example usage:
+
+    .. code-block:: console
+
+        python -m bin.load_self_benchmark_cli --locust_workers 2 --run_time 2m
+
+    When the load generators were not saturated the stub servers limited the request rate, which is then only a
+    lower bound; rerun with more ``--stub_processes``.
+    """
+    parser = ArgumentParser("ts_load_self_benchmark")
+    parser.add_argument("--users_per_generator", help="Simulated users run by each Locust process.", type=int, default=500)
+    parser.add_argument("--spawn_rate", help="Users started per second.", type=float, default=100.0)
+    parser.add_argument("--run_time", help="Duration of the benchmark, e.g. 60s.", type=str, default="60s")
+    parser.add_argument(
+        "--locust_workers",
+        help="Number of Locust worker processes, 0 for a single process or -1 for one per CPU core.",
+        type=int,
+        default=0,
+    )
+    parser.add_argument("--stub_processes", help="Stub server processes, 0 to use the idle cores.", type=int, default=0)
+    parser.add_argument("--output", help="File to write the benchmark results to.", type=str)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    benchmark = run_self_benchmark(
+        users_per_generator=args.users_per_generator,
+        spawn_rate=args.spawn_rate,
+        run_time=args.run_time,
+        locust_workers=args.locust_workers,
+        stub_processes=args.stub_processes,
+    )
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(benchmark, output, indent=2)
+    print(
+        f"{benchmark['requests_per_second']:.0f} req/s from {benchmark['load_generators']} load generators, "
+        f"{benchmark['requests_per_second_per_generator']:.0f} req/s per generator core"
+    )
+    for generator_id, generator in benchmark["generators"].items():
+        print(
+            f"  {generator_id}: saturated {generator['saturated_fraction']:.0%} of the time, "
+            f"mean cpu={generator['mean_cpu_percent']:.0f}% max event loop lag={generator['max_event_loop_lag_ms']:.0f}ms"
+        )
+    if benchmark["limited_by"] != "load_generator":
+        print("The load generators were not saturated, the stub servers limited the rate; add --stub_processes")
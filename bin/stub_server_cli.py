@@ -0,0 +1,75 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import logging
+from argparse import ArgumentParser
+
+from src.aws.osml.tile_server_test.stub import LatencyProfile, StubServerConfig, StubTileServer
+
+if __name__ == "__main__":
+    """
+    Entry point for the local stub tile server.
+
+    The stub serves the viewpoint API from memory so the integration and load tests can be run, debugged, and
+    benchmarked without a deployed tile server or S3.
+
+    The script accepts the following command-line arguments:
+
+    - ``--host``: Address to listen on (default: 127.0.0.1).
+    - ``--port``: Port to listen on (default: 8080).
+    - ``--config``: JSON file of `StubServerConfig` settings, the other options override it.
+    - ``--readiness_delay``: Seconds a new viewpoint stays REQUESTED before it becomes READY.
+    - ``--latency_ms``: Median response delay of every operation in milliseconds.
+    - ``--latency_distribution``: Distribution of the response delays, fixed, uniform, exponential, or lognormal.
+    - ``--latency_spread``: Uniform half width in milliseconds or lognormal sigma of the response delays.
+    - ``--error_rate``: Fraction of requests to every operation that fail.
+    - ``--payload_bytes``: Size of every image payload in bytes, 0 for just a valid header.
+    - ``--seed``: Seed of the random number generator.
+
+    Example usage:
+
+    .. code-block:: console
+
+        python -m bin.stub_server_cli --port 8080 --latency_ms 20 --latency_distribution lognormal \\
+            --latency_spread 0.5 --error_rate 0.001
+
+    Point TS_ENDPOINT or the Locust --host at the printed URL.
+    """
+    parser = ArgumentParser("ts_stub_server")
+    parser.add_argument("--host", help="Address to listen on.", type=str, default="127.0.0.1")
+    parser.add_argument("--port", help="Port to listen on.", type=int, default=8080)
+    parser.add_argument("--config", help="JSON file of stub server settings.", type=str)
+    parser.add_argument("--readiness_delay", help="Seconds before a new viewpoint is READY.", type=float)
+    parser.add_argument("--latency_ms", help="Median response delay in milliseconds.", type=float)
+    parser.add_argument(
+        "--latency_distribution",
+        help="Distribution of the response delays.",
+        choices=["fixed", "uniform", "exponential", "lognormal"],
+        default="fixed",
+    )
+    parser.add_argument("--latency_spread", help="Uniform half width or lognormal sigma.", type=float, default=0.0)
+    parser.add_argument("--error_rate", help="Fraction of requests that fail.", type=float)
+    parser.add_argument("--payload_bytes", help="Size of every image payload in bytes.", type=int)
+    parser.add_argument("--seed", help="Seed of the random number generator.", type=int)
+    args = parser.parse_args()
+
+    config = StubServerConfig.from_file(args.config) if args.config else StubServerConfig()
+    if args.readiness_delay is not None:
+        config.readiness_delay = LatencyProfile(median_ms=args.readiness_delay * 1000)
+    if args.latency_ms is not None:
+        config.latency["default"] = LatencyProfile(args.latency_distribution, args.latency_ms, args.latency_spread)
+    if args.error_rate is not None:
+        config.error_rates["default"] = args.error_rate
+    if args.payload_bytes is not None:
+        config.payload_bytes["default"] = args.payload_bytes
+    if args.seed is not None:
+        config.seed = args.seed
+
+    logging.basicConfig(level=logging.INFO)
+    server = StubTileServer(config, host=args.host, port=args.port)
+    logging.info(f"Stub tile server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
@@ -2,4 +2,5 @@
 
 # flake8: noqa
 from .test_config import TileServerIntegTestConfig
-from .test_tile_server import TestTileServer
+from .test_matrix import IntegTestCell, format_integ_test_matrix_summary, integ_test_matrix, run_integ_test_matrix
+from .test_tile_server import TestResult, TestTileServer
@@ -0,0 +1,21 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+# Content types the tile server returns for each image output format
+IMAGE_CONTENT_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "GIF": "image/gif",
+    "GTIFF": "image/tiff",
+    "NITF": "image/nitf",
+}
+
+
+def image_content_type(image_format: str) -> str:
+    """
+    :param image_format: The requested image format, e.g. PNG.
+    :return: The content type the tile server responds with for the format.
+    """
+    try:
+        return IMAGE_CONTENT_TYPES[image_format.upper()]
+    except KeyError:
+        raise ValueError(f"Unsupported image format {image_format}, expected one of {', '.join(IMAGE_CONTENT_TYPES)}")
@@ -2,6 +2,8 @@
 
 from requests import Session
 
+from .image_formats import image_content_type
+
 
 def get_map_tilesets(session: Session, url: str, viewpoint_id: str) -> None:
     """
@@ -38,18 +40,19 @@ def get_map_tileset_metadata(session: Session, url: str, viewpoint_id: str, tile
     assert res.headers.get("content-type") == "application/json"
 
 
-def get_map_tile(session: Session, url: str, viewpoint_id: str) -> None:
+def get_map_tile(session: Session, url: str, viewpoint_id: str, image_format: str = "PNG") -> None:
     """
     Test Case: Successfully get a map tile of the viewpoint
 
     :param session: Requests session to use to send the request.
     :param url: URL to send the request to.
     :param viewpoint_id: Unique viewpoint id to get from the table.
+    :param image_format: Output format of the map tile.
 
     return: None
     """
-    res = session.get(f"{url}/{viewpoint_id}/map/tiles/WebMercatorQuad/0/0/0.PNG")
+    res = session.get(f"{url}/{viewpoint_id}/map/tiles/WebMercatorQuad/0/0/0.{image_format}")
     res.raise_for_status()
 
     assert res.status_code == 200
-    assert res.headers.get("content-type") == "image/png"
+    assert res.headers.get("content-type") == image_content_type(image_format)
@@ -2,22 +2,25 @@
 
 from requests import Session
 
+from .image_formats import image_content_type
 
-def get_tile(session: Session, url: str, viewpoint_id: str) -> None:
+
+def get_tile(session: Session, url: str, viewpoint_id: str, image_format: str = "PNG") -> None:
     """
     Test Case: Successfully get the tile of the viewpoint
 
     :param session: Requests session to use to send the request.
     :param url: URL to send the request to.
     :param viewpoint_id: Unique viewpoint id to get from the table.
+    :param image_format: Output format of the tile.
 
     return: None
     """
-    res = session.get(f"{url}/{viewpoint_id}/image/tiles/10/10/10.PNG")
+    res = session.get(f"{url}/{viewpoint_id}/image/tiles/10/10/10.{image_format}")
     res.raise_for_status()
 
     assert res.status_code == 200
-    assert res.headers.get("content-type") == "image/png"
+    assert res.headers.get("content-type") == image_content_type(image_format)
 
 
 def get_tile_invalid(session: Session, url: str, viewpoint_id: str) -> None:
@@ -0,0 +1,199 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from statistics import median
+from typing import Any, Dict, List, Optional
+
+from requests import Response
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Timings a latency budget can be set for, in milliseconds
+LATENCY_METRICS = ("connect", "ttfb", "total")
+
+
+@dataclass
+class RequestTiming:
+    """
+    The timing of one request, or of every request made by one run of a check.
+
+    Attributes:
+        connect: Milliseconds spent opening the connection, including the TLS handshake, 0 for a pooled connection.
+        ttfb: Milliseconds from sending the request until the response headers were received, excluding the connect.
+        total: Milliseconds from sending the request until the whole response body was received, excluding the connect.
+        payload_bytes: Size of the response body in bytes.
+    """
+
+    connect: float
+    ttfb: float
+    total: float
+    payload_bytes: int
+
+
+class _TimedConnectionMixin:
+    """
+    Records how long the last connect of a urllib3 connection took, until it is claimed by the :class:`RequestTimer`.
+    """
+
+    connect_seconds = 0.0
+
+    def connect(self) -> None:
+        start = time.perf_counter()
+        super().connect()
+        self.connect_seconds = time.perf_counter() - start
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimingAdapter(HTTPAdapter):
+    """
+    :class:`TimingAdapter` is an :class:`HTTPAdapter` whose connections record how long they took to open, so that
+    :class:`RequestTimer` can separate the connect time of a request from the time the server took to respond.
+    """
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
+
+
+class RequestTimer:
+    """
+    :class:`RequestTimer` is a requests response hook that records the timing of every request made by the current
+    thread between :meth:`start` and :meth:`stop`, so checks running concurrently on one session are timed
+    separately. Requests made outside of a check are not recorded. The hook reads the response body itself to time
+    it, so it must not be used for streamed requests.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def start(self) -> None:
+        """
+        Start recording the requests of the current thread.
+        """
+        self._local.timings = []
+
+    def stop(self) -> List[RequestTiming]:
+        """
+        Stop recording the requests of the current thread.
+
+        :return: The timing of every request made since :meth:`start`.
+        """
+        timings = getattr(self._local, "timings", None) or []
+        self._local.timings = None
+        return timings
+
+    def on_response(self, response: Response, *args, **kwargs) -> None:
+        """
+        Requests response hook, called once the response headers have been received.
+
+        :param response: The response, whose elapsed time covers the connect and the time to the first byte.
+        :param args: Additional positional arguments (unused).
+        :param kwargs: Additional keyword arguments (unused).
+        """
+        timings = getattr(self._local, "timings", None)
+        if timings is None:
+            return
+        # The connection is released back to the pool once the body has been read
+        connection = getattr(response.raw, "connection", None)
+        connect_seconds = getattr(connection, "connect_seconds", 0.0)
+        if connection is not None:
+            connection.connect_seconds = 0.0
+        # The elapsed time starts before the connection is opened, so the connect is taken out of the TTFB
+        ttfb_seconds = max(response.elapsed.total_seconds() - connect_seconds, 0.0)
+        start = time.perf_counter()
+        payload = response.content
+        body_seconds = time.perf_counter() - start
+        timings.append(
+            RequestTiming(connect_seconds * 1000, ttfb_seconds * 1000, (ttfb_seconds + body_seconds) * 1000, len(payload))
+        )
+
+
+def median_request_timing(attempts: List[List[RequestTiming]]) -> Optional[Dict[str, Any]]:
+    """
+    Combine the timings of the repeated runs of a check. The requests of one run are summed, and the median of every
+    timing is taken across runs so that a single slow run does not decide the result.
+
+    :param attempts: The timing of every request made by each run of the check.
+    :return: The median connect, TTFB, and total milliseconds and payload bytes, with the number of runs, or None if
+        the check made no requests.
+    """
+    runs = [
+        RequestTiming(
+            sum(timing.connect for timing in attempt),
+            sum(timing.ttfb for timing in attempt),
+            sum(timing.total for timing in attempt),
+            sum(timing.payload_bytes for timing in attempt),
+        )
+        for attempt in attempts
+        if attempt
+    ]
+    if not runs:
+        return None
+    return {
+        "connect": median(run.connect for run in runs),
+        "ttfb": median(run.ttfb for run in runs),
+        "total": median(run.total for run in runs),
+        "payload_bytes": int(median(run.payload_bytes for run in runs)),
+        "repeats": len(runs),
+    }
+
+
+def load_latency_budgets(path: str) -> Dict[str, Dict[str, float]]:
+    """
+    Read the latency budgets of the integration checks from a JSON file. Each key is the name of a check, e.g.
+    "Get Statistics", or "default" for every check without a budget of its own. Each value is either the budget of
+    the total time in milliseconds or an object with a budget in milliseconds for any of :data:`LATENCY_METRICS`, e.g.
+    {"default": 5000, "Get Tile": {"ttfb": 300, "total": 500}}.
+
+    :param path: The budgets file.
+    :return: The budgets of every check, keyed by metric.
+    """
+    with open(path, "r") as budgets_file:
+        budgets = json.load(budgets_file)
+    normalized = {}
+    for check, budget in budgets.items():
+        if not isinstance(budget, dict):
+            budget = {"total": budget}
+        unknown = set(budget) - set(LATENCY_METRICS)
+        if unknown:
+            raise ValueError(f"Unknown latency metrics {sorted(unknown)} in the budget of {check} in {path}")
+        normalized[check] = {metric: float(limit) for metric, limit in budget.items()}
+    return normalized
+
+
+def budget_breaches(
+    budgets: Dict[str, Dict[str, float]], check: str, latency: Optional[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    :param budgets: The budgets returned by :func:`load_latency_budgets`.
+    :param check: The name of the check.
+    :param latency: The median timing of the check, see :func:`median_request_timing`.
+    :return: Every metric whose median exceeded the check's budget, with the budget and the median in milliseconds.
+    """
+    if not latency:
+        return []
+    budget = budgets.get(check, budgets.get("default", {}))
+    return [
+        {"metric": metric, "budget": limit, "value": latency[metric]}
+        for metric, limit in budget.items()
+        if latency[metric] > limit
+    ]
@@ -5,18 +5,49 @@ from typing import Any, Dict
 
 
 class TileServerIntegTestConfig:
-    def __init__(self, s3_bucket: str, s3_key: str):
+    def __init__(
+        self,
+        s3_bucket: str,
+        s3_key: str,
+        tile_size: int = 512,
+        range_adjustment: str = "NONE",
+        image_format: str = "PNG",
+        viewpoint_id_suffix: str = "",
+    ):
+        """
+        Initialize the configuration of one integration test run.
+
+        :param s3_bucket: The bucket containing the test image.
+        :param s3_key: The key of the test image.
+        :param tile_size: The tile size the test viewpoint is created with.
+        :param range_adjustment: The range adjustment the test viewpoint is created with.
+        :param image_format: The output format tiles, crops, and map tiles are requested in.
+        :param viewpoint_id_suffix: Appended to the test viewpoint ID so that runs started at the same time do not
+            create the same viewpoint.
+        """
         # Tile Server
         self.endpoint = os.getenv("TS_ENDPOINT")
 
+        # Number of read-only checks run at once once the viewpoint is READY
+        self.max_workers = int(os.getenv("TS_INTEG_MAX_WORKERS", "8"))
+
+        # Latency
+        self.latency_budgets_file = os.getenv("TS_INTEG_LATENCY_BUDGETS")
+        self.check_repeats = int(os.getenv("TS_INTEG_CHECK_REPEATS", "3"))
+        self.strict_latency = os.getenv("TS_INTEG_STRICT_LATENCY", "false").lower() in ("1", "true", "yes")
+
         # S3
         self.test_bucket = s3_bucket
         self.test_object_key = s3_key
 
         self.test_viewpoint_id: str = (
             datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z").replace("-", "").replace(":", "")
+            + viewpoint_id_suffix
         )
         self.test_viewpoint_name: str = "integ-test-viewpoint"
+        self.tile_size = tile_size
+        self.range_adjustment = range_adjustment
+        self.image_format = image_format
 
         # Test Data
         self.test_viewpoint: Dict[str, Any] = {
@@ -24,8 +55,8 @@ class TileServerIntegTestConfig:
             "object_key": self.test_object_key,
             "viewpoint_id": self.test_viewpoint_id,
             "viewpoint_name": self.test_viewpoint_name,
-            "tile_size": 512,
-            "range_adjustment": "NONE",
+            "tile_size": self.tile_size,
+            "range_adjustment": self.range_adjustment,
         }
 
         self.invalid_viewpoint: Dict[str, Any] = {
@@ -33,18 +64,18 @@ class TileServerIntegTestConfig:
             "object_key": self.test_object_key,
             "viewpoint_id": self.test_viewpoint_id,
             "viewpoint_name": self.test_viewpoint_name,
-            "tile_size": 512,
-            "range_adjustment": "NONE",
+            "tile_size": self.tile_size,
+            "range_adjustment": self.range_adjustment,
         }
 
         self.valid_update_test_body: Dict[str, Any] = {
             "viewpoint_id": "",
             "viewpoint_name": "new-integ-test-viewpoint-name",
-            "tile_size": 512,
-            "range_adjustment": "NONE",
+            "tile_size": self.tile_size,
+            "range_adjustment": self.range_adjustment,
         }
 
         self.invalid_update_test_body: Dict[str, Any] = {
-            "tile_size": 512,
-            "range_adjustment": "NONE",
+            "tile_size": self.tile_size,
+            "range_adjustment": self.range_adjustment,
         }
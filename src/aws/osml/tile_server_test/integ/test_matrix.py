@@ -0,0 +1,157 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import itertools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Sequence
+
+from ..utils import S3Url
+from .endpoints import image_content_type
+from .test_config import TileServerIntegTestConfig
+from .test_tile_server import TestResult, TestTileServer
+
+
+@dataclass
+class IntegTestCell:
+    """
+    One cell of the integration test matrix, tested on a viewpoint of its own.
+
+    Attributes:
+        image_uri: The S3 URI of the test image.
+        tile_size: The tile size the viewpoint is created with.
+        range_adjustment: The range adjustment the viewpoint is created with.
+        image_format: The output format tiles, crops, and map tiles are requested in.
+    """
+
+    image_uri: str
+    tile_size: int
+    range_adjustment: str
+    image_format: str
+
+    @property
+    def name(self) -> str:
+        """
+        :return: A label identifying the cell in logs and summaries.
+        """
+        return f"{self.image_uri} {self.tile_size} {self.range_adjustment} {self.image_format}"
+
+
+def integ_test_matrix(
+    image_uris: Sequence[str],
+    tile_sizes: Sequence[int] = (512,),
+    range_adjustments: Sequence[str] = ("NONE",),
+    image_formats: Sequence[str] = ("PNG",),
+) -> List[IntegTestCell]:
+    """
+    Build every combination of test image and configuration.
+
+    :param image_uris: The S3 URIs of the test images.
+    :param tile_sizes: The tile sizes to create viewpoints with.
+    :param range_adjustments: The range adjustments to create viewpoints with.
+    :param image_formats: The output formats to request images in.
+    :return: The cells of the matrix, ordered by image, tile size, range adjustment, and format.
+    """
+    if not image_uris:
+        raise ValueError("No test images specified for the integration test")
+    for image_format in image_formats:
+        image_content_type(image_format)
+    return [IntegTestCell(*cell) for cell in itertools.product(image_uris, tile_sizes, range_adjustments, image_formats)]
+
+
+def run_integ_test_matrix(cells: Sequence[IntegTestCell], max_concurrency: int = 4) -> Dict[str, Any]:
+    """
+    Run the integration test of every cell, at most `max_concurrency` viewpoints at a time, and aggregate the results.
+    A failing cell does not stop the others.
+
+    :param cells: The cells of the matrix.
+    :param max_concurrency: The number of cells tested at once.
+    :return: The results of every cell in the order given, with the count of cells that passed and failed and the
+        wall time of the whole matrix in seconds.
+    """
+    start = time.monotonic()
+    # The viewpoint IDs of cells started in the same second only differ by their suffix
+    suffixes = [f"-{index}" for index in range(len(cells))] if len(cells) > 1 else [""]
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        cell_results = list(executor.map(_run_cell, cells, suffixes))
+    failed = sum(cell_result["result"] is TestResult.FAILED for cell_result in cell_results)
+    return {
+        "cells": cell_results,
+        "total": len(cell_results),
+        "passed": len(cell_results) - failed,
+        "failed": failed,
+        "duration": time.monotonic() - start,
+    }
+
+
+def format_integ_test_matrix_summary(summary: Dict[str, Any]) -> str:
+    """
+    :param summary: The results returned by :func:`run_integ_test_matrix`.
+    :return: A readable summary with one line per cell, listing the checks that failed or were over budget.
+    """
+    cell_names = [
+        IntegTestCell(cell["image_uri"], cell["tile_size"], cell["range_adjustment"], cell["image_format"]).name
+        for cell in summary["cells"]
+    ]
+    max_name_length = max([len(name) for name in cell_names], default=0)
+    results_str = "\nTest Matrix Summary\n-------------------------------------\n"
+    for name, cell in zip(cell_names, summary["cells"]):
+        results_str += f"{name.ljust(max_name_length + 5)}{cell['result'].value} ({cell['duration']:.1f}s)\n"
+        for check, message in cell["failures"].items():
+            results_str += f"    {check} - {message}\n"
+        for check, breaches in cell["budget_breaches"].items():
+            results_str += f"    {check} - Over budget: {TestTileServer._format_budget_breaches(breaches)}\n"
+    results_str += (
+        f"    Cells: {summary['total']}, Passed: {summary['passed']}, Failed: {summary['failed']}, "
+        f"Duration: {summary['duration']:.1f}s"
+    )
+    return results_str
+
+
+def _run_cell(cell: IntegTestCell, viewpoint_id_suffix: str) -> Dict[str, Any]:
+    """
+    :param cell: The cell to test.
+    :param viewpoint_id_suffix: Appended to the ID of the cell's viewpoint.
+    :return: The cell, its viewpoint ID, whether it passed, the number of checks that passed and failed, the message
+        of every failed check, the budget breaches of checks that passed, the median timing of every check, and its
+        duration in seconds.
+    """
+    s3_url = S3Url(cell.image_uri)
+    config = TileServerIntegTestConfig(
+        s3_bucket=s3_url.bucket,
+        s3_key=s3_url.key,
+        tile_size=cell.tile_size,
+        range_adjustment=cell.range_adjustment,
+        image_format=cell.image_format,
+        viewpoint_id_suffix=viewpoint_id_suffix,
+    )
+    ts_server = TestTileServer(config)
+    start = time.monotonic()
+    logging.info(f"Running Tile Server integration test of {cell.name}")
+    error = None
+    try:
+        ts_server.run_integ_test()
+    except Exception as err:
+        error = err
+    failures = {
+        check: result["message"] for check, result in ts_server.test_results.items() if result["result"] is TestResult.FAILED
+    }
+    if error is not None and not failures:
+        # The run stopped before any check failed, e.g. the viewpoint never became READY
+        failures["Integration Test"] = str(error)
+    return {
+        **asdict(cell),
+        "viewpoint_id": config.test_viewpoint_id,
+        "result": TestResult.FAILED if failures else TestResult.PASSED,
+        "checks_passed": sum(result["result"] is TestResult.PASSED for result in ts_server.test_results.values()),
+        "checks_failed": len(failures),
+        "failures": failures,
+        "budget_breaches": {
+            check: result["budget_breaches"]
+            for check, result in ts_server.test_results.items()
+            if result.get("budget_breaches") and check not in failures
+        },
+        "latency": {check: result.get("latency") for check, result in ts_server.test_results.items()},
+        "duration": time.monotonic() - start,
+    }
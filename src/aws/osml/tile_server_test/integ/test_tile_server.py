@@ -3,9 +3,10 @@
 import logging
 import traceback
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum, auto
 from time import sleep
-from typing import Dict
+from typing import Any, Callable, Dict, List, Optional
 
 from requests import Session
 
@@ -30,6 +31,7 @@ from .endpoints import (
     list_viewpoints,
     update_viewpoint,
 )
+from .request_timing import RequestTimer, TimingAdapter, budget_breaches, load_latency_budgets, median_request_timing
 from .test_config import TileServerIntegTestConfig
 
 
@@ -69,33 +71,64 @@ class TestTileServer:
     def __init__(self, test_config: TileServerIntegTestConfig):
         self.config: TileServerIntegTestConfig = test_config
         self.session: Session = Session()
+        # Size the connection pool so that every concurrent check can keep its connection open
+        adapter = TimingAdapter(pool_maxsize=self.config.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.request_timer = RequestTimer()
+        self.session.hooks["response"].append(self.request_timer.on_response)
+        self.latency_budgets = (
+            load_latency_budgets(self.config.latency_budgets_file) if self.config.latency_budgets_file else {}
+        )
         self.viewpoint_id = None
         self.test_results = {}
         self.viewpoints_url = f"{self.config.endpoint}/viewpoints"
 
     def run_integ_test(self) -> None:
+        """
+        Run the checks as a sequence of stages: create, wait for READY, the read-only checks, update, and delete.
+        Checks within a stage are independent of each other and run concurrently.
+        """
         logging.info("Running Tile Server integration test")
-        self.test_create_viewpoint()
-        self.test_describe_viewpoint()
-        self.wait_for_viewpoint_ready()
-        self.test_list_viewpoints()
-        self.test_update_viewpoint()
-        self.test_get_metadata()
-        self.test_get_bounds()
-        self.test_get_info()
-        self.test_get_statistics()
-        self.test_get_preview()
-        self.test_get_tile()
-        self.test_get_crop()
-        self.test_get_map_tilesets()
-        self.test_get_map_tileset_metadata()
-        self.test_get_map_tile()
-        self.test_delete_viewpoint()
+        with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
+            self.test_create_viewpoint()
+            self.test_describe_viewpoint()
+            self.wait_for_viewpoint_ready()
+            self._run_concurrently(
+                executor,
+                self.test_list_viewpoints,
+                self.test_get_metadata,
+                self.test_get_bounds,
+                self.test_get_info,
+                self.test_get_statistics,
+                self.test_get_preview,
+                self.test_get_tile,
+                self.test_get_crop,
+                self.test_get_map_tilesets,
+                self.test_get_map_tileset_metadata,
+                self.test_get_map_tile,
+            )
+            # Updating renames the viewpoint, so it waits until the read-only checks have finished
+            self.test_update_viewpoint()
+            self.test_delete_viewpoint()
+        # Checks finish in any order, so the results are ordered by name to be the same from one run to the next
+        self.test_results = dict(sorted(self.test_results.items(), key=lambda x: x[0].lower()))
         test_summary = self._pretty_print_test_results(self.test_results)
         if TestResult.FAILED in [res["result"] for res in self.test_results.values()]:
             raise Exception(test_summary)
         logging.info(test_summary)
 
+    @staticmethod
+    def _run_concurrently(executor: ThreadPoolExecutor, *checks: Callable[[], None]) -> None:
+        """
+        Run a stage of independent checks and wait for all of them to finish.
+
+        :param executor: The executor to run the checks on.
+        :param checks: The checks of the stage, each of which records its own results.
+        """
+        for future in [executor.submit(check) for check in checks]:
+            future.result()
+
     def wait_for_viewpoint_ready(self) -> None:
         polling_interval_sec = 2
         timeout_sec = 300
@@ -108,6 +141,8 @@ class TestTileServer:
             res = self.session.get(f"{self.viewpoints_url}/{self.viewpoint_id}")
             res.raise_for_status()
             status = res.json().get("viewpoint_status")
+            if status != "REQUESTED":
+                break
             logging.info("...")
             sleep(polling_interval_sec)
             elapsed_wait_time += polling_interval_sec
@@ -115,219 +150,121 @@ class TestTileServer:
             raise Exception(f"Viewpoint status is {status}. Expected READY")
 
     def test_create_viewpoint(self) -> None:
-        try:
-            logging.info("Testing create invalid viewpoint")
-            create_viewpoint_invalid(self.session, self.viewpoints_url, self.config.invalid_viewpoint)
-            self.test_results["Create Viewpoint - Invalid"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Create Viewpoint - Invalid"] = {
-                "result": TestResult.FAILED,
-                "message": self._get_exception_summary(err),
-            }
-        try:
-            logging.info("Testing create invalid viewpoint ID")
-            viewpoint_with_invalid_id = self.config.test_viewpoint.copy()
-            viewpoint_with_invalid_id["viewpoint_id"] = "tricky/id"
-            create_viewpoint_invalid_id(self.session, self.viewpoints_url, viewpoint_with_invalid_id)
-            self.test_results["Create Viewpoint - Invalid ID"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Create Viewpoint - Invalid ID"] = {
-                "result": TestResult.FAILED,
-                "message": self._get_exception_summary(err),
-            }
-        try:
-            logging.info("Testing create viewpoint")
-            self.viewpoint_id = create_viewpoint(self.session, self.viewpoints_url, self.config.test_viewpoint)
-            self.test_results["Create Viewpoint"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Create Viewpoint"] = {
-                "result": TestResult.FAILED,
-                "message": self._get_exception_summary(err),
-            }
+        logging.info("Testing create invalid viewpoint")
+        self._run_check("Create Viewpoint - Invalid", create_viewpoint_invalid, self.config.invalid_viewpoint)
+        logging.info("Testing create invalid viewpoint ID")
+        viewpoint_with_invalid_id = self.config.test_viewpoint.copy()
+        viewpoint_with_invalid_id["viewpoint_id"] = "tricky/id"
+        self._run_check("Create Viewpoint - Invalid ID", create_viewpoint_invalid_id, viewpoint_with_invalid_id)
+        logging.info("Testing create viewpoint")
+        self.viewpoint_id = self._run_check("Create Viewpoint", create_viewpoint, self.config.test_viewpoint)
 
     def test_describe_viewpoint(self) -> None:
-        try:
-            logging.info("Testing describe viewpoint")
-            describe_viewpoint(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Describe Viewpoint"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Describe Viewpoint"] = {
-                "result": TestResult.FAILED,
-                "message": self._get_exception_summary(err),
-            }
+        logging.info("Testing describe viewpoint")
+        self._run_check("Describe Viewpoint", describe_viewpoint, self.viewpoint_id, repeats=self.config.check_repeats)
 
     def test_list_viewpoints(self) -> None:
-        try:
-            logging.info("Testing list viewpoints")
-            list_viewpoints(self.session, self.viewpoints_url)
-            self.test_results["List Viewpoints"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["List Viewpoints"] = {"result": TestResult.FAILED, "message": self._get_exception_summary(err)}
+        logging.info("Testing list viewpoints")
+        self._run_check("List Viewpoints", list_viewpoints, repeats=self.config.check_repeats)
 
     def test_update_viewpoint(self) -> None:
-        try:
-            logging.info("Testing update viewpoint")
-            update_viewpoint(self.session, self.viewpoints_url, self.viewpoint_id, self.config.valid_update_test_body)
-            self.test_results["Update Viewpoint"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Update Viewpoint"] = {
-                "result": TestResult.FAILED,
-                "message": self._get_exception_summary(err),
-            }
+        logging.info("Testing update viewpoint")
+        self._run_check("Update Viewpoint", update_viewpoint, self.viewpoint_id, self.config.valid_update_test_body)
 
     def test_get_metadata(self) -> None:
-        try:
-            logging.info("Testing get metadata")
-            get_metadata(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Get Metadata"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Get Metadata"] = {"result": TestResult.FAILED, "message": self._get_exception_summary(err)}
+        logging.info("Testing get metadata")
+        self._run_check("Get Metadata", get_metadata, self.viewpoint_id, repeats=self.config.check_repeats)
 
     def test_get_bounds(self) -> None:
-        try:
-            logging.info("Testing get bounds")
-            get_bounds(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Get Bounds"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Get Bounds"] = {"result": TestResult.FAILED, "message": self._get_exception_summary(err)}
+        logging.info("Testing get bounds")
+        self._run_check("Get Bounds", get_bounds, self.viewpoint_id, repeats=self.config.check_repeats)
 
     def test_get_info(self) -> None:
-        try:
-            logging.info("Testing get info")
-            get_info(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Get Info"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Get Info"] = {"result": TestResult.FAILED, "message": self._get_exception_summary(err)}
+        logging.info("Testing get info")
+        self._run_check("Get Info", get_info, self.viewpoint_id, repeats=self.config.check_repeats)
 
     def test_get_statistics(self) -> None:
-        try:
-            logging.info("Testing get statistics")
-            get_statistics(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Get Statistics"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Get Statistics"] = {"result": TestResult.FAILED, "message": self._get_exception_summary(err)}
-
-        try:
-            logging.info("Testing get statistics invalid")
-            get_statistics_invalid(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Get Statistics - Invalid"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Get Statistics - Invalid"] = {
-                "result": TestResult.FAILED,
-                "message": self._get_exception_summary(err),
-            }
+        logging.info("Testing get statistics")
+        self._run_check("Get Statistics", get_statistics, self.viewpoint_id, repeats=self.config.check_repeats)
+        logging.info("Testing get statistics invalid")
+        self._run_check(
+            "Get Statistics - Invalid", get_statistics_invalid, self.viewpoint_id, repeats=self.config.check_repeats
+        )
 
     def test_get_preview(self) -> None:
-        try:
-            logging.info("Testing get preview")
-            get_preview(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Get Preview"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Get Preview"] = {"result": TestResult.FAILED, "message": self._get_exception_summary(err)}
+        logging.info("Testing get preview")
+        self._run_check("Get Preview", get_preview, self.viewpoint_id, repeats=self.config.check_repeats)
 
     def test_get_tile(self) -> None:
-        try:
-            logging.info("Testing get tile")
-            get_tile(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Get Tile"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Get Tile"] = {"result": TestResult.FAILED, "message": self._get_exception_summary(err)}
+        logging.info("Testing get tile")
+        self._run_check("Get Tile", get_tile, self.viewpoint_id, self.config.image_format, repeats=self.config.check_repeats)
 
     def test_get_crop(self) -> None:
-        try:
-            logging.info("Testing get crop")
-            get_crop(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Get Crop"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Get Crop"] = {"result": TestResult.FAILED, "message": self._get_exception_summary(err)}
+        logging.info("Testing get crop")
+        self._run_check("Get Crop", get_crop, self.viewpoint_id, self.config.image_format, repeats=self.config.check_repeats)
 
     def test_get_map_tilesets(self) -> None:
-        try:
-            logging.info("Testing get map tilesets")
-            get_map_tilesets(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Get Map Tilesets"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Get Map Tilesets"] = {
-                "result": TestResult.FAILED,
-                "message": self._get_exception_summary(err),
-            }
+        logging.info("Testing get map tilesets")
+        self._run_check("Get Map Tilesets", get_map_tilesets, self.viewpoint_id, repeats=self.config.check_repeats)
 
     def test_get_map_tileset_metadata(self) -> None:
-        try:
-            logging.info("Testing get map tileset metadata")
-            get_map_tileset_metadata(self.session, self.viewpoints_url, self.viewpoint_id, "WebMercatorQuad")
-            self.test_results["Get Map Tileset Metadata"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Get Map Tileset Metadata"] = {
-                "result": TestResult.FAILED,
-                "message": self._get_exception_summary(err),
-            }
+        logging.info("Testing get map tileset metadata")
+        self._run_check(
+            "Get Map Tileset Metadata",
+            get_map_tileset_metadata,
+            self.viewpoint_id,
+            "WebMercatorQuad",
+            repeats=self.config.check_repeats,
+        )
 
     def test_get_map_tile(self) -> None:
-        try:
-            logging.info("Testing get map tile")
-            get_map_tile(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Get Map Tile"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Get Map Tile"] = {"result": TestResult.FAILED, "message": self._get_exception_summary(err)}
+        logging.info("Testing get map tile")
+        self._run_check(
+            "Get Map Tile", get_map_tile, self.viewpoint_id, self.config.image_format, repeats=self.config.check_repeats
+        )
 
     def test_delete_viewpoint(self) -> None:
+        logging.info("Testing delete viewpoint")
+        self._run_check("Delete Viewpoint", delete_viewpoint, self.viewpoint_id)
+        logging.info("Testing delete viewpoint invalid")  # viewpoint already deleted
+        self._run_check("Delete Viewpoint - Invalid", delete_viewpoint_invalid, self.viewpoint_id)
+
+    def _run_check(self, name: str, check: Callable[..., Any], *args: Any, repeats: int = 1) -> Any:
+        """
+        Run a check and record whether it passed with the median timing of its requests. A check that passes is
+        compared against its latency budget, and fails when it is over budget in strict mode.
+
+        :param name: The name the result is recorded under.
+        :param check: The endpoint test, called with the session, the viewpoints URL, and `args`.
+        :param args: The remaining arguments of the check.
+        :param repeats: Number of times to run the check, for read-only checks whose timing should be stable.
+        :return: The value returned by the last run of the check, or None if it failed.
+        """
+        attempts = []
+        value = None
         try:
-            logging.info("Testing delete viewpoint")
-            delete_viewpoint(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Delete Viewpoint"] = {"result": TestResult.PASSED}
-        except Exception as err:
-            logging.info(f"\tFailed. {err}")
-            logging.error(traceback.print_exception(err))
-            self.test_results["Delete Viewpoint"] = {
-                "result": TestResult.FAILED,
-                "message": self._get_exception_summary(err),
-            }
-        try:
-            logging.info("Testing delete viewpoint invalid")  # viewpoint already deleted
-            delete_viewpoint_invalid(self.session, self.viewpoints_url, self.viewpoint_id)
-            self.test_results["Delete Viewpoint - Invalid"] = {"result": TestResult.PASSED}
+            for _ in range(max(1, repeats)):
+                self.request_timer.start()
+                try:
+                    value = check(self.session, self.viewpoints_url, *args)
+                finally:
+                    attempts.append(self.request_timer.stop())
+            result = {"result": TestResult.PASSED}
         except Exception as err:
             logging.info(f"\tFailed. {err}")
             logging.error(traceback.print_exception(err))
-            self.test_results["Delete Viewpoint - Invalid"] = {
-                "result": TestResult.FAILED,
-                "message": self._get_exception_summary(err),
-            }
+            value = None
+            result = {"result": TestResult.FAILED, "message": self._get_exception_summary(err)}
+        result["latency"] = median_request_timing(attempts)
+        if result["result"] is TestResult.PASSED:
+            breaches = budget_breaches(self.latency_budgets, name, result["latency"])
+            if breaches:
+                result["budget_breaches"] = breaches
+                if self.config.strict_latency:
+                    result["result"] = TestResult.FAILED
+                    result["message"] = f"Latency budget exceeded: {self._format_budget_breaches(breaches)}"
+        self.test_results[name] = result
+        return value
 
     @staticmethod
     def _pretty_print_test_results(test_results: Dict[str, TestResult]) -> str:
@@ -337,17 +274,45 @@ class TestTileServer:
         results_str = "\nTest Summary\n-------------------------------------\n"
         for k, v in sorted_results.items():
             result = v["result"]
-            if result is TestResult.PASSED:
-                results_str += f"{k.ljust(max_key_length + 5)}{result.value}\n"
+            latency = TestTileServer._format_latency(v.get("latency"))
+            if result is TestResult.PASSED and v.get("budget_breaches"):
+                breaches = TestTileServer._format_budget_breaches(v["budget_breaches"])
+                results_str += f"{k.ljust(max_key_length + 5)}{result.value.ljust(8)}{latency} - Over budget: {breaches}\n"
+            elif result is TestResult.PASSED:
+                results_str += f"{k.ljust(max_key_length + 5)}{result.value.ljust(8)}{latency}\n"
             elif result is TestResult.FAILED:
-                results_str += f"{k.ljust(max_key_length + 5)}{result.value} - {v['message']}\n"
+                results_str += f"{k.ljust(max_key_length + 5)}{result.value.ljust(8)}{latency} - {v['message']}\n"
         n_tests = len(test_results)
         passed = test_counter[TestResult.PASSED]
         failed = test_counter[TestResult.FAILED]
+        over_budget = len([res for res in test_results.values() if res.get("budget_breaches")])
         success = passed / n_tests * 100
-        results_str += f"    Tests: {n_tests}, Passed: {passed}, Failed: {failed}, Success: {success:.2f}%"
+        results_str += (
+            f"    Tests: {n_tests}, Passed: {passed}, Failed: {failed}, Over Budget: {over_budget}, Success: {success:.2f}%"
+        )
         return results_str
 
+    @staticmethod
+    def _format_latency(latency: Optional[Dict[str, Any]]) -> str:
+        """
+        :param latency: The median timing of a check, or None if it made no requests.
+        :return: The timing as a fixed width column.
+        """
+        if not latency:
+            return " " * 50
+        return (
+            f"total {latency['total']:8.1f} ms  ttfb {latency['ttfb']:8.1f} ms  connect {latency['connect']:6.1f} ms  "
+            f"{latency['payload_bytes']:>9} B"
+        )
+
+    @staticmethod
+    def _format_budget_breaches(breaches: List[Dict[str, Any]]) -> str:
+        """
+        :param breaches: The metrics of a check that exceeded their budget.
+        :return: Each metric with its median and budget.
+        """
+        return ", ".join(f"{b['metric']} {b['value']:.1f} ms > {b['budget']:g} ms" for b in breaches)
+
     @staticmethod
     def _get_exception_summary(err: Exception) -> str:
         tb = traceback.extract_tb(err.__traceback__)
@@ -1,12 +1,12 @@
 # Copyright 2024 Amazon.com, Inc. or its affiliates.
 
 import asyncio
-from dataclasses import dataclass
-from typing import Any, Dict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
 
-from .integ import TestTileServer, TileServerIntegTestConfig
+from .integ import format_integ_test_matrix_summary, integ_test_matrix, run_integ_test_matrix
 from .processor_base import ProcessorBase
-from .utils import S3Url
+from .utils import logger
 
 
 @dataclass
@@ -15,10 +15,20 @@ class TSTestRequest:
     Data class representing the integration test request parameters.
 
     Attributes:
-        image_uri: The URI of the container image to test.
+        image_uri: The S3 URI of the image to test with.
+        image_uris: The S3 URIs of the images to test with, used instead of image_uri when given.
+        tile_sizes: The tile sizes to create viewpoints with.
+        range_adjustments: The range adjustments to create viewpoints with.
+        image_formats: The output formats to request tiles, crops, and map tiles in.
+        max_concurrency: The number of viewpoints tested at once.
     """
 
-    image_uri: str
+    image_uri: str = field(default="")
+    image_uris: List[str] = field(default_factory=list)
+    tile_sizes: List[int] = field(default_factory=lambda: [512])
+    range_adjustments: List[str] = field(default_factory=lambda: ["NONE"])
+    image_formats: List[str] = field(default_factory=lambda: ["PNG"])
+    max_concurrency: int = field(default=4)
 
 
 class TSIntegTestProcessor(ProcessorBase):
@@ -29,19 +39,27 @@ class TSIntegTestProcessor(ProcessorBase):
         :param event: The event dictionary containing runtime parameters.
         """
         self.request = TSTestRequest(**event)
-        self.s3_url = S3Url(self.request.image_uri)
-        self.test_config = TileServerIntegTestConfig(s3_bucket=self.s3_url.bucket, s3_key=self.s3_url.key)
-        self.ts_server = TestTileServer(self.test_config)
+        self.cells = integ_test_matrix(
+            self.request.image_uris or ([self.request.image_uri] if self.request.image_uri else []),
+            tile_sizes=self.request.tile_sizes,
+            range_adjustments=self.request.range_adjustments,
+            image_formats=self.request.image_formats,
+        )
 
     async def process(self) -> Dict[str, Any]:
         """
-        Process the runtime arguments, determine the test type, and execute the appropriate test.
+        Run the integration test on one viewpoint for every combination of test image, tile size, range adjustment,
+        and output format.
 
-        :returns: A response indicating the status of the process.
+        :returns: A response indicating the status of the process, with the results of every combination.
         """
         try:
-            self.ts_server.run_integ_test()
-            return self.success_message("Test executed successfully")
+            summary = run_integ_test_matrix(self.cells, max_concurrency=self.request.max_concurrency)
+            test_summary = format_integ_test_matrix_summary(summary)
+            if summary["failed"]:
+                raise Exception(test_summary)
+            logger.info(test_summary)
+            return self.success_message("Test executed successfully", summary)
         except Exception as e:
             return self.failure_message(e)
 
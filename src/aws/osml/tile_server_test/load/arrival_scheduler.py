@@ -0,0 +1,119 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import random
+import time
+from typing import Callable, Optional
+
+import gevent
+from gevent.pool import Pool
+
+
+def ramped_rate(target_rate: float, ramp_time: float = 0.0) -> Callable[[float], float]:
+    """
+    Build a rate function that grows linearly from zero to the target rate and then holds it.
+
+    :param target_rate: The steady state arrival rate in requests per second.
+    :param ramp_time: Seconds taken to reach the target rate, 0 to start at the target rate immediately.
+    :return: Function mapping seconds since the schedule started to an arrival rate.
+    """
+
+    def rate(elapsed: float) -> float:
+        if ramp_time <= 0 or elapsed >= ramp_time:
+            return target_rate
+        return target_rate * elapsed / ramp_time
+
+    return rate
+
+
+def schedule_lag_ms(intended_time: float) -> float:
+    """
+    Compute how late a request is being sent relative to the time the schedule intended to send it.
+
+    :param intended_time: The intended send time on the :func:`time.perf_counter` clock.
+    :return: The lag in milliseconds, never negative.
+    """
+    return max(time.perf_counter() - intended_time, 0.0) * 1000
+
+
+class ArrivalScheduler:
+    """
+    :class:`ArrivalScheduler` issues requests on an open-loop schedule. Arrivals are planned from the target rate
+    alone, never from how quickly earlier requests complete, so a slow server does not reduce the offered load. Each
+    arrival is handed the time it was *intended* to be sent; measuring latency from that time, instead of from when the
+    request actually left, corrects for coordinated omission when the generator falls behind its schedule.
+
+    Arrival times invert the integrated rate: the n-th arrival is sent when the expected number of arrivals reaches n,
+    or, for Poisson arrivals, each arrival follows the last once the expected number has grown by an exponentially
+    distributed amount. The rate is integrated in steps of at most `max_step` seconds, so a rate that changes over
+    time, such as a ramp starting from zero, is followed instead of being held at its value when the last arrival
+    was sent.
+    """
+
+    def __init__(
+        self,
+        rate: Callable[[float], float],
+        max_outstanding: int = 1000,
+        poisson: bool = False,
+        rng: Optional[random.Random] = None,
+        max_step: float = 0.1,
+    ) -> None:
+        """
+        Initialize the scheduler.
+
+        :param rate: Function mapping seconds since the schedule started to the arrival rate in requests per second.
+        :param max_outstanding: Maximum requests in flight. When reached, new arrivals wait for a free slot and the
+            wait is charged to their latency rather than dropped.
+        :param poisson: Use exponentially distributed inter-arrival times instead of a fixed interval.
+        :param rng: Random number generator used for Poisson arrivals.
+        :param max_step: Longest interval in seconds the rate is assumed to change linearly over.
+        """
+        self.rate = rate
+        self.max_outstanding = max_outstanding
+        self.poisson = poisson
+        self.rng = rng or random.Random()
+        self.max_step = max_step
+
+    def run(self, issue: Callable[[float], None], duration: Optional[float] = None) -> None:
+        """
+        Issue arrivals until the duration elapses or the calling greenlet is killed.
+
+        :param issue: Function that sends one request, called with the intended send time on the
+            :func:`time.perf_counter` clock.
+        :param duration: Optional number of seconds to generate arrivals for.
+        :return: None
+        """
+        pool = Pool(self.max_outstanding)
+        start = time.perf_counter()
+        elapsed = 0.0
+        # Expected arrivals still to accumulate before the next arrival is sent
+        remaining = self._next_increment()
+        try:
+            while duration is None or elapsed < duration:
+                current_rate = self.rate(elapsed)
+                step = min(self.max_step, remaining / current_rate) if current_rate > 0 else self.max_step
+                expected = (current_rate + max(self.rate(elapsed + step), 0.0)) / 2 * step
+                if expected < remaining * (1 - 1e-9):
+                    # No arrival in this step, keep in step with the clock while the rate is low
+                    remaining -= expected
+                    elapsed += step
+                    gevent.sleep(max(start + elapsed - time.perf_counter(), 0))
+                    continue
+
+                elapsed += step * min(remaining / expected, 1.0)
+                remaining = self._next_increment()
+                if duration is not None and elapsed >= duration:
+                    break
+                intended_time = start + elapsed
+                delay = intended_time - time.perf_counter()
+                if delay > 0:
+                    gevent.sleep(delay)
+                pool.spawn(issue, intended_time)
+            pool.join()
+        finally:
+            pool.kill(block=False)
+
+    def _next_increment(self) -> float:
+        """
+        :return: The growth of the expected number of arrivals between one arrival and the next.
+        """
+        return self.rng.expovariate(1.0) if self.poisson else 1.0
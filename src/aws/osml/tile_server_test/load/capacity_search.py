@@ -0,0 +1,163 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from locust.stats import StatsEntry, calculate_response_time_percentile, diff_response_time_dicts
+
+
+@dataclass
+class CapacityStep:
+    """
+    The load offered during one step of a capacity search and how the server responded to it.
+
+    Attributes:
+        offered_rate: The target arrival rate in requests per second.
+        achieved_rate: The requests per second actually completed during the measurement window.
+        p50: Median latency in milliseconds over the measurement window.
+        p99: p99 latency in milliseconds over the measurement window.
+        error_rate: Fraction of requests that failed during the measurement window.
+        sustainable: Whether the step met the latency and error rate objectives.
+    """
+
+    offered_rate: float
+    achieved_rate: float
+    p50: float
+    p99: float
+    error_rate: float
+    sustainable: bool
+
+
+class StatsWindow:
+    """
+    :class:`StatsWindow` measures the requests recorded by a Locust :class:`StatsEntry` between two points in time
+    by diffing its cumulative counters, so the same entry can be measured repeatedly without resetting the stats.
+    """
+
+    def __init__(self, entry: StatsEntry, start_time: float) -> None:
+        """
+        Snapshot the entry at the start of the window.
+
+        :param entry: The statistics to measure.
+        :param start_time: The time the window starts.
+        """
+        self.entry = entry
+        self.start_time = start_time
+        self._num_requests = entry.num_requests
+        self._num_failures = entry.num_failures
+        self._response_times = dict(entry.response_times)
+
+    def measure(self, end_time: float) -> Dict[str, float]:
+        """
+        Measure the requests recorded since the window started.
+
+        :param end_time: The time the window ends.
+        :return: The completed requests per second, p50 and p99 latency in milliseconds, and error rate.
+        """
+        num_requests = self.entry.num_requests - self._num_requests
+        num_failures = self.entry.num_failures - self._num_failures
+        response_times = diff_response_time_dicts(self.entry.response_times, self._response_times)
+        num_timed = sum(response_times.values())
+        duration = max(end_time - self.start_time, 1e-9)
+        return {
+            "achieved_rate": num_requests / duration,
+            "p50": calculate_response_time_percentile(response_times, num_timed, 0.5) if num_timed else 0.0,
+            "p99": calculate_response_time_percentile(response_times, num_timed, 0.99) if num_timed else 0.0,
+            "error_rate": num_failures / num_requests if num_requests else 0.0,
+        }
+
+
+class CapacitySearch:
+    """
+    :class:`CapacitySearch` finds the highest arrival rate a server sustains within a p99 latency and error rate
+    objective. The offered rate grows geometrically from `start_rate` until a step violates the objective, or
+    `max_rate` is reached, and is then binary searched between the last sustainable and first unsustainable rates
+    until they are within `resolution` of each other. Each call to :meth:`record_step` returns the next rate to offer.
+    """
+
+    def __init__(
+        self,
+        start_rate: float = 10.0,
+        max_rate: float = 10000.0,
+        step_factor: float = 2.0,
+        p99_slo_ms: float = 1000.0,
+        max_error_rate: float = 0.01,
+        resolution: float = 0.05,
+        min_achieved_fraction: float = 0.9,
+        max_steps: int = 20,
+    ) -> None:
+        """
+        Initialize the search.
+
+        :param start_rate: The first arrival rate offered, in requests per second.
+        :param max_rate: The highest arrival rate that will be offered.
+        :param step_factor: Factor the offered rate grows by between steps until the objective is violated.
+        :param p99_slo_ms: Highest sustainable p99 latency in milliseconds.
+        :param max_error_rate: Highest sustainable fraction of failed requests.
+        :param resolution: The search stops when the unsustainable rate is within this fraction of the sustainable one.
+        :param min_achieved_fraction: A step is unsustainable if fewer than this fraction of the offered requests
+            completed, which happens when the server or the load generator cannot keep up.
+        :param max_steps: The search stops after this many steps, even if it has not converged.
+        """
+        if start_rate <= 0 or step_factor <= 1:
+            raise ValueError("Capacity search needs a positive start rate and a step factor above 1")
+        self.start_rate = start_rate
+        self.max_rate = max_rate
+        self.step_factor = step_factor
+        self.p99_slo_ms = p99_slo_ms
+        self.max_error_rate = max_error_rate
+        self.resolution = resolution
+        self.min_achieved_fraction = min_achieved_fraction
+        self.max_steps = max_steps
+        self.current_rate = min(start_rate, max_rate)
+        self.steps: List[CapacityStep] = []
+        self.sustainable_rate: Optional[float] = None
+        self.unsustainable_rate: Optional[float] = None
+
+    def record_step(self, achieved_rate: float, p50: float, p99: float, error_rate: float) -> Optional[float]:
+        """
+        Record the measurements of the step run at :attr:`current_rate` and choose the next rate.
+
+        :param achieved_rate: Requests per second completed during the step.
+        :param p50: Median latency of the step in milliseconds.
+        :param p99: p99 latency of the step in milliseconds.
+        :param error_rate: Fraction of the step's requests that failed.
+        :return: The next rate to offer, or None when the search is complete.
+        """
+        sustainable = (
+            p99 <= self.p99_slo_ms
+            and error_rate <= self.max_error_rate
+            and achieved_rate >= self.current_rate * self.min_achieved_fraction
+        )
+        self.steps.append(CapacityStep(self.current_rate, achieved_rate, p50, p99, error_rate, sustainable))
+        if sustainable:
+            self.sustainable_rate = max(self.sustainable_rate or 0.0, self.current_rate)
+        else:
+            self.unsustainable_rate = min(self.unsustainable_rate or float("inf"), self.current_rate)
+
+        if len(self.steps) >= self.max_steps:
+            return None
+        if self.unsustainable_rate is None:
+            if self.current_rate >= self.max_rate:
+                return None
+            self.current_rate = min(self.current_rate * self.step_factor, self.max_rate)
+            return self.current_rate
+
+        # Without any sustainable step the search gives up once the rate falls to a small fraction of the start rate
+        lower = self.sustainable_rate or 0.0
+        if self.unsustainable_rate - lower <= self.resolution * (lower or self.start_rate):
+            return None
+        self.current_rate = (lower + self.unsustainable_rate) / 2
+        return self.current_rate
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        :return: The highest sustainable rate, the objectives, and the latency-vs-load curve ordered by offered rate.
+        """
+        return {
+            "max_sustainable_rate": self.sustainable_rate or 0.0,
+            "first_unsustainable_rate": self.unsustainable_rate,
+            "p99_slo_ms": self.p99_slo_ms,
+            "max_error_rate": self.max_error_rate,
+            "steps": [asdict(step) for step in sorted(self.steps, key=lambda step: step.offered_rate)],
+        }
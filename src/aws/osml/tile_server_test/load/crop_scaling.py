@@ -0,0 +1,139 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import math
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+from .latency_histogram import HdrHistogram, LatencyRecorder
+
+# Context key attached to crop requests so their latency can be attributed to a window size
+CROP_WINDOW_CONTEXT = "crop_window"
+
+
+def crop_window_sizes(min_size: int, max_size: int, steps: int) -> List[int]:
+    """
+    Build the ladder of square crop window sizes, spaced evenly on a log scale so that the window area grows by the
+    same factor from one size to the next.
+
+    :param min_size: Width and height of the smallest window in pixels.
+    :param max_size: Width and height of the largest window in pixels.
+    :param steps: Number of window sizes.
+    :return: The distinct window sizes, in increasing order.
+    """
+    if min_size <= 0 or max_size < min_size:
+        raise ValueError(f"Invalid crop window size range {min_size} to {max_size}")
+    if steps <= 1 or max_size == min_size:
+        return [min_size]
+    ratio = (max_size / min_size) ** (1 / (steps - 1))
+    return sorted({round(min_size * ratio**step) for step in range(steps)})
+
+
+def random_crop_window(
+    image_width: int, image_height: int, size: int, rng: Optional[random.Random] = None
+) -> Tuple[int, int, int, int]:
+    """
+    Place a square window at a random position inside the image.
+
+    :param image_width: Width of the image in pixels.
+    :param image_height: Height of the image in pixels.
+    :param size: Width and height of the window, at most the smaller image dimension.
+    :param rng: Random number generator used to place the window.
+    :return: The window as (minx, miny, maxx, maxy) pixel coordinates.
+    """
+    rng = rng or random
+    minx = rng.randint(0, image_width - size)
+    miny = rng.randint(0, image_height - size)
+    return minx, miny, minx + size, miny + size
+
+
+def crop_window_context(crop_format: str, size: int) -> Dict[str, str]:
+    """
+    Build the request context that attributes a crop's latency to its output format and window size.
+
+    :param crop_format: The output format the crop was requested in.
+    :param size: The width and height of the window in pixels.
+    :return: The context to pass with the request.
+    """
+    return {CROP_WINDOW_CONTEXT: f"{crop_format} {size}"}
+
+
+class CropScalingRecorder(LatencyRecorder):
+    """
+    :class:`CropScalingRecorder` keeps one :class:`HdrHistogram` of crop latencies for every output format and window
+    size, built from the context attached to crop requests. Its :meth:`curve` relates latency and pixels served per
+    second to window area, and the scaling exponent between neighbouring sizes shows where latency stops growing in
+    proportion to the number of pixels cropped.
+    """
+
+    def on_request(
+        self,
+        request_type: str,
+        name: str,
+        response_time: float,
+        exception: Any = None,
+        context: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> None:
+        """
+        Locust request event listener.
+
+        :param request_type: The HTTP method or other request type (unused).
+        :param name: The name the request is reported under (unused).
+        :param response_time: The response time in milliseconds.
+        :param exception: The failure, if the request failed.
+        :param context: The request context, which identifies the format and window size of crop requests.
+        :param kwargs: Additional keyword arguments (unused).
+        """
+        if not context or CROP_WINDOW_CONTEXT not in context:
+            return
+        key = context[CROP_WINDOW_CONTEXT]
+        if exception is not None:
+            self.failures[key] = self.failures.get(key, 0) + 1
+            return
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = HdrHistogram()
+        histogram.record(response_time)
+
+    def curve(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Summarize the crop latency of every output format against window area. The scaling exponent of a point is
+        log(p50 / previous p50) / log(area / previous area): 1 when latency grows in proportion to the area, below 1
+        while fixed per-request costs dominate, and above 1 where larger crops become disproportionately slow.
+
+        :return: For every format, one point per window size in increasing order with its latency percentiles in
+            milliseconds, the megapixels served per second by a single request, and the scaling exponent.
+        """
+        points: Dict[str, List[Tuple[int, str]]] = {}
+        for key in set(self.histograms) | set(self.failures):
+            crop_format, size = key.rsplit(" ", 1)
+            points.setdefault(crop_format, []).append((int(size), key))
+
+        curves = {}
+        for crop_format, sizes in sorted(points.items()):
+            curve = []
+            previous = None
+            for size, key in sorted(sizes):
+                histogram = self.histograms.get(key, HdrHistogram())
+                area = size * size
+                p50 = histogram.value_at_percentile(50)
+                point = {
+                    "window_size": size,
+                    "area": area,
+                    "count": histogram.total_count,
+                    "failures": self.failures.get(key, 0),
+                    "mean": histogram.mean,
+                    "p50": p50,
+                    "p90": histogram.value_at_percentile(90),
+                    "p99": histogram.value_at_percentile(99),
+                    "megapixels_per_second": area / 1e6 / (histogram.mean / 1000) if histogram.mean else 0.0,
+                    "ms_per_megapixel": p50 / (area / 1e6),
+                    "scaling_exponent": None,
+                }
+                if previous is not None and previous["p50"] > 0 and p50 > 0:
+                    point["scaling_exponent"] = math.log(p50 / previous["p50"]) / math.log(area / previous["area"])
+                curve.append(point)
+                if histogram.total_count:
+                    previous = point
+            curves[crop_format] = curve
+        return curves
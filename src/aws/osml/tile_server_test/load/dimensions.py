@@ -0,0 +1,179 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import csv
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .latency_histogram import HdrHistogram, LatencyRecorder
+
+# Context key holding the dimensions a request is tagged with
+DIMENSIONS_CONTEXT = "dimensions"
+
+# Every dimension a request can be tagged with, in the order they appear in the results
+DIMENSION_NAMES = ("image", "image_size_class", "tile_size", "range_adjustment", "format", "zoom")
+
+# The dimensions combined into a single series to find slow code paths; the image key is left out so that the number
+# of combinations does not grow with the number of test images
+COMBINED_DIMENSIONS = ("image_size_class", "tile_size", "range_adjustment", "format", "zoom")
+
+# Upper bounds, in bytes, of the image size classes; larger images are "large"
+IMAGE_SIZE_CLASSES = ((256 * 1024**2, "small"), (2 * 1024**3, "medium"))
+
+# Value recorded in place of those beyond the cardinality limits
+OTHER_VALUE = "other"
+
+# Columns of the long-format dimension table
+DIMENSION_TABLE_COLUMNS = ("request", "dimension", "value", "count", "failures", "mean", "p50", "p90", "p99", "p99.9", "max")
+
+
+def image_size_class(size: Optional[int]) -> str:
+    """
+    :param size: The size of the image object in bytes, if known.
+    :return: The size class of the image, small, medium, large, or unknown.
+    """
+    if size is None:
+        return "unknown"
+    for limit, size_class in IMAGE_SIZE_CLASSES:
+        if size < limit:
+            return size_class
+    return "large"
+
+
+def dimensions_context(**dimensions: Any) -> Dict[str, Dict[str, str]]:
+    """
+    Build the request context that tags a request with its dimensions.
+
+    :param dimensions: The value of each dimension in :data:`DIMENSION_NAMES` that applies to the request.
+    :return: The context to pass with the request.
+    """
+    # Commas and bars separate the parts of a series key, so they are replaced in values such as image keys
+    return {
+        DIMENSIONS_CONTEXT: {
+            name: str(value).replace(",", "_").replace("|", "_") for name, value in dimensions.items() if value is not None
+        }
+    }
+
+
+class DimensionRecorder(LatencyRecorder):
+    """
+    :class:`DimensionRecorder` breaks the latency of tagged requests down by the dimensions in their context. Every
+    request is recorded in one :class:`HdrHistogram` per dimension value, e.g. "GetTile|tile_size=512", and in one
+    for its combination of the :data:`COMBINED_DIMENSIONS`, e.g.
+    "GetTile|image_size_class=large,tile_size=512,range_adjustment=DRA,format=NITF,zoom=3", so a slow code path
+    stands out even when its requests are a small part of the total. Cardinality is bounded: values of a dimension
+    beyond the first `max_values` seen, and combinations beyond the first `max_combinations`, are recorded as
+    :data:`OTHER_VALUE`.
+    """
+
+    def __init__(self, max_values: int = 50, max_combinations: int = 500) -> None:
+        """
+        Initialize the recorder.
+
+        :param max_values: Distinct values kept for each dimension, 0 to disable the breakdown.
+        :param max_combinations: Distinct combinations of the combined dimensions kept.
+        """
+        super().__init__()
+        self.max_values = max_values
+        self.max_combinations = max_combinations
+        self._seen_values: Dict[str, Set[str]] = {}
+        self._seen_combinations: Set[str] = set()
+
+    def on_request(
+        self,
+        request_type: str,
+        name: str,
+        response_time: float,
+        exception: Any = None,
+        context: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> None:
+        """
+        Locust request event listener.
+
+        :param request_type: The HTTP method or other request type (unused).
+        :param name: The name the request is reported under.
+        :param response_time: The response time in milliseconds.
+        :param exception: The failure, if the request failed.
+        :param context: The request context, which holds the dimensions of tagged requests.
+        :param kwargs: Additional keyword arguments (unused).
+        """
+        if self.max_values <= 0 or not context or DIMENSIONS_CONTEXT not in context:
+            return
+        dimensions = {dimension: self._bounded(dimension, value) for dimension, value in context[DIMENSIONS_CONTEXT].items()}
+        keys = [f"{name}|{dimension}={value}" for dimension, value in dimensions.items()]
+        combination = ",".join(
+            f"{dimension}={dimensions[dimension]}" for dimension in COMBINED_DIMENSIONS if dimension in dimensions
+        )
+        if "," in combination:
+            if combination not in self._seen_combinations:
+                if len(self._seen_combinations) < self.max_combinations:
+                    self._seen_combinations.add(combination)
+                else:
+                    combination = f"combination={OTHER_VALUE}"
+            keys.append(f"{name}|{combination}")
+        for key in keys:
+            if exception is not None:
+                self.failures[key] = self.failures.get(key, 0) + 1
+                continue
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = HdrHistogram()
+            histogram.record(response_time)
+
+    def table(self) -> List[Dict[str, Any]]:
+        """
+        Summarize every series as a long-format table, one row per request name and dimension value. Combined
+        series have their dimension and value columns joined with commas.
+
+        :return: The rows, ordered by request name, dimension, and value.
+        """
+        rows = []
+        for key in sorted(set(self.histograms) | set(self.failures)):
+            name, dimension, value = _split_key(key)
+            histogram = self.histograms.get(key, HdrHistogram())
+            summary = histogram.summary(percentiles=(50, 90, 99, 99.9))
+            rows.append(
+                {
+                    "request": name,
+                    "dimension": dimension,
+                    "value": value,
+                    "count": summary["count"],
+                    "failures": self.failures.get(key, 0),
+                    **{column: summary[column] for column in ("mean", "p50", "p90", "p99", "p99.9", "max")},
+                }
+            )
+        return rows
+
+    def write_table(self, path: str) -> None:
+        """
+        Write the long-format table as CSV.
+
+        :param path: The file to write.
+        """
+        with open(path, "w", newline="") as output:
+            writer = csv.DictWriter(output, fieldnames=DIMENSION_TABLE_COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.table())
+
+    def _bounded(self, dimension: str, value: str) -> str:
+        """
+        :param dimension: The dimension name.
+        :param value: The value the request was tagged with.
+        :return: The value, or :data:`OTHER_VALUE` once the dimension has reached `max_values` distinct values.
+        """
+        seen = self._seen_values.setdefault(dimension, set())
+        if value in seen:
+            return value
+        if len(seen) < self.max_values:
+            seen.add(value)
+            return value
+        return OTHER_VALUE
+
+
+def _split_key(key: str) -> Tuple[str, str, str]:
+    """
+    :param key: A series key, e.g. "GetTile|tile_size=512" or "GetTile|tile_size=512,format=PNG".
+    :return: The request name, the dimension names, and the dimension values, the latter two joined with commas.
+    """
+    name, _, tags = key.partition("|")
+    pairs = [tag.partition("=") for tag in tags.split(",")]
+    return name, ",".join(pair[0] for pair in pairs), ",".join(pair[2] for pair in pairs)
@@ -0,0 +1,197 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import logging
+import time
+from dataclasses import astuple, dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import gevent
+import psutil
+
+
+@dataclass
+class HarnessSample:
+    """
+    The load on one load generator process during a monitoring interval.
+
+    Attributes:
+        start: Wall clock time the interval started, in seconds since the epoch.
+        duration: Length of the interval in seconds.
+        cpu_percent: CPU used by the process during the interval, 100 being one fully used core.
+        max_lag_ms: Largest delay, in milliseconds, between a probe greenlet being due and it running.
+        saturated: Whether the process was too busy to issue requests on time during the interval.
+    """
+
+    start: float
+    duration: float
+    cpu_percent: float
+    max_lag_ms: float
+    saturated: bool
+
+
+class HarnessMonitor:
+    """
+    :class:`HarnessMonitor` detects intervals in which the load generator itself, rather than the tile server, limited
+    the load. A probe greenlet sleeps for `probe_interval` in a loop and measures how late it wakes up, which is the
+    time every other greenlet on the gevent loop also waits before it can send a request or read a response. Every
+    `interval` seconds the process CPU usage and worst lag are recorded, and the interval is flagged as saturated when
+    either crosses its threshold. Latency measured during saturated intervals includes time spent queued in the
+    harness.
+    """
+
+    def __init__(
+        self,
+        interval: float = 1.0,
+        probe_interval: float = 0.1,
+        cpu_threshold: float = 90.0,
+        lag_threshold_ms: float = 100.0,
+        process: Optional[psutil.Process] = None,
+        on_sample: Optional[Callable[[HarnessSample], None]] = None,
+    ) -> None:
+        """
+        Initialize the monitor.
+
+        :param interval: Seconds covered by each sample.
+        :param probe_interval: Seconds the probe greenlet sleeps between lag measurements.
+        :param cpu_threshold: CPU percent of one core at or above which an interval is saturated.
+        :param lag_threshold_ms: Event loop lag in milliseconds at or above which an interval is saturated.
+        :param process: The process to measure, defaults to this one.
+        :param on_sample: Called with each sample instead of keeping it for :meth:`export`.
+        """
+        self.interval = interval
+        self.probe_interval = probe_interval
+        self.cpu_threshold = cpu_threshold
+        self.lag_threshold_ms = lag_threshold_ms
+        self.process = process or psutil.Process()
+        self.on_sample = on_sample
+        self.samples: List[HarnessSample] = []
+        self._greenlet: Optional[gevent.Greenlet] = None
+
+    def start(self) -> None:
+        """
+        Start the probe greenlet if it is not already running.
+        """
+        if self._greenlet is None or self._greenlet.dead:
+            self._greenlet = gevent.spawn(self._run)
+
+    def stop(self) -> None:
+        """
+        Stop the probe greenlet, the partial interval in progress is discarded.
+        """
+        if self._greenlet is not None:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+
+    def export(self, reset: bool = False) -> List[List[Any]]:
+        """
+        Export the samples as lists of their fields.
+
+        :param reset: Clear the samples after exporting, used by workers sending deltas to the master.
+        :return: A JSON serializable list that can be added to a :class:`HarnessReport`.
+        """
+        exported = [list(astuple(sample)) for sample in self.samples]
+        if reset:
+            self.samples = []
+        return exported
+
+    def _run(self) -> None:
+        # Prime the CPU counter so the first sample only covers its own interval
+        self.process.cpu_percent(None)
+        interval_start = time.time()
+        interval_end = time.monotonic() + self.interval
+        max_lag = 0.0
+        while True:
+            due = time.monotonic() + self.probe_interval
+            gevent.sleep(self.probe_interval)
+            now = time.monotonic()
+            max_lag = max(max_lag, now - due)
+            if now >= interval_end:
+                cpu_percent = self.process.cpu_percent(None)
+                max_lag_ms = max_lag * 1000
+                saturated = cpu_percent >= self.cpu_threshold or max_lag_ms >= self.lag_threshold_ms
+                wall_now = time.time()
+                sample = HarnessSample(interval_start, wall_now - interval_start, cpu_percent, max_lag_ms, saturated)
+                if self.on_sample is not None:
+                    self.on_sample(sample)
+                else:
+                    self.samples.append(sample)
+                interval_start = wall_now
+                interval_end = now + self.interval
+                max_lag = 0.0
+
+
+class HarnessReport:
+    """
+    :class:`HarnessReport` collects the samples of every load generator process on the master and summarizes how
+    long each was saturated.
+    """
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[HarnessSample]] = {}
+
+    def merge_export(self, generator_id: str, exported: List[List[Any]]) -> None:
+        """
+        Add the samples exported by the :class:`HarnessMonitor` of a worker.
+
+        :param generator_id: The Locust client ID of the worker.
+        :param exported: The exported samples.
+        """
+        for fields in exported:
+            self.add(generator_id, HarnessSample(*fields))
+
+    def add(self, generator_id: str, sample: HarnessSample) -> None:
+        """
+        Add a sample, logging a warning when the generator becomes saturated.
+
+        :param generator_id: The Locust client ID of the worker, or "local" for a standalone process.
+        :param sample: The sample.
+        """
+        previous = self.samples.setdefault(generator_id, [])
+        if sample.saturated and not (previous and previous[-1].saturated):
+            logging.warning(
+                f"Load generator {generator_id} is saturated: cpu={sample.cpu_percent:.0f}% "
+                f"event loop lag={sample.max_lag_ms:.0f}ms. Latency measured while it is saturated includes "
+                "time queued in the load generator."
+            )
+        previous.append(sample)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        :return: For every generator the number of saturated intervals, CPU usage, worst event loop lag, and the
+            periods it was saturated, plus the total number of saturated intervals.
+        """
+        generators = {}
+        for generator_id, samples in sorted(self.samples.items()):
+            if not samples:
+                continue
+            saturated = [sample for sample in samples if sample.saturated]
+            generators[generator_id] = {
+                "intervals": len(samples),
+                "saturated_intervals": len(saturated),
+                "saturated_fraction": len(saturated) / len(samples),
+                "mean_cpu_percent": sum(sample.cpu_percent for sample in samples) / len(samples),
+                "max_cpu_percent": max(sample.cpu_percent for sample in samples),
+                "max_event_loop_lag_ms": max(sample.max_lag_ms for sample in samples),
+                "saturated_periods": _saturated_periods(samples),
+            }
+        return {
+            "saturated_intervals": sum(generator["saturated_intervals"] for generator in generators.values()),
+            "generators": generators,
+        }
+
+
+def _saturated_periods(samples: List[HarnessSample]) -> List[List[float]]:
+    """
+    :param samples: The samples of one generator, in order.
+    :return: The [start, end] wall clock times of every run of consecutive saturated samples.
+    """
+    periods: List[List[float]] = []
+    for sample in samples:
+        if not sample.saturated:
+            continue
+        end = sample.start + sample.duration
+        if periods and sample.start - periods[-1][1] < 1e-3:
+            periods[-1][1] = end
+        else:
+            periods.append([sample.start, end])
+    return periods
@@ -0,0 +1,250 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence
+
+import boto3
+from botocore.exceptions import ClientError
+
+# Extensions of the image formats the tile server can open
+DEFAULT_IMAGE_EXTENSIONS = (".tif", ".tiff", ".ntf", ".nitf")
+
+MANIFEST_VERSION = 1
+
+
+@dataclass(frozen=True)
+class ImageObject:
+    """
+    A test image found in S3.
+
+    Attributes:
+        key: The object key.
+        size: The size of the object in bytes.
+        etag: The entity tag of the object, which changes when it is overwritten.
+    """
+
+    key: str
+    size: int
+    etag: str
+
+
+def list_test_images(
+    bucket: str,
+    prefix: str = "",
+    extensions: Sequence[str] = DEFAULT_IMAGE_EXTENSIONS,
+    min_size: int = 0,
+    max_size: int = 0,
+    s3_client: Any = None,
+) -> List[ImageObject]:
+    """
+    List the images under a bucket prefix, following every page of the listing.
+
+    :param bucket: The bucket containing the test images.
+    :param prefix: Only list objects whose key starts with this prefix.
+    :param extensions: Only keep objects whose key ends with one of these extensions, compared case insensitively.
+    :param min_size: Only keep objects of at least this many bytes.
+    :param max_size: Only keep objects of at most this many bytes, 0 for no limit.
+    :param s3_client: The S3 client to list with, defaults to a new boto3 client.
+    :return: The matching images, ordered by key.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    suffixes = tuple(extension.lower() for extension in extensions)
+    images = []
+    for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        for entry in page.get("Contents", []):
+            key, size = entry["Key"], entry["Size"]
+            if suffixes and not key.lower().endswith(suffixes):
+                continue
+            if size < min_size or (max_size and size > max_size):
+                continue
+            images.append(ImageObject(key, size, entry.get("ETag", "").strip('"')))
+    return sorted(images, key=lambda image: image.key)
+
+
+def default_manifest_path(bucket: str, prefix: str = "") -> str:
+    """
+    :param bucket: The bucket containing the test images.
+    :param prefix: The prefix the images are listed under.
+    :return: The manifest file shared by every load test process on this machine that lists the same location.
+    """
+    location = hashlib.sha1(f"{bucket}/{prefix}".encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"tile-server-test-images-{location}.json")
+
+
+def discover_test_images(
+    bucket: str,
+    prefix: str = "",
+    manifest_path: Optional[str] = None,
+    extensions: Sequence[str] = DEFAULT_IMAGE_EXTENSIONS,
+    min_size: int = 0,
+    max_size: int = 0,
+    max_age: float = 86400.0,
+    verify_sample: int = 5,
+    s3_client: Any = None,
+) -> List[ImageObject]:
+    """
+    Find the test images under a bucket prefix, reusing the manifest written by an earlier discovery when it is
+    still valid. A manifest is reused when it was written for the same location and filters, is younger than
+    `max_age`, and a random sample of its images still have the recorded size and ETag. Otherwise the bucket is
+    listed again and the manifest replaced.
+
+    :param bucket: The bucket containing the test images.
+    :param prefix: Only list objects whose key starts with this prefix.
+    :param manifest_path: The manifest file, defaults to :func:`default_manifest_path`.
+    :param extensions: Only keep objects whose key ends with one of these extensions.
+    :param min_size: Only keep objects of at least this many bytes.
+    :param max_size: Only keep objects of at most this many bytes, 0 for no limit.
+    :param max_age: Seconds a manifest may be reused for before the bucket is listed again, 0 for no limit.
+    :param verify_sample: Number of the manifest's images checked with a HEAD request before it is reused.
+    :param s3_client: The S3 client to use, defaults to a new boto3 client.
+    :return: The matching images, ordered by key.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    manifest_path = manifest_path or default_manifest_path(bucket, prefix)
+    query = {
+        "bucket": bucket,
+        "prefix": prefix,
+        "extensions": sorted(extension.lower() for extension in extensions),
+        "min_size": min_size,
+        "max_size": max_size,
+    }
+
+    images = _read_manifest(manifest_path, query, max_age)
+    if images is not None and _manifest_matches_bucket(s3_client, bucket, images, verify_sample):
+        logging.info(f"Reusing {len(images)} test images from {manifest_path}")
+        return images
+
+    start = time.monotonic()
+    images = list_test_images(bucket, prefix, extensions, min_size, max_size, s3_client)
+    logging.info(
+        f"Listed {len(images)} test images in s3://{bucket}/{prefix} in {time.monotonic() - start:.1f}s, "
+        f"writing them to {manifest_path}"
+    )
+    _write_manifest(manifest_path, query, images)
+    return images
+
+
+def test_images_env_options() -> SimpleNamespace:
+    """
+    Read the test image options from the LOCUST_TEST_IMAGES_* environment variables, so that the images can be
+    discovered outside of Locust with the same defaults as the --test_images_* options.
+
+    :return: The options, with the attribute names of the parsed Locust options.
+    """
+    return SimpleNamespace(
+        test_images_bucket=os.environ.get("LOCUST_TEST_IMAGES_BUCKET"),
+        test_images_prefix=os.environ.get("LOCUST_TEST_IMAGES_PREFIX", ""),
+        test_images_extensions=os.environ.get("LOCUST_TEST_IMAGES_EXTENSIONS", ",".join(DEFAULT_IMAGE_EXTENSIONS)),
+        test_images_min_size=int(os.environ.get("LOCUST_TEST_IMAGES_MIN_SIZE", "0")),
+        test_images_max_size=int(os.environ.get("LOCUST_TEST_IMAGES_MAX_SIZE", "0")),
+        test_images_manifest=os.environ.get("LOCUST_TEST_IMAGES_MANIFEST", ""),
+        test_images_manifest_max_age=float(os.environ.get("LOCUST_TEST_IMAGES_MANIFEST_MAX_AGE", "86400")),
+    )
+
+
+def discover_option_test_images(options: Any) -> List[ImageObject]:
+    """
+    Find the test images selected by the --test_images_* options, see :func:`discover_test_images`.
+
+    :param options: The parsed Locust options, or the options returned by :func:`test_images_env_options`.
+    :return: The test images, ordered by key.
+    """
+    return discover_test_images(
+        options.test_images_bucket,
+        prefix=options.test_images_prefix,
+        manifest_path=options.test_images_manifest or None,
+        extensions=[extension.strip() for extension in options.test_images_extensions.split(",") if extension.strip()],
+        min_size=options.test_images_min_size,
+        max_size=options.test_images_max_size,
+        max_age=options.test_images_manifest_max_age,
+    )
+
+
+def read_manifest_images(manifest_path: str) -> List[ImageObject]:
+    """
+    Read the images recorded in a manifest without checking whether they are still current, e.g. to look up the
+    sizes of images whose keys were discovered by another process.
+
+    :param manifest_path: The manifest file.
+    :return: The images in the manifest, or an empty list if it cannot be read.
+    """
+    try:
+        with open(manifest_path, "r") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return []
+    return [ImageObject(**image) for image in manifest.get("images", [])]
+
+
+def _read_manifest(manifest_path: str, query: Dict[str, Any], max_age: float) -> Optional[List[ImageObject]]:
+    """
+    :param manifest_path: The manifest file.
+    :param query: The location and filters the images must have been listed with.
+    :param max_age: Seconds the manifest may be reused for, 0 for no limit.
+    :return: The images in the manifest, or None if it is missing, stale, or was listed differently.
+    """
+    try:
+        with open(manifest_path, "r") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("query") != query:
+        return None
+    if max_age and time.time() - manifest.get("created", 0) > max_age:
+        return None
+    return [ImageObject(**image) for image in manifest.get("images", [])]
+
+
+def _manifest_matches_bucket(s3_client: Any, bucket: str, images: List[ImageObject], verify_sample: int) -> bool:
+    """
+    Check that a sample of the images recorded in a manifest are unchanged.
+
+    :param s3_client: The S3 client to use.
+    :param bucket: The bucket containing the images.
+    :param images: The images recorded in the manifest.
+    :param verify_sample: Number of images to check.
+    :return: True if every sampled image still has the recorded size and ETag.
+    """
+    for image in random.sample(images, min(verify_sample, len(images))):
+        try:
+            head = s3_client.head_object(Bucket=bucket, Key=image.key)
+        except ClientError:
+            logging.info(f"Test image {image.key} is no longer readable, listing the bucket again")
+            return False
+        if head.get("ContentLength") != image.size or head.get("ETag", "").strip('"') != image.etag:
+            logging.info(f"Test image {image.key} changed, listing the bucket again")
+            return False
+    return True
+
+
+def _write_manifest(manifest_path: str, query: Dict[str, Any], images: List[ImageObject]) -> None:
+    """
+    Write the manifest atomically so processes starting at the same time never read a partial file.
+
+    :param manifest_path: The manifest file.
+    :param query: The location and filters the images were listed with.
+    :param images: The images found.
+    """
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "created": time.time(),
+        "query": query,
+        "images": [asdict(image) for image in images],
+    }
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    fd, temp_path = tempfile.mkstemp(prefix=".tile-server-test-images-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(temp_path, manifest_path)
+    except OSError:
+        os.remove(temp_path)
+        raise
@@ -0,0 +1,528 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from secrets import token_hex
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from requests import RequestException, Session
+
+from .dimensions import image_size_class
+from .latency_histogram import HdrHistogram
+
+# Statuses a viewpoint ends an ingest sample in; TIMEOUT and CREATE_FAILED are recorded by the benchmark itself
+INGEST_OUTCOMES = ("READY", "FAILED", "TIMEOUT", "CREATE_FAILED")
+
+
+@dataclass
+class IngestSample:
+    """
+    The outcome of creating one viewpoint.
+
+    Attributes:
+        level: The creation concurrency, or the creation rate per second, of the step the viewpoint was created in.
+        image_key: The key of the image the viewpoint was created for.
+        size_class: The size class of the image.
+        outcome: One of :data:`INGEST_OUTCOMES`.
+        time_to_status: Seconds from sending the create request until the outcome was observed.
+        polls: Number of status polls made.
+    """
+
+    level: float
+    image_key: str
+    size_class: str
+    outcome: str
+    time_to_status: float
+    polls: int
+
+
+@dataclass
+class BacklogSample:
+    """
+    The ingest backlog at one point in time.
+
+    Attributes:
+        elapsed: Seconds since the benchmark started.
+        level: The creation concurrency, or the creation rate per second, of the step in progress.
+        in_flight: Viewpoints created by the benchmark that have not reached a terminal status.
+        requested: Viewpoints the server lists as REQUESTED, including those of other clients, or None if the list
+            could not be read.
+    """
+
+    elapsed: float
+    level: float
+    in_flight: int
+    requested: Optional[int]
+
+
+@dataclass
+class _PendingViewpoint:
+    """
+    A viewpoint created by an open-loop step that has not reached a terminal status.
+
+    Attributes:
+        level: The creation rate of the step the viewpoint was created in.
+        image_key: The key of the image the viewpoint was created for.
+        size_class: The size class of the image.
+        start: Monotonic time the create request was sent.
+        polls: Number of status polls made.
+    """
+
+    level: float
+    image_key: str
+    size_class: str
+    start: float
+    polls: int = 0
+
+
+class IngestBenchmark:
+    """
+    :class:`IngestBenchmark` measures how long viewpoints take to become READY as the load of viewpoint creation rises,
+    polling each viewpoint every `poll_interval` seconds until it is READY or FAILED and then deleting it, cycling
+    through the test images so every image size is covered. Meanwhile the server's backlog of REQUESTED viewpoints is
+    sampled.
+
+    :meth:`run` is closed-loop: each step keeps a fixed number of viewpoints ingesting at once and only creates the
+    next when one finishes, so the benchmark's own backlog is capped at the concurrency level and a slow server shows
+    up as a longer time to READY and fewer READY per second. :meth:`run_open_loop` creates viewpoints at a fixed rate
+    whatever their progress, so a backlog that keeps growing within a step shows the ingest rate the server cannot
+    sustain.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        bucket: str,
+        image_keys: Sequence[str],
+        image_sizes: Optional[Dict[str, int]] = None,
+        tile_size: int = 512,
+        range_adjustment: str = "NONE",
+        poll_interval: float = 0.25,
+        ready_timeout: float = 900.0,
+        backlog_interval: float = 5.0,
+        list_page_size: int = 100,
+        max_workers: int = 32,
+    ) -> None:
+        """
+        Initialize the benchmark.
+
+        :param endpoint: The base URL of the tile server.
+        :param bucket: The bucket containing the test images.
+        :param image_keys: The keys of the images to create viewpoints for.
+        :param image_sizes: The size in bytes of each image, used to report results by image size class.
+        :param tile_size: The tile size viewpoints are created with.
+        :param range_adjustment: The range adjustment viewpoints are created with.
+        :param poll_interval: Seconds between status polls of a viewpoint, the resolution of the time to READY.
+        :param ready_timeout: Seconds to wait for a viewpoint to reach a terminal status before giving up on it.
+        :param backlog_interval: Seconds between samples of the server's backlog.
+        :param list_page_size: Viewpoints requested per page when counting the backlog.
+        :param max_workers: Create requests, and status polls, an open-loop step sends at once.
+        """
+        if not image_keys:
+            raise ValueError("No test images specified for the ingest benchmark")
+        self.viewpoints_url = f"{endpoint.rstrip('/')}/viewpoints"
+        self.bucket = bucket
+        self.image_keys = list(image_keys)
+        self.image_sizes = image_sizes or {}
+        self.tile_size = tile_size
+        self.range_adjustment = range_adjustment
+        self.poll_interval = poll_interval
+        self.ready_timeout = ready_timeout
+        self.backlog_interval = backlog_interval
+        self.list_page_size = list_page_size
+        self.max_workers = max_workers
+        self.samples: List[IngestSample] = []
+        self.backlog: List[BacklogSample] = []
+        self.mode = "closed_loop"
+        self._lock = threading.Lock()
+        self._sessions = threading.local()
+        self._images = itertools.cycle(self.image_keys)
+        self._step_durations: Dict[float, float] = {}
+        self._in_flight = 0
+        self._level = 0.0
+        self._start = 0.0
+
+    def run(self, concurrency_levels: Iterable[int] = (1, 2, 4, 8, 16), step_duration: float = 120.0) -> Dict[str, Any]:
+        """
+        Run every concurrency level in turn, closed-loop. A step stops starting new viewpoints after `step_duration`
+        seconds and ends once the viewpoints it started have reached a terminal status.
+
+        :param concurrency_levels: The numbers of viewpoints created at once, in the order they are run.
+        :param step_duration: Seconds each level keeps creating viewpoints for.
+        :return: The summary of every step, see :meth:`summary`.
+        """
+        self.mode = "closed_loop"
+        return self._run_steps(concurrency_levels, step_duration, self._run_closed_loop_step)
+
+    def run_open_loop(
+        self, creation_rates: Iterable[float] = (0.1, 0.2, 0.5, 1.0), step_duration: float = 120.0
+    ) -> Dict[str, Any]:
+        """
+        Run every creation rate in turn, open-loop. Viewpoints are created on a fixed schedule whether or not the
+        earlier ones are READY, and polled separately from their creation. A step stops creating viewpoints after
+        `step_duration` seconds and ends once the viewpoints it created have reached a terminal status.
+
+        :param creation_rates: The viewpoints created per second, in the order they are run.
+        :param step_duration: Seconds each rate keeps creating viewpoints for.
+        :return: The summary of every step, see :meth:`summary`.
+        """
+        creation_rates = list(creation_rates)
+        if any(creation_rate <= 0 for creation_rate in creation_rates):
+            raise ValueError(f"Creation rates must be positive, got {creation_rates}")
+        self.mode = "open_loop"
+        return self._run_steps(creation_rates, step_duration, self._run_open_loop_step)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the samples of every step.
+
+        :return: For every concurrency level, or creation rate when open-loop, the count of each outcome, the fraction
+            READY, the time to READY percentiles in seconds overall and by image size class, the READY viewpoints per
+            second, the most viewpoints in flight, and the backlog growth in viewpoints per minute. The raw backlog
+            samples are included for plotting.
+        """
+        level_name = "creation_rate" if self.mode == "open_loop" else "concurrency"
+        steps = []
+        for level in sorted({sample.level for sample in self.samples}):
+            samples = [sample for sample in self.samples if sample.level == level]
+            outcomes = {outcome: sum(sample.outcome == outcome for sample in samples) for outcome in INGEST_OUTCOMES}
+            ready = [sample for sample in samples if sample.outcome == "READY"]
+            by_size_class = {}
+            for size_class in sorted({sample.size_class for sample in ready}):
+                by_size_class[size_class] = _time_to_ready_summary(
+                    [sample for sample in ready if sample.size_class == size_class]
+                )
+            backlog = [sample for sample in self.backlog if sample.level == level]
+            step_time = self._step_durations.get(level, 0.0)
+            steps.append(
+                {
+                    level_name: level,
+                    "viewpoints": len(samples),
+                    "outcomes": outcomes,
+                    "ready_fraction": len(ready) / len(samples) if samples else 0.0,
+                    "time_to_ready_seconds": _time_to_ready_summary(ready),
+                    "time_to_ready_by_size_class": by_size_class,
+                    "duration": step_time,
+                    "ready_per_second": len(ready) / step_time if step_time else 0.0,
+                    "max_in_flight": max((b.in_flight for b in backlog), default=0),
+                    "backlog_growth_per_minute": _backlog_slope(backlog) * 60,
+                    "max_requested": max((b.requested for b in backlog if b.requested is not None), default=None),
+                }
+            )
+        return {
+            "mode": self.mode,
+            "poll_interval": self.poll_interval,
+            "steps": steps,
+            "backlog": [[b.elapsed, b.level, b.in_flight, b.requested] for b in self.backlog],
+        }
+
+    def _run_steps(
+        self, levels: Iterable[float], step_duration: float, run_step: Callable[[float, float], None]
+    ) -> Dict[str, Any]:
+        """
+        Run every step in turn while the backlog is sampled.
+
+        :param levels: The concurrency levels or creation rates of the steps.
+        :param step_duration: Seconds each step keeps creating viewpoints for.
+        :param run_step: Runs one step, given its level and duration.
+        :return: The summary of every step, see :meth:`summary`.
+        """
+        self._start = time.monotonic()
+        stopped = threading.Event()
+        sampler = threading.Thread(target=self._sample_backlog, args=(stopped,), daemon=True)
+        sampler.start()
+        try:
+            for level in levels:
+                self._level = level
+                step_start = time.monotonic()
+                run_step(level, step_duration)
+                self._step_durations[level] = self._step_durations.get(level, 0.0) + time.monotonic() - step_start
+        finally:
+            stopped.set()
+            sampler.join()
+        return self.summary()
+
+    def _run_closed_loop_step(self, concurrency: float, step_duration: float) -> None:
+        """
+        Keep `concurrency` viewpoints ingesting at once for `step_duration` seconds.
+
+        :param concurrency: The number of viewpoints created at once.
+        :param step_duration: Seconds the step keeps creating viewpoints for.
+        """
+        logging.info(f"Creating viewpoints {concurrency} at a time for {step_duration:.0f}s")
+        deadline = time.monotonic() + step_duration
+        with ThreadPoolExecutor(max_workers=int(concurrency)) as executor:
+            for future in [executor.submit(self._create_until, concurrency, deadline) for _ in range(int(concurrency))]:
+                future.result()
+
+    def _run_open_loop_step(self, creation_rate: float, step_duration: float) -> None:
+        """
+        Create `creation_rate` viewpoints per second for `step_duration` seconds, while a separate thread polls every
+        viewpoint created and not yet finished.
+
+        :param creation_rate: The number of viewpoints created per second.
+        :param step_duration: Seconds the step keeps creating viewpoints for.
+        """
+        logging.info(f"Creating {creation_rate} viewpoints per second for {step_duration:.0f}s")
+        pending: Dict[str, _PendingViewpoint] = {}
+        created = threading.Event()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            poller = threading.Thread(target=self._poll_until_done, args=(pending, created), daemon=True)
+            poller.start()
+            creations = []
+            step_start = time.monotonic()
+            for index in itertools.count():
+                if index / creation_rate >= step_duration:
+                    break
+                # Creations follow the schedule even when earlier creates are slow, so the in flight count can grow
+                delay = step_start + index / creation_rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                with self._lock:
+                    image_key = next(self._images)
+                creations.append(executor.submit(self._create_pending, creation_rate, image_key, pending))
+            for future in creations:
+                future.result()
+            created.set()
+            poller.join()
+
+    def _create_until(self, concurrency: float, deadline: float) -> None:
+        """
+        Create viewpoints one after another until the deadline.
+
+        :param concurrency: The concurrency level of the step.
+        :param deadline: Monotonic time after which no new viewpoint is created.
+        """
+        while time.monotonic() < deadline:
+            with self._lock:
+                image_key = next(self._images)
+            sample = self._ingest(concurrency, image_key)
+            with self._lock:
+                self.samples.append(sample)
+            if sample.outcome == "CREATE_FAILED":
+                # Do not spin on a server that is rejecting requests
+                time.sleep(self.poll_interval)
+
+    def _ingest(self, concurrency: float, image_key: str) -> IngestSample:
+        """
+        Create a viewpoint, poll it until it reaches a terminal status, and delete it.
+
+        :param concurrency: The concurrency level of the step.
+        :param image_key: The key of the image to create the viewpoint for.
+        :return: The outcome of the viewpoint.
+        """
+        size_class = image_size_class(self.image_sizes.get(image_key))
+        start = time.monotonic()
+        viewpoint_id = self._create_viewpoint(image_key)
+        if viewpoint_id is None:
+            return IngestSample(concurrency, image_key, size_class, "CREATE_FAILED", time.monotonic() - start, 0)
+
+        outcome, polls = "TIMEOUT", 0
+        try:
+            while time.monotonic() - start < self.ready_timeout:
+                time.sleep(self.poll_interval)
+                polls += 1
+                status = self._viewpoint_status(viewpoint_id)
+                if status in ("READY", "FAILED"):
+                    outcome = status
+                    break
+            elapsed = time.monotonic() - start
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        self._delete_viewpoint(viewpoint_id)
+        return IngestSample(concurrency, image_key, size_class, outcome, elapsed, polls)
+
+    def _create_pending(self, creation_rate: float, image_key: str, pending: Dict[str, _PendingViewpoint]) -> None:
+        """
+        Create a viewpoint of an open-loop step and hand it to the poller.
+
+        :param creation_rate: The creation rate of the step.
+        :param image_key: The key of the image to create the viewpoint for.
+        :param pending: The viewpoints being polled, keyed by viewpoint ID.
+        """
+        viewpoint = _PendingViewpoint(creation_rate, image_key, image_size_class(self.image_sizes.get(image_key)), 0.0)
+        viewpoint.start = time.monotonic()
+        viewpoint_id = self._create_viewpoint(image_key)
+        with self._lock:
+            if viewpoint_id is None:
+                self.samples.append(
+                    IngestSample(
+                        creation_rate,
+                        image_key,
+                        viewpoint.size_class,
+                        "CREATE_FAILED",
+                        time.monotonic() - viewpoint.start,
+                        0,
+                    )
+                )
+            else:
+                pending[viewpoint_id] = viewpoint
+
+    def _poll_until_done(self, pending: Dict[str, _PendingViewpoint], created: threading.Event) -> None:
+        """
+        Poll every pending viewpoint each `poll_interval` seconds until all of the step's viewpoints have been created
+        and have reached a terminal status.
+
+        :param pending: The viewpoints being polled, keyed by viewpoint ID.
+        :param created: Set once every viewpoint of the step has been created.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                done = created.is_set()
+                with self._lock:
+                    viewpoints = list(pending.items())
+                if done and not viewpoints:
+                    return
+                sweep_start = time.monotonic()
+                list(executor.map(lambda item: self._poll_pending(*item, pending), viewpoints))
+                time.sleep(max(0.0, self.poll_interval - (time.monotonic() - sweep_start)))
+
+    def _poll_pending(self, viewpoint_id: str, viewpoint: _PendingViewpoint, pending: Dict[str, _PendingViewpoint]) -> None:
+        """
+        Poll a viewpoint of an open-loop step once, and record and delete it once it is READY, FAILED, or timed out.
+
+        :param viewpoint_id: The ID of the viewpoint.
+        :param viewpoint: The viewpoint.
+        :param pending: The viewpoints being polled, keyed by viewpoint ID.
+        """
+        viewpoint.polls += 1
+        status = self._viewpoint_status(viewpoint_id)
+        elapsed = time.monotonic() - viewpoint.start
+        if status in ("READY", "FAILED"):
+            outcome = status
+        elif elapsed >= self.ready_timeout:
+            outcome = "TIMEOUT"
+        else:
+            return
+        with self._lock:
+            del pending[viewpoint_id]
+            self._in_flight -= 1
+            self.samples.append(
+                IngestSample(viewpoint.level, viewpoint.image_key, viewpoint.size_class, outcome, elapsed, viewpoint.polls)
+            )
+        self._delete_viewpoint(viewpoint_id)
+
+    def _session(self) -> Session:
+        """
+        :return: The HTTP session of the calling thread.
+        """
+        session = getattr(self._sessions, "session", None)
+        if session is None:
+            session = self._sessions.session = Session()
+        return session
+
+    def _create_viewpoint(self, image_key: str) -> Optional[str]:
+        """
+        Request a new viewpoint, counting it as in flight once the request is accepted.
+
+        :param image_key: The key of the image to create the viewpoint for.
+        :return: The ID of the viewpoint, or None if the request failed.
+        """
+        viewpoint_id = token_hex(16)
+        try:
+            response = self._session().post(
+                self.viewpoints_url,
+                json={
+                    "viewpoint_id": viewpoint_id,
+                    "viewpoint_name": f"IngestBenchmark-Viewpoint-{viewpoint_id}",
+                    "bucket_name": self.bucket,
+                    "object_key": image_key,
+                    "tile_size": self.tile_size,
+                    "range_adjustment": self.range_adjustment,
+                },
+            )
+            response.raise_for_status()
+        except RequestException as e:
+            logging.warning(f"Failed to create a viewpoint of {image_key}: {e}")
+            return None
+        with self._lock:
+            self._in_flight += 1
+        return viewpoint_id
+
+    def _viewpoint_status(self, viewpoint_id: str) -> Optional[str]:
+        """
+        :param viewpoint_id: The ID of the viewpoint.
+        :return: The status of the viewpoint, or None if it could not be read.
+        """
+        try:
+            return self._session().get(f"{self.viewpoints_url}/{viewpoint_id}").json().get("viewpoint_status")
+        except (RequestException, ValueError):
+            return None
+
+    def _delete_viewpoint(self, viewpoint_id: str) -> None:
+        """
+        :param viewpoint_id: The ID of the viewpoint to delete.
+        """
+        try:
+            self._session().delete(f"{self.viewpoints_url}/{viewpoint_id}")
+        except RequestException as e:
+            logging.warning(f"Failed to delete viewpoint {viewpoint_id}: {e}")
+
+    def _sample_backlog(self, stopped: threading.Event) -> None:
+        """
+        Sample the backlog every `backlog_interval` seconds until stopped.
+
+        :param stopped: Set when the benchmark is over.
+        """
+        session = Session()
+        while not stopped.is_set():
+            requested = self._count_requested(session)
+            with self._lock:
+                self.backlog.append(BacklogSample(time.monotonic() - self._start, self._level, self._in_flight, requested))
+            stopped.wait(self.backlog_interval)
+
+    def _count_requested(self, session: Session) -> Optional[int]:
+        """
+        Count the viewpoints the server lists as REQUESTED, following every page of the list.
+
+        :param session: The HTTP session of the sampler.
+        :return: The number of REQUESTED viewpoints, or None if the list could not be read.
+        """
+        requested = 0
+        params: Dict[str, Any] = {"max_results": self.list_page_size}
+        try:
+            while True:
+                response = session.get(self.viewpoints_url, params=params)
+                response.raise_for_status()
+                page = response.json()
+                requested += sum(item.get("viewpoint_status") == "REQUESTED" for item in page.get("items", []))
+                if not page.get("next_token"):
+                    return requested
+                params["next_token"] = page["next_token"]
+        except (RequestException, ValueError) as e:
+            logging.debug(f"Failed to count the viewpoint backlog: {e}")
+            return None
+
+
+def _time_to_ready_summary(samples: List[IngestSample]) -> Dict[str, float]:
+    """
+    :param samples: The samples of viewpoints that became READY.
+    :return: The count, min, mean, max and percentiles of their time to READY in seconds.
+    """
+    histogram = HdrHistogram()
+    for sample in samples:
+        histogram.record(sample.time_to_status * 1000)
+    return {
+        name: value / 1000 if name != "count" else value
+        for name, value in histogram.summary(percentiles=(50, 90, 99)).items()
+    }
+
+
+def _backlog_slope(samples: List[BacklogSample]) -> float:
+    """
+    :param samples: The backlog samples of one step, in order.
+    :return: The least squares slope of the server's REQUESTED count, or of the benchmark's own in flight count when
+        the server's could not be read, in viewpoints per second.
+    """
+    points = [(s.elapsed, s.requested if s.requested is not None else s.in_flight) for s in samples]
+    if len(points) < 2:
+        return 0.0
+    mean_t = sum(t for t, _ in points) / len(points)
+    mean_b = sum(b for _, b in points) / len(points)
+    variance = sum((t - mean_t) ** 2 for t, _ in points)
+    return sum((t - mean_t) * (b - mean_b) for t, b in points) / variance if variance else 0.0
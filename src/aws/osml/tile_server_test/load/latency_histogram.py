@@ -0,0 +1,264 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import base64
+import json
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+HISTOGRAM_FORMAT_VERSION = 1
+
+
+class HdrHistogram:
+    """
+    :class:`HdrHistogram` is a high dynamic range histogram of latencies in microseconds. Values are grouped into
+    log-linear buckets that keep every recorded value within 1 part in 2^(`sub_bucket_bits` - 1), about 0.1% by
+    default, of its true value from one microsecond up to hours, so tail percentiles such as p99.9 are not rounded
+    away. Counts are kept sparsely, recording is O(1), and histograms with the same precision can be merged exactly.
+    Other non-negative quantities, such as payload sizes in bytes, can be recorded by changing `unit_scale`.
+    """
+
+    def __init__(self, sub_bucket_bits: int = 11, unit_scale: int = 1000) -> None:
+        """
+        Initialize an empty histogram.
+
+        :param sub_bucket_bits: Number of bits of precision kept for each value. 11 bits gives 3 significant figures.
+        :param unit_scale: Number of stored integer units in each recorded unit, 1000 to store milliseconds as
+            microseconds.
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self.unit_scale = unit_scale
+        self._half_bits = sub_bucket_bits - 1
+        self.counts: Dict[int, int] = {}
+        self.total_count = 0
+        self.min_value: Optional[int] = None
+        self.max_value = 0
+        self._total_value = 0
+
+    def record(self, value_ms: float, count: int = 1) -> None:
+        """
+        Record a latency.
+
+        :param value_ms: The latency in milliseconds, or the value in recorded units when `unit_scale` is changed.
+        :param count: Number of times the value was observed.
+        """
+        value = max(int(value_ms * self.unit_scale), 0)
+        bucket = max(value.bit_length() - self.sub_bucket_bits, 0)
+        index = (bucket << self._half_bits) + (value >> bucket)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += count
+        self._total_value += value * count
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+
+    def merge(self, other: "HdrHistogram") -> None:
+        """
+        Add every value recorded by another histogram to this one.
+
+        :param other: A histogram with the same precision.
+        """
+        if other.sub_bucket_bits != self.sub_bucket_bits or other.unit_scale != self.unit_scale:
+            raise ValueError("Cannot merge histograms with different precision or units")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += other.total_count
+        self._total_value += other._total_value
+        if other.min_value is not None and (self.min_value is None or other.min_value < self.min_value):
+            self.min_value = other.min_value
+        self.max_value = max(self.max_value, other.max_value)
+
+    def value_at_percentile(self, percentile: float) -> float:
+        """
+        Find the latency at or below which the given percentage of recorded values fall.
+
+        :param percentile: The percentile, between 0 and 100.
+        :return: The latency in milliseconds, or 0 if nothing was recorded.
+        """
+        if self.total_count == 0:
+            return 0.0
+        target = max(min(percentile, 100.0) / 100.0 * self.total_count, 1)
+        running = 0
+        for index in sorted(self.counts):
+            running += self.counts[index]
+            if running >= target:
+                return min(self._highest_equivalent_value(index), self.max_value) / self.unit_scale
+        return self.max_value / self.unit_scale
+
+    @property
+    def mean(self) -> float:
+        """
+        :return: The mean recorded latency in milliseconds.
+        """
+        return self._total_value / self.total_count / self.unit_scale if self.total_count else 0.0
+
+    @property
+    def total(self) -> float:
+        """
+        :return: The sum of every recorded value, in recorded units.
+        """
+        return self._total_value / self.unit_scale
+
+    def summary(self, percentiles: Iterable[float] = (50, 90, 99, 99.9, 99.99)) -> Dict[str, float]:
+        """
+        Summarize the histogram.
+
+        :param percentiles: The percentiles to report.
+        :return: The count, min, mean, max and the requested percentiles in milliseconds.
+        """
+        result = {
+            "count": self.total_count,
+            "min": (self.min_value or 0) / self.unit_scale,
+            "mean": self.mean,
+            "max": self.max_value / self.unit_scale,
+        }
+        for percentile in percentiles:
+            result[f"p{percentile:g}"] = self.value_at_percentile(percentile)
+        return result
+
+    def encode(self) -> str:
+        """
+        Serialize the histogram into a compact string. Bucket indexes are delta encoded and compressed so that
+        histograms with long tails remain small.
+
+        :return: The base64 encoded histogram.
+        """
+        flattened: List[int] = []
+        previous = 0
+        for index in sorted(self.counts):
+            flattened.extend([index - previous, self.counts[index]])
+            previous = index
+        payload = [
+            self.sub_bucket_bits,
+            self.total_count,
+            self.min_value or 0,
+            self.max_value,
+            self._total_value,
+            flattened,
+            self.unit_scale,
+        ]
+        return base64.b64encode(zlib.compress(json.dumps(payload, separators=(",", ":")).encode())).decode()
+
+    @classmethod
+    def decode(cls, encoded: str) -> "HdrHistogram":
+        """
+        Rebuild a histogram serialized by :meth:`encode`.
+
+        :param encoded: The encoded histogram.
+        :return: The histogram.
+        """
+        payload = json.loads(zlib.decompress(base64.b64decode(encoded)))
+        sub_bucket_bits, total_count, min_value, max_value, total_value, flattened = payload[:6]
+        # Histograms encoded before the unit scale was stored always held microseconds
+        histogram = cls(sub_bucket_bits, payload[6] if len(payload) > 6 else 1000)
+        index = 0
+        for i in range(0, len(flattened), 2):
+            index += flattened[i]
+            histogram.counts[index] = flattened[i + 1]
+        histogram.total_count = total_count
+        histogram.min_value = min_value if total_count else None
+        histogram.max_value = max_value
+        histogram._total_value = total_value
+        return histogram
+
+    def _highest_equivalent_value(self, index: int) -> int:
+        bucket = max((index >> self._half_bits) - 1, 0)
+        sub_bucket = index - (bucket << self._half_bits)
+        return ((sub_bucket + 1) << bucket) - 1
+
+
+class LatencyRecorder:
+    """
+    :class:`LatencyRecorder` keeps one :class:`HdrHistogram` per (request type, request name) pair reported through
+    Locust's request event. Failed requests are only counted so that fast errors do not pull the latency distribution
+    down. Workers periodically export and reset their histograms so the master can merge them into the run totals.
+    """
+
+    # The unit of the values held by the histograms, included in exports
+    unit = "us"
+
+    def __init__(self) -> None:
+        self.histograms: Dict[str, HdrHistogram] = {}
+        self.failures: Dict[str, int] = {}
+
+    @staticmethod
+    def key(request_type: str, name: str) -> str:
+        return f"{request_type} {name}"
+
+    def on_request(self, request_type: str, name: str, response_time: float, exception: Any = None, **kwargs) -> None:
+        """
+        Locust request event listener.
+
+        :param request_type: The HTTP method or other request type.
+        :param name: The name the request is reported under.
+        :param response_time: The response time in milliseconds.
+        :param exception: The failure, if the request failed.
+        :param kwargs: Additional keyword arguments (unused).
+        """
+        key = self.key(request_type, name)
+        if exception is not None:
+            self.failures[key] = self.failures.get(key, 0) + 1
+            return
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = HdrHistogram()
+        histogram.record(response_time)
+
+    def export(self, reset: bool = False) -> Dict[str, Any]:
+        """
+        Export every histogram in its encoded form.
+
+        :param reset: Clear the recorder after exporting, used by workers sending deltas to the master.
+        :return: A JSON serializable document that can be merged with :meth:`merge_export`.
+        """
+        exported = {
+            "version": HISTOGRAM_FORMAT_VERSION,
+            "unit": self.unit,
+            "histograms": {key: histogram.encode() for key, histogram in self.histograms.items()},
+            "failures": dict(self.failures),
+        }
+        if reset:
+            self.histograms = {}
+            self.failures = {}
+        return exported
+
+    def merge_export(self, exported: Dict[str, Any]) -> None:
+        """
+        Merge a document created by :meth:`export`, from a worker or from an earlier run.
+
+        :param exported: The exported histograms.
+        """
+        if exported.get("version") != HISTOGRAM_FORMAT_VERSION:
+            raise ValueError(f"Unsupported histogram export version {exported.get('version')}")
+        for key, encoded in exported.get("histograms", {}).items():
+            histogram = HdrHistogram.decode(encoded)
+            if key in self.histograms:
+                self.histograms[key].merge(histogram)
+            else:
+                self.histograms[key] = histogram
+        for key, count in exported.get("failures", {}).items():
+            self.failures[key] = self.failures.get(key, 0) + count
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: The summary of every histogram, with failure counts, keyed by request type and name. Requests that
+            only ever failed are included with an empty histogram.
+        """
+        return {
+            key: {**self.histograms.get(key, HdrHistogram()).summary(), "failures": self.failures.get(key, 0)}
+            for key in sorted(set(self.histograms) | set(self.failures))
+        }
+
+
+def merge_histogram_files(paths: Iterable[str]) -> LatencyRecorder:
+    """
+    Merge the histogram exports written by several load test runs.
+
+    :param paths: Paths to files written with :meth:`LatencyRecorder.export`.
+    :return: A recorder containing the combined histograms.
+    """
+    recorder = LatencyRecorder()
+    for path in paths:
+        with open(path, "r") as export_file:
+            recorder.merge_export(json.load(export_file))
+    return recorder
@@ -0,0 +1,105 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+from typing import Any, Dict, Iterable, Optional
+
+from locust.stats import RequestStats, StatsEntry
+
+from .crop_scaling import CropScalingRecorder
+from .dimensions import DimensionRecorder
+from .latency_histogram import HdrHistogram, LatencyRecorder
+from .tile_encodings import PayloadRecorder
+
+# Percentiles reported for every endpoint in the load test results
+RESULT_PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+def summarize_load_test(
+    stats: RequestStats,
+    recorder: LatencyRecorder,
+    payload_recorder: Optional[PayloadRecorder] = None,
+    dimension_recorder: Optional[DimensionRecorder] = None,
+    crop_recorder: Optional[CropScalingRecorder] = None,
+    percentiles: Iterable[float] = RESULT_PERCENTILES,
+) -> Dict[str, Any]:
+    """
+    Build the structured results of a load test from Locust's request statistics. Percentiles are taken from the
+    high resolution latency histograms when they are available, and from Locust's coarser response time buckets
+    otherwise.
+
+    :param stats: The request statistics of the master, or of the single process running the test.
+    :param recorder: The latency histograms recorded during the test.
+    :param payload_recorder: The tile payload sizes recorded during the test, reported by encoding and tile size.
+    :param dimension_recorder: The latencies of tagged requests recorded during the test, reported as a long-format
+        table by dimension.
+    :param crop_recorder: The crop latencies recorded during the test, reported against window area.
+    :param percentiles: The percentiles to report.
+    :return: A JSON serializable document with the results of every endpoint and of the test as a whole, and the
+        exported latency histograms.
+    """
+    percentiles = tuple(percentiles)
+    endpoints = [
+        _summarize_entry(entry, recorder.histograms.get(LatencyRecorder.key(entry.method, entry.name)), percentiles)
+        for entry in sorted(stats.entries.values(), key=lambda e: (e.name, e.method))
+    ]
+
+    total_histogram = HdrHistogram()
+    for histogram in recorder.histograms.values():
+        total_histogram.merge(histogram)
+
+    duration = test_duration(stats)
+    results = {
+        "duration": duration,
+        "endpoints": endpoints,
+        "total": _summarize_entry(stats.total, total_histogram if total_histogram.total_count else None, percentiles),
+        # The full distributions, so results from different runs can be compared statistically
+        "latency_histograms": recorder.export(),
+    }
+    if payload_recorder is not None:
+        results["tile_payloads"] = payload_recorder.throughput(duration)
+    if dimension_recorder is not None:
+        results["dimensions"] = dimension_recorder.table()
+    if crop_recorder is not None and (crop_recorder.histograms or crop_recorder.failures):
+        results["crop_scaling"] = crop_recorder.curve()
+    return results
+
+
+def test_duration(stats: RequestStats) -> float:
+    """
+    :param stats: The request statistics of the test.
+    :return: Seconds between the start of the test and its last request.
+    """
+    if stats.total.last_request_timestamp is None:
+        return 0.0
+    return max(stats.total.last_request_timestamp - stats.total.start_time, 0.0)
+
+
+def _summarize_entry(entry: StatsEntry, histogram: Optional[HdrHistogram], percentiles: Iterable[float]) -> Dict[str, Any]:
+    """
+    Summarize the statistics of one endpoint.
+
+    :param entry: Locust's statistics for the endpoint.
+    :param histogram: The high resolution latency histogram of the endpoint, if one was recorded.
+    :param percentiles: The percentiles to report.
+    :return: The request counts, throughput, and latencies in milliseconds of the endpoint.
+    """
+    summary = {
+        "method": entry.method,
+        "name": entry.name,
+        "requests": entry.num_requests,
+        "failures": entry.num_failures,
+        "requests_per_second": entry.total_rps,
+        "failures_per_second": entry.total_fail_per_sec,
+        "avg_content_length": entry.avg_content_length,
+        "latency_ms": {
+            "min": entry.min_response_time or 0,
+            "mean": entry.avg_response_time,
+            "max": entry.max_response_time,
+        },
+    }
+    for percentile in percentiles:
+        if histogram is not None:
+            value = histogram.value_at_percentile(percentile)
+        else:
+            value = entry.get_response_time_percentile(percentile / 100) if entry.num_requests else 0
+        summary["latency_ms"][f"p{percentile:g}"] = value
+    return summary
@@ -1,19 +1,217 @@
 #  Copyright 2024 Amazon.com, Inc. or its affiliates.
 
+import json
 import logging
+import os
 import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
 
+# Locust options that only apply to the master (or a standalone process) and are removed from the worker environment
+MASTER_ONLY_ENV_VARS = [
+    "LOCUST_HEADLESS",
+    "LOCUST_RUN_TIME",
+    "LOCUST_USERS",
+    "LOCUST_SPAWN_RATE",
+    "LOCUST_CSV",
+    "LOCUST_HTML",
+    "LOCUST_EXPECT_WORKERS",
+    "LOCUST_EXPECT_WORKERS_MAX_WAIT",
+    "LOCUST_LOAD_RESULTS_FILE",
+]
 
-def run_load_test(locust_run_time: str = "") -> None:
+# Seconds the master waits for every worker to connect before giving up, unless LOCUST_EXPECT_WORKERS_MAX_WAIT is set
+DEFAULT_EXPECT_WORKERS_MAX_WAIT = "120"
+
+# Seconds between checks that the worker processes are still running
+WORKER_POLL_INTERVAL = 1.0
+
+# Exit codes of a Locust run that finished: 1 means some requests failed (--exit-code-on-error), not that Locust did
+LOCUST_FINISHED_EXIT_CODES = (0, 1)
+
+
+def resolve_worker_count(locust_workers: int) -> int:
+    """
+    Determine how many Locust worker processes to start.
+
+    :param locust_workers: The requested number of workers, 0 to run a single process or -1 for one per CPU core.
+    :return: The number of workers to start, 0 when running a single process.
+    """
+    if locust_workers < 0:
+        return os.cpu_count() or 1
+    return locust_workers
+
+
+def run_load_test(
+    locust_run_time: str = "", locust_workers: int = 0, worker_shutdown_timeout: float = 30.0
+) -> Dict[str, Any]:
+    """
+    Run the Locust load test. Because gevent runs every simulated user on a single core, the test can be distributed
+    across a master and several worker processes on this machine; the master waits for every worker to connect before
+    starting and the workers are shut down when the master exits. The master writes its results to a file through
+    --load_results_file, which is read back once it exits. The results are returned even when requests failed, so
+    the failures can be inspected; only a Locust run that crashed raises.
+
+    :param locust_run_time: The duration of the test, used for logging.
+    :param locust_workers: The number of worker processes, 0 to run a single process or -1 for one per CPU core.
+    :param worker_shutdown_timeout: Seconds to wait for workers to exit after the master before killing them.
+    :return: The per-endpoint throughput and latency results of the test, including the failed request counts.
+    """
     log_run_config = f"for {locust_run_time}" if locust_run_time else "UI on http://localhost:8089"
-    logging.info(f"Running Tile Server locust load test {log_run_config}")
+    num_workers = resolve_worker_count(locust_workers)
+    master_env = dict(os.environ)
+    results_fd, default_results_file = tempfile.mkstemp(prefix="locust-results-", suffix=".json")
+    os.close(results_fd)
+    results_file = master_env.setdefault("LOCUST_LOAD_RESULTS_FILE", default_results_file)
+    try:
+        if num_workers == 0:
+            logging.info(f"Running Tile Server locust load test {log_run_config}")
+            locust_exit_code = _wait_for_locust(
+                subprocess.Popen("locust", env=master_env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            )
+        else:
+            logging.info(f"Running Tile Server locust load test {log_run_config} with {num_workers} workers")
+            locust_exit_code = _run_distributed(num_workers, master_env, worker_shutdown_timeout)
+        results = _read_results(results_file)
+        if locust_exit_code not in LOCUST_FINISHED_EXIT_CODES or (locust_exit_code and not results):
+            raise RuntimeError(f"Exit code: {locust_exit_code}.")
+        return results
+    finally:
+        os.remove(default_results_file)
 
-    child_process = subprocess.Popen("locust", stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    with child_process.stdout:
-        for line in iter(child_process.stdout.readline, b"\n"):
-            logging.info(line)
-    locust_exit_code = child_process.returncode
-    if locust_exit_code:
-        raise RuntimeError(f"Exit code: {locust_exit_code}.")
-    else:
+
+def _run_distributed(num_workers: int, master_env: Dict[str, str], worker_shutdown_timeout: float) -> int:
+    """
+    Run the load test on a Locust master and the given number of local worker processes. The output of every
+    worker is forwarded to the log. The master gives up if the workers have not all connected within
+    LOCUST_EXPECT_WORKERS_MAX_WAIT seconds, and is stopped if every worker exits before it, e.g. because the
+    locustfile failed to import.
+
+    :param num_workers: The number of worker processes to start.
+    :param master_env: The environment of the master process.
+    :param worker_shutdown_timeout: Seconds to wait for workers to exit after the master before killing them.
+    :return: The exit code of the master.
+    """
+    master_env = dict(master_env)
+    master_env["LOCUST_EXPECT_WORKERS"] = str(num_workers)
+    master_env.setdefault("LOCUST_EXPECT_WORKERS_MAX_WAIT", DEFAULT_EXPECT_WORKERS_MAX_WAIT)
+    # Open-loop tests run one arrival generator per worker unless told otherwise
+    master_env.setdefault("LOCUST_ARRIVAL_GENERATORS", str(num_workers))
+    # Every worker pools viewpoints of its own share of the test images
+    master_env.setdefault("LOCUST_VIEWPOINT_POOL_WORKERS", str(num_workers))
+    master = subprocess.Popen(["locust", "--master"], env=master_env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+    worker_env = {key: value for key, value in master_env.items() if key not in MASTER_ONLY_ENV_VARS}
+    workers = [
+        subprocess.Popen(
+            ["locust", "--worker", "--master-host", "127.0.0.1"],
+            env=worker_env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        for _ in range(num_workers)
+    ]
+    for index, worker in enumerate(workers):
+        threading.Thread(target=_forward_output, args=(worker, f"[worker {index}] "), daemon=True).start()
+    threading.Thread(target=_watch_workers, args=(master, workers), daemon=True).start()
+    try:
+        return _wait_for_locust(master)
+    finally:
+        _stop_workers(workers, worker_shutdown_timeout)
+
+
+def _read_results(results_file: str) -> Dict[str, Any]:
+    """
+    Read the results written by the Locust master when it exited.
+
+    :param results_file: The --load_results_file of the master.
+    :return: The load test results, or an empty document if the master did not write any.
+    """
+    try:
+        with open(results_file, "r") as results:
+            return json.load(results)
+    except (OSError, ValueError):
+        logging.warning(f"Locust did not write load test results to {results_file}")
+        return {}
+
+
+def _wait_for_locust(child_process: subprocess.Popen) -> int:
+    """
+    Forward the output of a Locust process to the log until it exits.
+
+    :param child_process: The Locust process, started with its output piped.
+    :return: The exit code of the process.
+    """
+    _forward_output(child_process)
+    locust_exit_code = child_process.wait()
+    if locust_exit_code == 0:
         logging.info(f"Load test succeeded with exit code: {locust_exit_code}.")
+    elif locust_exit_code in LOCUST_FINISHED_EXIT_CODES:
+        logging.warning(f"Load test finished with failed requests, exit code: {locust_exit_code}.")
+    else:
+        logging.error(f"Load test crashed with exit code: {locust_exit_code}.")
+    return locust_exit_code
+
+
+def _forward_output(child_process: subprocess.Popen, prefix: str = "") -> None:
+    """
+    Forward the output of a process to the log until it closes its output.
+
+    :param child_process: The process, started with its output piped.
+    :param prefix: Prepended to every line, to tell the processes apart.
+    :return: None
+    """
+    with child_process.stdout:
+        for line in iter(child_process.stdout.readline, b""):
+            logging.info(prefix + line.decode(errors="replace").rstrip())
+
+
+def _watch_workers(master: subprocess.Popen, workers: List[subprocess.Popen]) -> None:
+    """
+    Report workers that fail while the master is running, and stop the master once every worker has exited and one
+    of them failed, as no load can be generated. Workers exit cleanly, with code 0, when the master tells them to
+    quit, which is shortly before the master itself exits.
+
+    :param master: The master process.
+    :param workers: The worker processes.
+    :return: None
+    """
+    running = set(range(len(workers)))
+    failed = False
+    while running and master.poll() is None:
+        for index in sorted(running):
+            exit_code = workers[index].poll()
+            if exit_code is not None:
+                running.discard(index)
+                if exit_code:
+                    failed = True
+                    logging.error(f"Locust worker {index} failed with exit code {exit_code}")
+        if not running and failed and master.poll() is None:
+            logging.error("Every Locust worker has exited, stopping the master")
+            master.terminate()
+            return
+        time.sleep(WORKER_POLL_INTERVAL)
+
+
+def _stop_workers(workers: List[subprocess.Popen], timeout: float) -> None:
+    """
+    Wait for the worker processes to exit, which they do once the master quits, and terminate any that do not.
+
+    :param workers: The worker processes.
+    :param timeout: Seconds to wait for the workers to exit before terminating them.
+    :return: None
+    """
+    deadline = time.monotonic() + timeout
+    for worker in workers:
+        try:
+            worker.wait(timeout=max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            logging.warning(f"Locust worker {worker.pid} did not exit, terminating it")
+            worker.terminate()
+            try:
+                worker.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+                worker.wait()
@@ -0,0 +1,254 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import logging
+import os
+import random
+import time
+from typing import Optional, Tuple
+
+from locust import FastHttpUser, LoadTestShape, constant, events, task
+from locust.runners import MasterRunner
+from locust.util.timespan import parse_timespan
+
+from aws.osml.tile_server_test.load import worker_context
+from aws.osml.tile_server_test.load.arrival_scheduler import ArrivalScheduler, ramped_rate, schedule_lag_ms
+from aws.osml.tile_server_test.load.capacity_search import CapacitySearch, StatsWindow
+from aws.osml.tile_server_test.load.dimensions import dimensions_context
+from aws.osml.tile_server_test.load.popularity import zipf_sampler
+from aws.osml.tile_server_test.load.tile_encodings import choose_tile_encoding, parse_tile_encodings, tile_encoding_context
+from aws.osml.tile_server_test.load.tile_plans import tile_plan_cache
+from aws.osml.tile_server_test.load.viewpoint_pool import ViewpointConfig
+from aws.osml.tile_server_test.load.worker_context import RANGE_ADJUSTMENTS, TILE_SIZES, viewpoint_dimensions
+
+
+@events.init_command_line_parser.add_listener
+def _(parser):
+    parser.add_argument("--arrival_rate", type=float, default=float(os.environ.get("LOCUST_ARRIVAL_RATE", "10")))
+    parser.add_argument("--arrival_ramp_time", type=float, default=float(os.environ.get("LOCUST_ARRIVAL_RAMP_TIME", "0")))
+    parser.add_argument("--arrival_generators", type=int, default=int(os.environ.get("LOCUST_ARRIVAL_GENERATORS", "1")))
+    parser.add_argument(
+        "--arrival_max_outstanding", type=int, default=int(os.environ.get("LOCUST_ARRIVAL_MAX_OUTSTANDING", "1000"))
+    )
+    parser.add_argument(
+        "--arrival_poisson",
+        action="store_true",
+        default=os.environ.get("LOCUST_ARRIVAL_POISSON", "false").lower() == "true",
+    )
+    parser.add_argument(
+        "--capacity_search",
+        action="store_true",
+        default=os.environ.get("LOCUST_CAPACITY_SEARCH", "false").lower() == "true",
+    )
+    parser.add_argument(
+        "--capacity_start_rate", type=float, default=float(os.environ.get("LOCUST_CAPACITY_START_RATE", "10"))
+    )
+    parser.add_argument(
+        "--capacity_max_rate", type=float, default=float(os.environ.get("LOCUST_CAPACITY_MAX_RATE", "10000"))
+    )
+    parser.add_argument(
+        "--capacity_step_factor", type=float, default=float(os.environ.get("LOCUST_CAPACITY_STEP_FACTOR", "2"))
+    )
+    parser.add_argument(
+        "--capacity_step_duration", type=float, default=float(os.environ.get("LOCUST_CAPACITY_STEP_DURATION", "60"))
+    )
+    parser.add_argument("--capacity_warmup", type=float, default=float(os.environ.get("LOCUST_CAPACITY_WARMUP", "15")))
+    parser.add_argument(
+        "--capacity_p99_slo_ms", type=float, default=float(os.environ.get("LOCUST_CAPACITY_P99_SLO_MS", "1000"))
+    )
+    parser.add_argument(
+        "--capacity_max_error_rate", type=float, default=float(os.environ.get("LOCUST_CAPACITY_MAX_ERROR_RATE", "0.01"))
+    )
+    parser.add_argument(
+        "--capacity_resolution", type=float, default=float(os.environ.get("LOCUST_CAPACITY_RESOLUTION", "0.05"))
+    )
+
+
+# Message the master sends to every worker with the total arrival rate chosen by the capacity search
+CAPACITY_RATE_MESSAGE = "capacity_search_rate"
+
+# The total arrival rate currently offered by the capacity search, across every generator
+capacity_rate = 0.0
+
+
+@events.init.add_listener
+def _(environment, **kwargs):
+    """
+    This method registers the handler for the arrival rates sent by the capacity search on every runner that hosts
+    arrival generators.
+
+    :param environment: The environment object containing the runner.
+    :param kwargs: Additional keyword arguments (unused).
+    :return: None
+    """
+    if environment.runner is not None and not isinstance(environment.runner, MasterRunner):
+        environment.runner.register_message(CAPACITY_RATE_MESSAGE, _set_capacity_rate)
+
+
+def _set_capacity_rate(environment, msg, **kwargs) -> None:
+    """
+    Update the arrival rate offered by the generators on this runner.
+
+    :param environment: The environment object (unused).
+    :param msg: The message carrying the total arrival rate.
+    :param kwargs: Additional keyword arguments (unused).
+    :return: None
+    """
+    global capacity_rate
+    capacity_rate = msg.data
+
+
+class ConstantArrivalRateShape(LoadTestShape):
+    """
+    :class:`ConstantArrivalRateShape` replaces Locust's closed-loop user ramp with a fixed number of arrival
+    generators. Each generator is a :class:`TileServerOpenLoopUser` that issues requests at its share of
+    --arrival_rate regardless of how long the responses take, so the offered load stays constant as the server slows
+    down. Run one generator per worker process so the arrival rate is spread evenly across them.
+
+    With --capacity_search the shape instead drives a :class:`CapacitySearch`. Each step offers a rate for
+    --capacity_warmup plus --capacity_step_duration seconds, measures the GetTile p99 latency and error rate after the
+    warmup, and chooses the next rate until the highest rate meeting the objectives is found.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.capacity_search: Optional[CapacitySearch] = None
+        self._step_started = 0.0
+        self._step_window: Optional[StatsWindow] = None
+
+    def tick(self) -> Optional[Tuple[int, float, list]]:
+        """
+        Keep the configured number of generators running until --run-time elapses or the capacity search completes.
+
+        :return: The generator count, the rate to spawn them at, and the user class to run, or None to stop the test.
+        """
+        options = self.runner.environment.parsed_options
+        run_time = parse_timespan(options.run_time) if isinstance(options.run_time, str) else options.run_time
+        if run_time and self.get_run_time() >= run_time:
+            return None
+        if options.capacity_search and not self._tick_capacity_search(options):
+            return None
+        return options.arrival_generators, options.arrival_generators, [TileServerOpenLoopUser]
+
+    def _tick_capacity_search(self, options) -> bool:
+        """
+        Advance the capacity search and send the rate it is offering to every arrival generator.
+
+        :param options: The parsed command line options.
+        :return: False once the search is complete.
+        """
+        now = self.get_run_time()
+        if self.capacity_search is None:
+            self.capacity_search = CapacitySearch(
+                start_rate=options.capacity_start_rate,
+                max_rate=options.capacity_max_rate,
+                step_factor=options.capacity_step_factor,
+                p99_slo_ms=options.capacity_p99_slo_ms,
+                max_error_rate=options.capacity_max_error_rate,
+                resolution=options.capacity_resolution,
+            )
+            self._step_started = now
+        if not self.capacity_search.steps and not self.runner.environment.stats.get("GetTile", "GET").num_requests:
+            # Hold the first step until the viewpoint pool is ready and tiles are being requested
+            self._step_started = now
+
+        step_elapsed = now - self._step_started
+        if self._step_window is None and step_elapsed >= options.capacity_warmup:
+            self._step_window = StatsWindow(self.runner.environment.stats.get("GetTile", "GET"), time.time())
+        elif self._step_window is not None and step_elapsed >= options.capacity_warmup + options.capacity_step_duration:
+            measurements = self._step_window.measure(time.time())
+            offered_rate = self.capacity_search.current_rate
+            next_rate = self.capacity_search.record_step(**measurements)
+            logging.info(
+                f"Capacity search offered {offered_rate:.1f} req/s: achieved {measurements['achieved_rate']:.1f} req/s "
+                f"p99={measurements['p99']:.0f}ms errors={measurements['error_rate']:.2%}"
+            )
+            worker_context.load_results_extras["capacity_search"] = self.capacity_search.summary()
+            if next_rate is None:
+                logging.info(
+                    f"Capacity search complete, max sustainable rate {self.capacity_search.sustainable_rate or 0:.1f} "
+                    f"req/s with p99 <= {options.capacity_p99_slo_ms:.0f}ms"
+                )
+                return False
+            self._step_started = now
+            self._step_window = None
+
+        self.runner.send_message(CAPACITY_RATE_MESSAGE, self.capacity_search.current_rate)
+        return True
+
+
+class TileServerOpenLoopUser(FastHttpUser):
+    """
+    :class:`TileServerOpenLoopUser` generates GetTile arrivals against READY viewpoints leased from the shared
+    viewpoint pool. Latency is reported from the time each request was scheduled to be sent, so any delay caused by
+    the generator falling behind is included in the percentiles instead of being silently omitted.
+    """
+
+    wait_time = constant(0)
+
+    def on_start(self) -> None:
+        """
+        Locust invokes this method when the user is created. It waits for the viewpoint pool to be filled so that
+        viewpoint ingest time is not measured as tile latency.
+        """
+        if worker_context.viewpoint_pool is None:
+            raise ValueError("Open-loop load tests require --viewpoint_pool_size of at least 1")
+        # Arrivals only lease viewpoints of the images pooled by this worker
+        self.test_image_keys = worker_context.viewpoint_pool_image_keys
+        self.tile_encodings = parse_tile_encodings(self.environment.parsed_options.tile_encodings)
+        logging.info("Waiting for the viewpoint pool to become ready before generating arrivals")
+        ready_timeout = self.environment.parsed_options.viewpoint_ready_timeout
+        if not worker_context.viewpoint_pool.wait_until_ready(ready_timeout):
+            logging.warning(f"The viewpoint pool was not ready after {ready_timeout:g}s, generating arrivals anyway")
+
+    @task
+    def generate_arrivals(self) -> None:
+        """
+        This task runs the arrival schedule for the lifetime of the user.
+        """
+        options = self.environment.parsed_options
+        generators = max(options.arrival_generators, 1)
+        if options.capacity_search:
+            # The rate is set by the capacity search running on the master
+            rate = lambda elapsed: capacity_rate / generators  # noqa: E731
+        else:
+            rate = ramped_rate(options.arrival_rate / generators, options.arrival_ramp_time)
+        scheduler = ArrivalScheduler(
+            rate=rate,
+            max_outstanding=options.arrival_max_outstanding,
+            poisson=options.arrival_poisson,
+        )
+        scheduler.run(self.request_tile)
+
+    def request_tile(self, intended_time: float) -> None:
+        """
+        Requests a tile from a pooled viewpoint, charging any scheduling delay to the response time. Images and tiles
+        are chosen following the Zipf popularity models set by --image_zipf_skew and --tile_zipf_skew, and the tile is
+        requested with an encoding sampled from --tile_encodings.
+
+        :param intended_time: The time the schedule intended this request to be sent.
+        """
+        options = self.environment.parsed_options
+        config = ViewpointConfig(
+            zipf_sampler(len(self.test_image_keys), options.image_zipf_skew).choice(self.test_image_keys),
+            random.choice(TILE_SIZES),
+            random.choice(RANGE_ADJUSTMENTS),
+        )
+        with worker_context.lease_pooled_viewpoint(self.environment, config) as viewpoint_id:
+            if viewpoint_id is None:
+                return
+            # Every arrival requests a tile from the same plan the closed-loop users walk
+            x, y, z = tile_plan_cache.popular_tile(100, options.tile_zipf_skew)
+            encoding = choose_tile_encoding(self.tile_encodings)
+            url = (
+                f"/viewpoints/{viewpoint_id}/image/tiles/{z}/{x}/{y}.{encoding.tile_format}"
+                f"?compression={encoding.compression}"
+            )
+            lag_ms = schedule_lag_ms(intended_time)
+            context = {
+                "schedule_lag_ms": lag_ms,
+                **tile_encoding_context(encoding, config.tile_size),
+                **dimensions_context(**viewpoint_dimensions(config), format=encoding.tile_format, zoom=z),
+            }
+            with self.client.get(url, name="GetTile", catch_response=True, context=context) as response:
+                response.request_meta["response_time"] += lag_ms
+                worker_context.tile_validator.check(response, encoding.tile_format, config.tile_size)
@@ -1,40 +1,57 @@
 #  Copyright 2024 Amazon.com, Inc. or its affiliates.
 
-import json
+import codecs
 import logging
-import os
 import random
 import time
-from math import ceil, log
 from secrets import token_hex
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import gevent
-from hilbertcurve.hilbertcurve import HilbertCurve
-from locust import FastHttpUser, between, events, task
+from locust import FastHttpUser, between, task
+from locust.exception import RescheduleTaskImmediately
+
+from aws.osml.tile_server_test.load import worker_context
+from aws.osml.tile_server_test.load.crop_scaling import crop_window_context, crop_window_sizes, random_crop_window
+from aws.osml.tile_server_test.load.dimensions import dimensions_context
+from aws.osml.tile_server_test.load.map_session import MapViewerSession, parse_tile_matrix_set_limits
+from aws.osml.tile_server_test.load.popularity import zipf_sampler
+from aws.osml.tile_server_test.load.tile_encodings import (
+    TileEncoding,
+    choose_tile_encoding,
+    parse_tile_encodings,
+    tile_encoding_context,
+)
+from aws.osml.tile_server_test.load.tile_fetcher import COLD, POOLED
+from aws.osml.tile_server_test.load.tile_plans import tile_plan_cache
+from aws.osml.tile_server_test.load.viewpoint_listing import ViewpointListParser
+from aws.osml.tile_server_test.load.viewpoint_pool import ViewpointConfig
+from aws.osml.tile_server_test.load.viewpoint_watcher import READINESS_POLL_REQUEST_NAME
+from aws.osml.tile_server_test.load.worker_context import (
+    RANGE_ADJUSTMENTS,
+    TILE_SIZES,
+    resolve_test_image_keys,
+    viewpoint_dimensions,
+)
 
 VIEWPOINT_STATUS = "viewpoint_status"
 
 VIEWPOINT_ID = "viewpoint_id"
 
 
-@events.init_command_line_parser.add_listener
-def _(parser):
-    parser.add_argument("--test_images_bucket", type=str, default=os.environ.get("LOCUST_TEST_IMAGES_BUCKET"))
-    parser.add_argument("--test_image_keys", type=str, default=os.environ.get("LOCUST_TEST_IMAGE_KEYS", "[]"))
-
-
-@events.test_start.add_listener
-def _(environment, **kwargs):
+def tile_request_name(endpoint: str, tile_format: str, cache_state: Optional[str] = None) -> str:
     """
-    This method logs the test images bucket and object prefix from the given environment.
+    Build the name a tile request is reported under. Requests made by the cold/warm cache scenario are reported
+    separately for each cache state and tile format so their latency distributions are not mixed.
 
-    :param environment: The environment object containing parsed options.
-    :param kwargs: Additional keyword arguments (unused).
-    :return: None
+    :param endpoint: The name of the tile endpoint, e.g. GetTile
+    :param tile_format: The requested tile format
+    :param cache_state: COLD, POOLED, or WARM when the request is part of the cache scenario
+    :return: the request name
     """
-    logging.info(f"Using bucket: {environment.parsed_options.test_images_bucket}")
-    logging.info(f"Using images: {environment.parsed_options.test_image_keys}")
+    if cache_state is None:
+        return endpoint
+    return f"{endpoint} ({cache_state}, {tile_format})"
 
 
 class TileServerUser(FastHttpUser):
@@ -73,11 +90,11 @@ class TileServerUser(FastHttpUser):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.test_images_bucket = self.environment.parsed_options.test_images_bucket
-        if isinstance(self.environment.parsed_options.test_image_keys, list):
-            self.test_image_keys = self.environment.parsed_options.test_image_keys
-        else:
-            self.test_image_keys = json.loads(self.environment.parsed_options.test_image_keys)
-        logging.info(f"TileServerUser Initialization Parameters: {self.test_images_bucket} {self.test_image_keys}")
+        self.test_image_keys = resolve_test_image_keys(self.environment.parsed_options)
+        self.tile_encodings = parse_tile_encodings(self.environment.parsed_options.tile_encodings)
+        logging.info(
+            f"TileServerUser Initialization Parameters: {self.test_images_bucket} {len(self.test_image_keys)} images"
+        )
 
     def on_start(self) -> None:
         """
@@ -90,12 +107,25 @@ class TileServerUser(FastHttpUser):
 
     @task(5)
     def view_new_map_behavior(self) -> None:
+        """
+        This task simulates a user opening a viewpoint in a map client. When the viewpoint pool is enabled an existing
+        READY viewpoint is leased, otherwise a new viewpoint is created and discarded after its tiles are viewed.
+        """
         logging.debug("View New Map Behavior!")
-        viewpoint_id = self.create_viewpoint(self.test_images_bucket, random.choice(self.test_image_keys), 256, "DRA")
+        config = ViewpointConfig(self.choose_test_image_key(), 256, "DRA")
+        if worker_context.viewpoint_pool is not None:
+            with worker_context.lease_pooled_viewpoint(self.environment, config) as viewpoint_id:
+                if viewpoint_id is not None:
+                    self.request_map_tiles(viewpoint_id, dimensions=viewpoint_dimensions(config), pooled=True)
+            return
+
+        viewpoint_id = self.create_viewpoint(
+            self.test_images_bucket, config.image_key, config.tile_size, config.range_adjustment
+        )
         if viewpoint_id is not None:
             final_status = self.wait_for_viewpoint_ready(viewpoint_id)
             if final_status == "READY":
-                self.request_map_tiles(viewpoint_id)
+                self.request_map_tiles(viewpoint_id, dimensions=viewpoint_dimensions(config))
 
             if final_status in ["READY", "FAILED"]:
                 self.cleanup_viewpoint(viewpoint_id)
@@ -103,19 +133,56 @@ class TileServerUser(FastHttpUser):
     @task(5)
     def view_new_image_behavior(self) -> None:
         """
-        This task simulates a user creating, retrieving tiles from, and then discarding a viewpoint.
+        This task simulates a user creating, retrieving tiles from, and then discarding a viewpoint. When the viewpoint
+        pool is enabled an existing READY viewpoint is leased instead of creating a new one.
         """
         logging.debug("View New Image Behavior!")
+        config = ViewpointConfig(self.choose_test_image_key(), random.choice(TILE_SIZES), random.choice(RANGE_ADJUSTMENTS))
+        if worker_context.viewpoint_pool is not None:
+            with worker_context.lease_pooled_viewpoint(self.environment, config) as viewpoint_id:
+                if viewpoint_id is not None:
+                    self.request_tiles(
+                        viewpoint_id, tile_size=config.tile_size, dimensions=viewpoint_dimensions(config), pooled=True
+                    )
+            return
+
         viewpoint_id = self.create_viewpoint(
-            self.test_images_bucket,
-            random.choice(self.test_image_keys),
-            random.choice([256, 512]),
-            random.choice(["NONE", "DRA", "MINMAX"]),
+            self.test_images_bucket, config.image_key, config.tile_size, config.range_adjustment
         )
         if viewpoint_id is not None:
             final_status = self.wait_for_viewpoint_ready(viewpoint_id)
             if final_status == "READY":
-                self.request_tiles(viewpoint_id)
+                self.request_tiles(viewpoint_id, tile_size=config.tile_size, dimensions=viewpoint_dimensions(config))
+
+            if final_status in ["READY", "FAILED"]:
+                self.cleanup_viewpoint(viewpoint_id)
+
+    @task(3)
+    def view_crops_behavior(self) -> None:
+        """
+        This task simulates an analyst cutting crops out of an image. Square windows of sizes drawn from the
+        --crop_min_size to --crop_max_size ladder are placed at random inside the image bounds and requested in
+        formats sampled from --crop_formats. When the viewpoint pool is enabled an existing READY viewpoint is leased
+        instead of creating a new one. The scenario is opt-in: while --crops_per_viewpoint is 0 another task is picked
+        straight away, so the mix and pacing of the other tasks are unchanged.
+        """
+        logging.debug("View Crops Behavior!")
+        if self.environment.parsed_options.crops_per_viewpoint <= 0:
+            raise RescheduleTaskImmediately()
+        config = ViewpointConfig(self.choose_test_image_key(), random.choice(TILE_SIZES), random.choice(RANGE_ADJUSTMENTS))
+        if worker_context.viewpoint_pool is not None:
+            with worker_context.lease_pooled_viewpoint(self.environment, config) as viewpoint_id:
+                if viewpoint_id is not None:
+                    self.request_crops(viewpoint_id, config)
+            return
+
+        viewpoint_id = self.create_viewpoint(
+            self.test_images_bucket, config.image_key, config.tile_size, config.range_adjustment
+        )
+        if viewpoint_id is not None:
+            final_status = self.wait_for_viewpoint_ready(viewpoint_id)
+            if final_status == "READY":
+                self.request_crops(viewpoint_id, config)
 
             if final_status in ["READY", "FAILED"]:
                 self.cleanup_viewpoint(viewpoint_id)
@@ -124,13 +191,12 @@ class TileServerUser(FastHttpUser):
     def discover_viewpoints_behavior(self) -> None:
         """
         This task simulates a user accessing a web page that displays an active list of viewpoints. The main query
-        API is invoked then details including the image preview, metadata, and detailed statistics are called
-        for each image.
+        API is invoked page by page, then details including the image preview, metadata, and detailed statistics are
+        called for each READY viewpoint. At most --discover_fan_out viewpoints are detailed concurrently, and the next
+        page is only requested once the details of the current page have started.
         """
 
         logging.debug("Discover Viewpoints Behavior")
-        # TODO: Update this to work on a per-page basis once the list viewpoints operation is paginated
-        viewpoint_ids = self.list_ready_viewpoints()
 
         def get_viewpoint_details(viewpoint_id: str):
             self.get_viewpoint_metadata(viewpoint_id)
@@ -139,11 +205,37 @@ class TileServerUser(FastHttpUser):
             self.get_viewpoint_preview(viewpoint_id)
             self.get_viewpoint_statistics(viewpoint_id)
 
-        pool = gevent.pool.Pool()
-        for viewpoint_id in viewpoint_ids:
+        options = self.environment.parsed_options
+        pool = gevent.pool.Pool(max(options.discover_fan_out, 1))
+        for viewpoint_id in self.list_ready_viewpoints(options.discover_max_viewpoints):
+            # Pool.spawn blocks while the fan-out limit is reached
             pool.spawn(get_viewpoint_details, viewpoint_id)
         pool.join()
 
+    def choose_test_image_key(self) -> str:
+        """
+        Chooses the test image to view. Images are ranked by their order in --test_image_keys and chosen following a
+        Zipf popularity model with --image_zipf_skew, which picks every image with equal probability by default. When
+        the viewpoint pool is enabled only the images pooled by this worker are chosen.
+
+        :return: key of the test image
+        """
+        skew = self.environment.parsed_options.image_zipf_skew
+        image_keys = worker_context.viewpoint_pool_image_keys if worker_context.viewpoint_pool else self.test_image_keys
+        return zipf_sampler(len(image_keys), skew).choice(image_keys)
+
+    def with_tile_encodings(
+        self, tiles: Iterable[Tuple[int, int, int]]
+    ) -> Iterator[Tuple[Tuple[int, int, int], TileEncoding]]:
+        """
+        Lazily pairs every tile with the encoding it will be requested in, sampled from --tile_encodings.
+
+        :param tiles: the tiles to request
+        :return: iterator over (tile, encoding) pairs
+        """
+        for tile in tiles:
+            yield tile, choose_tile_encoding(self.tile_encodings)
+
     def create_viewpoint(
         self, test_images_bucket: str, test_image_key: str, tile_size: int = 256, range_adjustment: str = "DRA"
     ) -> Optional[str]:
@@ -159,6 +251,7 @@ class TileServerUser(FastHttpUser):
             "POST",
             "/viewpoints",
             name="CreateViewpoint",
+            context=dimensions_context(**viewpoint_dimensions(ViewpointConfig(test_image_key, tile_size, range_adjustment))),
             json={
                 "viewpoint_id": id,
                 "viewpoint_name": "LocustUser-Viewpoint-" + id,
@@ -177,108 +270,213 @@ class TileServerUser(FastHttpUser):
 
     def wait_for_viewpoint_ready(self, viewpoint_id: str) -> str:
         """
-        Waits for the viewpoint with specified ID to become ready.
+        Waits for the viewpoint with specified ID to become ready. Polling is delegated to the worker's shared
+        :class:`ViewpointReadinessWatcher` so this greenlet simply blocks until a terminal status is observed.
 
         :param viewpoint_id: ID of the viewpoint to wait for
         :return: final status of the viewpoint
         """
-        done = False
-        num_retries = 120
-        final_status = "NOT_FOUND"
-        while not done and num_retries > 0:
-            with self.rest("GET", f"/viewpoints/{viewpoint_id}", name="DescribeViewpoint") as response:
-                if response.js is not None and VIEWPOINT_STATUS in response.js:
-                    final_status = response.js[VIEWPOINT_STATUS]
-                    if response.js[VIEWPOINT_STATUS] in ["READY", "FAILED", "DELETED"]:
-                        done = True
-                    else:
-                        time.sleep(15)
-                        num_retries -= 1
-        if not done:
-            response.failure(f"Gave up waiting for {viewpoint_id} to become ready. Final Status was {final_status}")
+        final_status = worker_context.viewpoint_watcher.wait(self.client, viewpoint_id)
+        if worker_context.viewpoint_watcher.is_timed_out(final_status):
+            self.environment.events.request.fire(
+                request_type="GET",
+                name=READINESS_POLL_REQUEST_NAME,
+                response_time=0,
+                response_length=0,
+                response=None,
+                context={},
+                exception=TimeoutError(
+                    f"Gave up waiting for {viewpoint_id} to become ready. Final Status was {final_status}"
+                ),
+            )
 
         return final_status
 
-    def request_tiles(self, viewpoint_id: str, num_tiles: int = 100, batch_size: int = 5) -> None:
+    def request_tiles(
+        self,
+        viewpoint_id: str,
+        num_tiles: int = 100,
+        window: Optional[int] = None,
+        tile_size: int = 256,
+        dimensions: Optional[Dict[str, Any]] = None,
+        pooled: bool = False,
+    ) -> None:
         """
-        Requests tiles for the viewpoint with specified ID.
+        Requests tiles for the viewpoint with specified ID. A sample of the tiles is validated against the viewpoint's
+        tile size. The Hilbert ordered plan is walked once, or when --tile_zipf_skew is set the same number of tiles is
+        drawn from a Zipf popularity model over the plan. When --tile_cache_repeat_fraction is set the tiles are fetched
+        cold and a fraction of them is then fetched again warm, with each pass reported under its own request name. The
+        first pass on a pooled viewpoint is reported as pooled rather than cold, since other users may have cached its
+        tiles. Every tile is requested with an encoding sampled from --tile_encodings, and tagged with its format and zoom
+        level in addition to the viewpoint's dimensions.
 
         :param viewpoint_id: ID of the viewpoint to request tiles for
         :param num_tiles: number of tiles to request
-        :param batch_size: number of tiles to request in parallel
+        :param window: number of tile requests to keep in flight, defaults to --tile_window
+        :param tile_size: tile size the viewpoint was created with
+        :param dimensions: dimensions of the viewpoint every tile request is tagged with
+        :param pooled: whether the viewpoint was leased from the viewpoint pool
         :return: None
         """
-        tile_format = "PNG"
-        compression = "NONE"
 
-        def concurrent_tile_request(tile: (int, int, int)):
+        def tile_request(item: Tuple[Tuple[int, int, int], TileEncoding], cache_state: Optional[str] = None):
+            tile, encoding = item
             url = (
                 f"/viewpoints/{viewpoint_id}/image/tiles/"
-                f"{tile[2]}/{tile[0]}/{tile[1]}.{tile_format}?compression={compression}"
+                f"{tile[2]}/{tile[0]}/{tile[1]}.{encoding.tile_format}?compression={encoding.compression}"
             )
-            with self.client.get(url, name="GetTile") as response:
-                if not response.content:
-                    response.failure("GetTile response contained no content")
-
-        for z in [3, 2, 1, 0]:
-            num_tiles_at_zoom = ceil(num_tiles / (4**z))
-            p = ceil(log(num_tiles_at_zoom) / (2 * log(2)))
-            n = 2
-            hilbert_curve = HilbertCurve(p, n)
-            for i in range(0, num_tiles_at_zoom, batch_size):
-                distances = list(range(i, min(i + batch_size, num_tiles_at_zoom)))
-                tiles = [(p[0], p[1], z) for p in hilbert_curve.points_from_distances(distances)]
-                pool = gevent.pool.Pool()
-                for tile in tiles:
-                    pool.spawn(concurrent_tile_request, tile)
-                pool.join()
+            with self.client.get(
+                url,
+                name=tile_request_name("GetTile", encoding.tile_format, cache_state),
+                catch_response=True,
+                context={
+                    **tile_encoding_context(encoding, tile_size),
+                    **dimensions_context(**(dimensions or {}), format=encoding.tile_format, zoom=tile[2]),
+                },
+            ) as response:
+                worker_context.tile_validator.check(response, encoding.tile_format, tile_size)
+
+        options = self.environment.parsed_options
+        if options.tile_zipf_skew > 0:
+            tiles = tile_plan_cache.iter_popular_tiles(num_tiles, options.tile_zipf_skew)
+        else:
+            tiles = tile_plan_cache.iter_plan(num_tiles)
+        # The encoding is chosen with the tile so a warm request asks for exactly what the cold request did
+        tiles = self.with_tile_encodings(tiles)
+        if options.tile_cache_repeat_fraction > 0:
+            worker_context.tile_fetch_engine.fetch_cold_then_warm(
+                [tiles], tile_request, options.tile_cache_repeat_fraction, window, first_state=POOLED if pooled else COLD
+            )
+        else:
+            worker_context.tile_fetch_engine.fetch(tiles, tile_request, window)
+
+    def request_crops(self, viewpoint_id: str, config: ViewpointConfig) -> None:
+        """
+        Requests --crops_per_viewpoint crops of random windows inside the image bounds, one after another. Each crop
+        is tagged with its output format and window size so its latency can be plotted against window area, and a
+        sample of them is validated against the window size.
+
+        :param viewpoint_id: ID of the viewpoint to crop
+        :param config: configuration the viewpoint was created with
+        :return: None
+        """
+        image_dimensions = self.get_image_dimensions(viewpoint_id, config.image_key)
+        if image_dimensions is None:
+            return
+        width, height = image_dimensions
+        options = self.environment.parsed_options
+        sizes = [
+            size
+            for size in crop_window_sizes(options.crop_min_size, options.crop_max_size, options.crop_size_steps)
+            if size <= min(width, height)
+        ]
+        crop_formats = [
+            crop_format.strip().upper() for crop_format in options.crop_formats.split(",") if crop_format.strip()
+        ]
+        if not sizes or not crop_formats:
+            return
+        for _ in range(options.crops_per_viewpoint):
+            size = random.choice(sizes)
+            crop_format = random.choice(crop_formats)
+            minx, miny, maxx, maxy = random_crop_window(width, height, size)
+            with self.client.get(
+                f"/viewpoints/{viewpoint_id}/image/crop/{minx},{miny},{maxx},{maxy}.{crop_format}",
+                name="GetCrop",
+                catch_response=True,
+                context={
+                    **crop_window_context(crop_format, size),
+                    **dimensions_context(**viewpoint_dimensions(config), format=crop_format),
+                },
+            ) as response:
+                worker_context.tile_validator.check(response, crop_format, size)
+
+    def get_image_dimensions(self, viewpoint_id: str, image_key: str) -> Optional[Tuple[int, int]]:
+        """
+        Looks up the width and height of an image, fetching the viewpoint's statistics the first time the image is
+        seen on this worker.
+
+        :param viewpoint_id: ID of a viewpoint of the image
+        :param image_key: key of the test image
+        :return: the width and height of the image in pixels, or None if they could not be fetched
+        """
+        if image_key not in worker_context.test_image_dimensions:
+            statistics = self.get_viewpoint_statistics(viewpoint_id)
+            size = (statistics or {}).get("image_statistics", {}).get("size")
+            if not size:
+                return None
+            worker_context.test_image_dimensions[image_key] = (int(size[0]), int(size[1]))
+        return worker_context.test_image_dimensions[image_key]
 
     def request_map_tiles(
-        self, viewpoint_id: str, tile_matrix_set_id: str = "WebMercatorQuad", num_tiles: int = 100
+        self,
+        viewpoint_id: str,
+        tile_matrix_set_id: str = "WebMercatorQuad",
+        window: Optional[int] = None,
+        tile_size: int = 256,
+        dimensions: Optional[Dict[str, Any]] = None,
+        pooled: bool = False,
     ) -> None:
+        """
+        Simulates a map client exploring the viewpoint. The tileset limits are used to drive a
+        :class:`MapViewerSession` and each burst of tiles it emits is fetched before the user pauses and moves on.
+        When --tile_cache_repeat_fraction is set the session is the cold pass, or the pooled pass on a pooled
+        viewpoint, and a fraction of its tiles is then fetched again warm.
+
+        :param viewpoint_id: ID of the viewpoint to request map tiles for
+        :param tile_matrix_set_id: tile matrix set to request tiles from
+        :param window: number of tile requests to keep in flight, defaults to --tile_window
+        :param tile_size: tile size the viewpoint was created with
+        :param dimensions: dimensions of the viewpoint every tile request is tagged with
+        :param pooled: whether the viewpoint was leased from the viewpoint pool
+        :return: None
+        """
         self.get_viewpoint_tilesets(viewpoint_id)
 
-        tile_format = "PNG"
-        compression = "NONE"
-
-        parsed_tileset_limits = {}
-        max_zoom_level = 0
         tileset_metadata = self.get_viewpoint_tileset_metadata(viewpoint_id, tile_matrix_set_id)
-        for tile_matrix_limits in tileset_metadata["tileMatrixSetLimits"]:
-            current_tile_matrix = int(tile_matrix_limits["tileMatrix"])
-            max_zoom_level = max(max_zoom_level, current_tile_matrix)
-            parsed_tileset_limits[current_tile_matrix] = (
-                tile_matrix_limits["minTileRow"],
-                tile_matrix_limits["minTileCol"],
-                tile_matrix_limits["maxTileRow"],
-                tile_matrix_limits["maxTileCol"],
-            )
+        if tileset_metadata is None:
+            return
+
+        options = self.environment.parsed_options
+        session = MapViewerSession(
+            parse_tile_matrix_set_limits(tileset_metadata),
+            viewport_width=options.map_viewport_width,
+            viewport_height=options.map_viewport_height,
+            prefetch_ring=options.map_prefetch_ring,
+            num_steps=options.map_session_steps,
+        )
 
-        def concurrent_tile_request(tile: (int, int, int)):
+        def tile_request(item: Tuple[Tuple[int, int, int], TileEncoding], cache_state: Optional[str] = None):
+            tile, encoding = item
             url = (
-                f"/viewpoints/{viewpoint_id}/map/tiles/"
-                f"WebMercatorQuad/{tile[2]}/{tile[1]}/{tile[0]}.{tile_format}?compression={compression}"
+                f"/viewpoints/{viewpoint_id}/map/tiles/{tile_matrix_set_id}/"
+                f"{tile[2]}/{tile[1]}/{tile[0]}.{encoding.tile_format}?compression={encoding.compression}"
+            )
+            with self.client.get(
+                url,
+                name=tile_request_name("GetMapTile", encoding.tile_format, cache_state),
+                catch_response=True,
+                context={
+                    **tile_encoding_context(encoding, tile_size),
+                    **dimensions_context(**(dimensions or {}), format=encoding.tile_format, zoom=tile[2]),
+                },
+            ) as response:
+                worker_context.tile_validator.check(response, encoding.tile_format, tile_size)
+
+        if options.tile_cache_repeat_fraction > 0:
+            # The session never revisits a tile, so its bursts are the first pass and a sample of them is revisited warm
+            worker_context.tile_fetch_engine.fetch_cold_then_warm(
+                (self.with_tile_encodings(burst) for burst in session.bursts()),
+                tile_request,
+                options.tile_cache_repeat_fraction,
+                window,
+                think_time=options.map_session_think_time,
+                first_state=POOLED if pooled else COLD,
             )
-            with self.client.get(url, name="GetMapTile") as response:
-                if not response.content:
-                    response.failure("GetMapTile response contained no content")
-
-        num_tiles_fetched = 0
-        for zoom in range(0, max_zoom_level + 1):
-            if zoom not in parsed_tileset_limits:
-                # Skipping this zoom level because the tile limits haven't been specified
-                continue
-
-            min_ty, min_tx, max_ty, max_tx = parsed_tileset_limits[zoom]
-
-            pool = gevent.pool.Pool()
-            for ty in range(min_ty, max_ty + 1):
-                for tx in range(min_tx, max_tx + 1):
-                    if num_tiles_fetched >= num_tiles:
-                        break
-                    pool.spawn(concurrent_tile_request((tx, ty, zoom)))
-                    num_tiles_fetched += 1
-            pool.join()
+            return
+
+        for burst in session.bursts():
+            worker_context.tile_fetch_engine.fetch(self.with_tile_encodings(burst), tile_request, window)
+            gevent.sleep(options.map_session_think_time)
 
     def cleanup_viewpoint(self, viewpoint_id: str) -> None:
         """
@@ -293,23 +491,66 @@ class TileServerUser(FastHttpUser):
                 elif response.js[VIEWPOINT_STATUS] != "DELETED":
                     response.failure(f"Unexpected status after viewpoint delete {response.text}")
 
-    def list_ready_viewpoints(self) -> List[str]:
+    def list_ready_viewpoints(self, max_viewpoints: int = 0) -> Iterator[str]:
         """
-        Lists all ready viewpoints.
+        Lists the ready viewpoints one page of --list_page_size viewpoints at a time, following the pagination token
+        of each page. Every page is parsed as it is received, keeping only the ID and status of each viewpoint.
 
-        :return: list of viewpoint IDs
+        :param max_viewpoints: stop after this many ready viewpoints, 0 for no limit
+        :return: iterator over the IDs of the ready viewpoints
         """
-        result = []
-        with self.rest("GET", "/viewpoints", name="ListViewpoints") as response:
-            if response.js is not None:
-                for viewpoint in response.js["items"]:
-                    if (
-                        VIEWPOINT_ID in viewpoint
-                        and VIEWPOINT_STATUS in viewpoint
-                        and viewpoint[VIEWPOINT_STATUS] == "READY"
-                    ):
-                        result.append(viewpoint[VIEWPOINT_ID])
-        return result
+        page_size = self.environment.parsed_options.list_page_size
+        next_token = None
+        found = 0
+        while True:
+            params = {"max_results": page_size} if page_size > 0 else {}
+            if next_token is not None:
+                params["next_token"] = next_token
+            viewpoint_ids, next_token = self.list_viewpoints_page(params)
+            for viewpoint_id in viewpoint_ids:
+                yield viewpoint_id
+                found += 1
+                if max_viewpoints and found >= max_viewpoints:
+                    return
+            if next_token is None:
+                return
+
+    def list_viewpoints_page(self, params: Dict[str, Any]) -> Tuple[List[str], Optional[str]]:
+        """
+        Requests one page of viewpoints and streams the response through a :class:`ViewpointListParser`. The reported
+        response time includes reading the whole page. The page is requested uncompressed because the stream is read
+        without decoding its content encoding.
+
+        :param params: query parameters selecting the page
+        :return: the IDs of the ready viewpoints on the page, and the token of the next page or None
+        """
+        viewpoint_ids = []
+        start = time.perf_counter()
+        with self.client.get(
+            "/viewpoints",
+            name="ListViewpoints",
+            params=params,
+            headers={"Accept-Encoding": "identity"},
+            stream=True,
+            catch_response=True,
+        ) as response:
+            if response.status_code != 200:
+                response.failure(f"Unexpected response listing viewpoints {response.status_code} {response.text}")
+                return viewpoint_ids, None
+            parser = ViewpointListParser()
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            try:
+                for chunk in response.iter_content(chunk_size=16384, decode_content=False):
+                    for viewpoint_id, viewpoint_status in parser.feed(decoder.decode(chunk)):
+                        if viewpoint_id is not None and viewpoint_status == "READY":
+                            viewpoint_ids.append(viewpoint_id)
+                parser.feed(decoder.decode(b"", final=True))
+                next_token = parser.close()
+            except ValueError as e:
+                response.failure(f"Failed to read the list of viewpoints: {e}")
+                next_token = None
+            response.request_meta["response_time"] = (time.perf_counter() - start) * 1000
+        return viewpoint_ids, next_token
 
     def get_viewpoint_metadata(self, viewpoint_id: str):
         """
@@ -356,7 +597,7 @@ class TileServerUser(FastHttpUser):
             else:
                 return response.js
 
-    def get_viewpoint_statistics(self, viewpoint_id: str):
+    def get_viewpoint_statistics(self, viewpoint_id: str) -> Optional[dict]:
         """
         Fetches statistics for the viewpoint with specified ID.
 
@@ -367,8 +608,11 @@ class TileServerUser(FastHttpUser):
                 # It is possible the viewpoint was deleted between the call to list and this call. A 404 response may
                 # be valid.
                 response.success()
+                return None
             elif response.js is not None and "image_statistics" not in response.js:
                 response.failure(f"'image_statistics' missing from response {response.text}")
+            else:
+                return response.js
 
     def get_viewpoint_preview(self, viewpoint_id: str):
         """
@@ -377,8 +621,11 @@ class TileServerUser(FastHttpUser):
         :param viewpoint_id: ID of the viewpoint to fetch preview for
         """
         tile_format = "PNG"
-        with self.client.get(f"/viewpoints/{viewpoint_id}/image/preview.{tile_format}", name="GetPreview") as response:
-            if response.status_code == 404 and "already been deleted" in response.js["detail"]:
+        with self.client.get(
+            f"/viewpoints/{viewpoint_id}/image/preview.{tile_format}", name="GetPreview", catch_response=True
+        ) as response:
+            # The preview is an image, so the error detail of a failed request is only available as text
+            if response.status_code == 404 and "already been deleted" in (response.text or ""):
                 # It is possible the viewpoint was deleted between the call to list and this call. A 404 response may
                 # be valid.
                 response.success()
@@ -0,0 +1,186 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# A map tile is identified by (tile column, tile row, tile matrix / zoom)
+MapTile = Tuple[int, int, int]
+
+
+@dataclass(frozen=True)
+class TileMatrixLimits:
+    """
+    The range of tiles available at a single zoom level of a tile matrix set.
+
+    Attributes:
+        min_row: The first tile row containing image data.
+        min_col: The first tile column containing image data.
+        max_row: The last tile row containing image data.
+        max_col: The last tile column containing image data.
+    """
+
+    min_row: int
+    min_col: int
+    max_row: int
+    max_col: int
+
+    @property
+    def width(self) -> int:
+        return self.max_col - self.min_col + 1
+
+    @property
+    def height(self) -> int:
+        return self.max_row - self.min_row + 1
+
+    def contains(self, col: int, row: int) -> bool:
+        return self.min_col <= col <= self.max_col and self.min_row <= row <= self.max_row
+
+
+def parse_tile_matrix_set_limits(tileset_metadata: Dict[str, Any]) -> Dict[int, TileMatrixLimits]:
+    """
+    Extract the per zoom level tile limits from an OGC tileset metadata document.
+
+    :param tileset_metadata: The response of the GetMapTilesetMetadata operation.
+    :return: The tile limits keyed by zoom level.
+    """
+    limits = {}
+    for tile_matrix_limits in tileset_metadata.get("tileMatrixSetLimits", []):
+        limits[int(tile_matrix_limits["tileMatrix"])] = TileMatrixLimits(
+            min_row=int(tile_matrix_limits["minTileRow"]),
+            min_col=int(tile_matrix_limits["minTileCol"]),
+            max_row=int(tile_matrix_limits["maxTileRow"]),
+            max_col=int(tile_matrix_limits["maxTileCol"]),
+        )
+    return limits
+
+
+class MapViewerSession:
+    """
+    :class:`MapViewerSession` models the tile requests made by a slippy map client such as Leaflet or OpenLayers
+    while a user explores an image. The session opens at the most detailed zoom level where the whole image fits in the
+    viewport and then performs a random sequence of pans, zoom-ins and zoom-outs. After every view change it emits a
+    burst containing the tiles the client does not yet have: the visible tiles ordered from the center outwards,
+    followed by a ring of prefetched tiles around the viewport. Tiles already fetched earlier in the session are
+    served from the client's cache and are not requested again.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[int, TileMatrixLimits],
+        viewport_width: int = 4,
+        viewport_height: int = 3,
+        prefetch_ring: int = 1,
+        num_steps: int = 10,
+        max_pan_tiles: int = 2,
+        zoom_in_probability: float = 0.3,
+        zoom_out_probability: float = 0.1,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        """
+        Initialize the session.
+
+        :param limits: The tile limits of each zoom level that contains image data.
+        :param viewport_width: Width of the client viewport in tiles.
+        :param viewport_height: Height of the client viewport in tiles.
+        :param prefetch_ring: Number of tiles beyond the viewport edge the client loads ahead of time.
+        :param num_steps: Number of view changes (pans or zooms) performed after the initial view.
+        :param max_pan_tiles: Largest distance, in tiles, covered by a single pan.
+        :param zoom_in_probability: Probability that a view change is a zoom in.
+        :param zoom_out_probability: Probability that a view change is a zoom out.
+        :param rng: Random number generator, provided to make sessions reproducible.
+        """
+        self.limits = limits
+        self.viewport_width = viewport_width
+        self.viewport_height = viewport_height
+        self.prefetch_ring = prefetch_ring
+        self.num_steps = num_steps
+        self.max_pan_tiles = max_pan_tiles
+        self.zoom_in_probability = zoom_in_probability
+        self.zoom_out_probability = zoom_out_probability
+        self.rng = rng or random.Random()
+        self._fetched: Set[MapTile] = set()
+
+    def bursts(self) -> Iterator[List[MapTile]]:
+        """
+        Generate the tile request bursts of the session, one for the initial view and one per view change.
+
+        :return: An iterator over lists of tiles, each list is requested together by the client.
+        """
+        if not self.limits:
+            return
+
+        zoom = self._initial_zoom()
+        center_col, center_row = self._center_of(zoom)
+        yield self._view(zoom, center_col, center_row)
+
+        for _ in range(self.num_steps):
+            action = self.rng.random()
+            # A zoom past the deepest or shallowest level with image data becomes a pan, not the opposite zoom
+            if action < self.zoom_in_probability and zoom + 1 in self.limits:
+                zoom, center_col, center_row = zoom + 1, center_col * 2, center_row * 2
+            elif self.zoom_in_probability <= action < self.zoom_in_probability + self.zoom_out_probability and (
+                zoom - 1 in self.limits
+            ):
+                zoom, center_col, center_row = zoom - 1, center_col // 2, center_row // 2
+            else:
+                center_col += self.rng.randint(-self.max_pan_tiles, self.max_pan_tiles)
+                center_row += self.rng.randint(-self.max_pan_tiles, self.max_pan_tiles)
+            center_col, center_row = self._clamp(zoom, center_col, center_row)
+            burst = self._view(zoom, center_col, center_row)
+            if burst:
+                yield burst
+
+    def _initial_zoom(self) -> int:
+        """
+        Select the most detailed zoom level at which the whole image fits inside the viewport, the same "fit bounds"
+        view a map client opens with.
+
+        :return: The initial zoom level.
+        """
+        zooms = sorted(self.limits)
+        initial_zoom = zooms[0]
+        for zoom in zooms:
+            if self.limits[zoom].width <= self.viewport_width and self.limits[zoom].height <= self.viewport_height:
+                initial_zoom = zoom
+        return initial_zoom
+
+    def _center_of(self, zoom: int) -> Tuple[int, int]:
+        limits = self.limits[zoom]
+        return (limits.min_col + limits.max_col) // 2, (limits.min_row + limits.max_row) // 2
+
+    def _clamp(self, zoom: int, col: int, row: int) -> Tuple[int, int]:
+        limits = self.limits[zoom]
+        return min(max(col, limits.min_col), limits.max_col), min(max(row, limits.min_row), limits.max_row)
+
+    def _view(self, zoom: int, center_col: int, center_row: int) -> List[MapTile]:
+        """
+        Compute the tiles a client requests after moving its viewport to the given center.
+
+        :param zoom: Zoom level of the view.
+        :param center_col: Tile column at the center of the viewport.
+        :param center_row: Tile row at the center of the viewport.
+        :return: The visible tiles closest to the center first, followed by the uncached prefetch ring.
+        """
+        limits = self.limits[zoom]
+        min_col = center_col - (self.viewport_width - 1) // 2
+        max_col = center_col + self.viewport_width // 2
+        min_row = center_row - (self.viewport_height - 1) // 2
+        max_row = center_row + self.viewport_height // 2
+
+        def tiles_within(margin: int) -> List[MapTile]:
+            tiles = [
+                (col, row, zoom)
+                for row in range(min_row - margin, max_row + margin + 1)
+                for col in range(min_col - margin, max_col + margin + 1)
+                if limits.contains(col, row)
+            ]
+            # Map clients load the tiles nearest the center of the view first
+            return sorted(tiles, key=lambda t: (t[0] - center_col) ** 2 + (t[1] - center_row) ** 2)
+
+        visible = tiles_within(0)
+        visible_set = set(visible)
+        prefetch = [tile for tile in tiles_within(self.prefetch_ring) if tile not in visible_set]
+        burst = [tile for tile in visible + prefetch if tile not in self._fetched]
+        self._fetched.update(burst)
+        return burst
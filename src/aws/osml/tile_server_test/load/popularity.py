@@ -0,0 +1,85 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import random
+from functools import lru_cache
+from typing import List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class ZipfSampler:
+    """
+    :class:`ZipfSampler` draws popularity ranks from a Zipf distribution where the item at rank k, counting from 1, is
+    chosen with probability proportional to 1 / k^`skew`. A skew of 0 makes every item equally popular, and a skew
+    around 1 matches the heavy concentration of traffic on a few hot images and tiles seen in production. The
+    distribution is converted into an alias table when the sampler is created so each draw costs O(1).
+    """
+
+    def __init__(self, num_items: int, skew: float) -> None:
+        """
+        Build the alias table for the distribution.
+
+        :param num_items: Number of items ranked by popularity.
+        :param skew: The Zipf exponent, 0 for a uniform distribution.
+        """
+        if num_items < 1:
+            raise ValueError("A popularity model needs at least one item")
+        self.num_items = num_items
+        self.skew = skew
+        weights = [1.0 / (rank**skew) for rank in range(1, num_items + 1)]
+        total = sum(weights)
+        scaled = [weight * num_items / total for weight in weights]
+
+        # Vose's alias method: every column keeps its own rank with probability `_accept` and otherwise its alias
+        self._accept = [1.0] * num_items
+        self._alias = list(range(num_items))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._accept[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+
+    def sample(self, rng: Optional[random.Random] = None) -> int:
+        """
+        Draw a rank.
+
+        :param rng: Random number generator used for the draw.
+        :return: The zero based popularity rank, 0 being the most popular item.
+        """
+        rng = rng or random
+        column = rng.randrange(self.num_items)
+        return column if rng.random() < self._accept[column] else self._alias[column]
+
+    def choice(self, items: Sequence[T], rng: Optional[random.Random] = None) -> T:
+        """
+        Choose an item, treating the order of the sequence as its popularity ranking.
+
+        :param items: The items, most popular first. Must contain `num_items` items.
+        :param rng: Random number generator used for the draw.
+        :return: The chosen item.
+        """
+        return items[self.sample(rng)]
+
+    def probabilities(self) -> List[float]:
+        """
+        :return: The probability of drawing each rank, most popular first.
+        """
+        probabilities = [accept / self.num_items for accept in self._accept]
+        for column, alias in enumerate(self._alias):
+            probabilities[alias] += (1.0 - self._accept[column]) / self.num_items
+        return probabilities
+
+
+@lru_cache(maxsize=None)
+def zipf_sampler(num_items: int, skew: float) -> ZipfSampler:
+    """
+    Get the sampler for a popularity model, building it once per worker.
+
+    :param num_items: Number of items ranked by popularity.
+    :param skew: The Zipf exponent, 0 for a uniform distribution.
+    :return: The shared sampler.
+    """
+    return ZipfSampler(num_items, skew)
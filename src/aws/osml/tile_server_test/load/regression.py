@@ -0,0 +1,261 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import json
+from dataclasses import dataclass, field
+from math import erfc, sqrt
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .latency_histogram import HdrHistogram, LatencyRecorder
+
+# The pooled statistics of an endpoint a result set did not request
+_NO_REQUESTS = {"requests": 0, "requests_per_second": 0.0, "failure_ratio": 0.0}
+
+
+@dataclass
+class RegressionTolerances:
+    """
+    The limits a candidate build may move each endpoint's performance by before it is reported as a regression.
+
+    Attributes:
+        alpha: Significance level a latency shift must reach before it can count as a regression.
+        max_effect_size: Largest tolerated Cliff's delta, the probability a candidate request is slower than a
+            baseline request minus the probability it is faster. 0.147 is the conventional bound of a negligible effect.
+        max_p99_increase: Largest tolerated relative increase of the p99 latency.
+        max_throughput_decrease: Largest tolerated relative decrease of requests per second.
+        max_failure_ratio_increase: Largest tolerated absolute increase of the fraction of failed requests.
+        min_requests: Endpoints with fewer successful requests than this in either result set have their latencies
+            left uncompared; their throughput and failures are still compared.
+    """
+
+    alpha: float = 0.01
+    max_effect_size: float = 0.147
+    max_p99_increase: float = 0.10
+    max_throughput_decrease: float = 0.10
+    max_failure_ratio_increase: float = 0.01
+    min_requests: int = 100
+
+
+@dataclass
+class EndpointComparison:
+    """
+    The comparison of one endpoint between the baseline and candidate result sets.
+
+    Attributes:
+        endpoint: The request type and name of the endpoint.
+        baseline_requests: Successful baseline requests.
+        candidate_requests: Successful candidate requests.
+        baseline_failure_ratio: Fraction of the baseline requests that failed.
+        candidate_failure_ratio: Fraction of the candidate requests that failed.
+        baseline_p50: Baseline median latency in milliseconds.
+        candidate_p50: Candidate median latency in milliseconds.
+        baseline_p99: Baseline p99 latency in milliseconds.
+        candidate_p99: Candidate p99 latency in milliseconds.
+        effect_size: Cliff's delta of the candidate latencies against the baseline, positive when the candidate is slower.
+        p_value: Two sided p-value of the Mann-Whitney U test of the two latency distributions.
+        throughput_change: Relative change of requests per second, negative when the candidate serves fewer.
+        failure_ratio_change: Absolute change of the fraction of failed requests.
+        regressions: Description of every tolerance the candidate exceeded.
+    """
+
+    endpoint: str
+    baseline_requests: int
+    candidate_requests: int
+    baseline_failure_ratio: float = 0.0
+    candidate_failure_ratio: float = 0.0
+    baseline_p50: float = 0.0
+    candidate_p50: float = 0.0
+    baseline_p99: float = 0.0
+    candidate_p99: float = 0.0
+    effect_size: float = 0.0
+    p_value: float = 1.0
+    throughput_change: float = 0.0
+    failure_ratio_change: float = 0.0
+    regressions: List[str] = field(default_factory=list)
+
+    @property
+    def regressed(self) -> bool:
+        return bool(self.regressions)
+
+
+def mann_whitney_u(baseline: HdrHistogram, candidate: HdrHistogram) -> Tuple[float, float]:
+    """
+    Run a Mann-Whitney U test on two latency histograms. Values in the same histogram bucket are treated as ties, which
+    is exact to the precision of the histograms, and the p-value uses the normal approximation with a tie correction.
+
+    :param baseline: The baseline latencies.
+    :param candidate: The candidate latencies, recorded with the same precision.
+    :return: Cliff's delta of the candidate against the baseline, and the two sided p-value.
+    """
+    n1, n2 = baseline.total_count, candidate.total_count
+    if n1 == 0 or n2 == 0:
+        return 0.0, 1.0
+    # Buckets with the same index hold the same values in both histograms, so index order is value order
+    u = 0.0
+    baseline_below = 0
+    tie_sum = 0
+    for index in sorted(set(baseline.counts) | set(candidate.counts)):
+        baseline_count = baseline.counts.get(index, 0)
+        candidate_count = candidate.counts.get(index, 0)
+        u += candidate_count * baseline_below + 0.5 * baseline_count * candidate_count
+        baseline_below += baseline_count
+        ties = baseline_count + candidate_count
+        tie_sum += ties**3 - ties
+
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_sum / (n * (n - 1))) if n > 1 else 0.0
+    z = (u - n1 * n2 / 2) / sqrt(variance) if variance > 0 else 0.0
+    return 2 * u / (n1 * n2) - 1, erfc(abs(z) / sqrt(2))
+
+
+def load_result_set(path: str) -> Dict[str, Any]:
+    """
+    Read the results of a load test run, either written by --load_results_file or the response returned by
+    :class:`TSLoadTestProcessor`.
+
+    :param path: Path to the JSON results.
+    :return: The load test results.
+    """
+    with open(path, "r") as results_file:
+        results = json.load(results_file)
+    if "body" in results:
+        body = results["body"]
+        results = (json.loads(body) if isinstance(body, str) else body).get("results", {})
+    if "latency_histograms" not in results:
+        raise ValueError(f"{path} does not contain latency histograms, it was written by an older load test")
+    return results
+
+
+def compare_result_sets(
+    baseline_runs: Iterable[Dict[str, Any]],
+    candidate_runs: Iterable[Dict[str, Any]],
+    tolerances: Optional[RegressionTolerances] = None,
+) -> List[EndpointComparison]:
+    """
+    Compare every endpoint measured by either the baseline or candidate runs. Runs on the same side are pooled: their
+    latency histograms are merged and their throughput is averaged.
+
+    :param baseline_runs: Results of one or more runs of the baseline build.
+    :param candidate_runs: Results of one or more runs of the candidate build.
+    :param tolerances: The regression tolerances, defaults to :class:`RegressionTolerances`.
+    :return: The comparison of each endpoint, sorted by name. An endpoint the baseline requested but the candidate
+        did not is a regression, as is one whose requests all fail, whatever the number of successful requests.
+    """
+    tolerances = tolerances or RegressionTolerances()
+    baseline = _pool_runs(baseline_runs)
+    candidate = _pool_runs(candidate_runs)
+
+    comparisons = []
+    for endpoint in sorted(set(baseline) | set(candidate)):
+        baseline_histogram, baseline_stats = baseline.get(endpoint, (HdrHistogram(), _NO_REQUESTS))
+        candidate_histogram, candidate_stats = candidate.get(endpoint, (HdrHistogram(), _NO_REQUESTS))
+        comparison = EndpointComparison(
+            endpoint,
+            baseline_histogram.total_count,
+            candidate_histogram.total_count,
+            baseline_failure_ratio=baseline_stats["failure_ratio"],
+            candidate_failure_ratio=candidate_stats["failure_ratio"],
+        )
+        comparisons.append(comparison)
+        if baseline_stats["requests"] and not candidate_stats["requests"]:
+            comparison.regressions.append("requested by the baseline but not by the candidate")
+            continue
+
+        comparison.failure_ratio_change = candidate_stats["failure_ratio"] - baseline_stats["failure_ratio"]
+        if comparison.failure_ratio_change > tolerances.max_failure_ratio_increase:
+            comparison.regressions.append(
+                f"failure ratio increased by {comparison.failure_ratio_change:.2%} "
+                f"> {tolerances.max_failure_ratio_increase:.2%}"
+            )
+        if baseline_stats["requests"]:
+            comparison.throughput_change = _relative_change(
+                baseline_stats["requests_per_second"], candidate_stats["requests_per_second"]
+            )
+            if -comparison.throughput_change > tolerances.max_throughput_decrease:
+                comparison.regressions.append(
+                    f"throughput decreased by {-comparison.throughput_change:.1%} "
+                    f"> {tolerances.max_throughput_decrease:.1%}"
+                )
+        if min(comparison.baseline_requests, comparison.candidate_requests) < tolerances.min_requests:
+            continue
+
+        comparison.baseline_p50 = baseline_histogram.value_at_percentile(50)
+        comparison.candidate_p50 = candidate_histogram.value_at_percentile(50)
+        comparison.baseline_p99 = baseline_histogram.value_at_percentile(99)
+        comparison.candidate_p99 = candidate_histogram.value_at_percentile(99)
+        comparison.effect_size, comparison.p_value = mann_whitney_u(baseline_histogram, candidate_histogram)
+        if comparison.p_value < tolerances.alpha:
+            if comparison.effect_size > tolerances.max_effect_size:
+                comparison.regressions.append(
+                    f"latency shifted with effect size {comparison.effect_size:.3f} > {tolerances.max_effect_size}"
+                )
+            p99_increase = _relative_change(comparison.baseline_p99, comparison.candidate_p99)
+            if p99_increase > tolerances.max_p99_increase:
+                comparison.regressions.append(f"p99 increased by {p99_increase:.1%} > {tolerances.max_p99_increase:.1%}")
+    return comparisons
+
+
+def format_comparisons(comparisons: List[EndpointComparison], tolerances: RegressionTolerances) -> str:
+    """
+    Format the comparisons as a plain text report.
+
+    :param comparisons: The endpoint comparisons.
+    :param tolerances: The tolerances the comparisons were made with.
+    :return: The report.
+    """
+    lines = [
+        f"{'Endpoint':<48} {'p50 ms (base -> cand)':>24} {'p99 ms (base -> cand)':>24} "
+        f"{'delta':>7} {'p-value':>9} {'req/s':>8} {'result':>10}"
+    ]
+    for c in comparisons:
+        result = "REGRESSED" if c.regressed else "ok"
+        if min(c.baseline_requests, c.candidate_requests) < tolerances.min_requests:
+            lines.append(
+                f"{c.endpoint:<48} {'latency not compared, too few requests':>58} {c.throughput_change:>+17.1%} {result:>10}"
+            )
+        else:
+            lines.append(
+                f"{c.endpoint:<48} {f'{c.baseline_p50:.1f} -> {c.candidate_p50:.1f}':>24} "
+                f"{f'{c.baseline_p99:.1f} -> {c.candidate_p99:.1f}':>24} {c.effect_size:>7.3f} {c.p_value:>9.2g} "
+                f"{c.throughput_change:>+8.1%} {result:>10}"
+            )
+        for regression in c.regressions:
+            lines.append(f"    {regression}")
+    return "\n".join(lines)
+
+
+def _pool_runs(runs: Iterable[Dict[str, Any]]) -> Dict[str, Tuple[HdrHistogram, Dict[str, float]]]:
+    """
+    Merge the latency histograms, and average the throughput and failure ratio, of each endpoint across runs.
+
+    :param runs: The load test results of each run.
+    :return: The merged histogram and pooled statistics of each endpoint keyed by request type and name, for every
+        endpoint with successful or failed requests.
+    """
+    recorder = LatencyRecorder()
+    totals: Dict[str, Dict[str, float]] = {}
+    num_runs = 0
+    for run in runs:
+        num_runs += 1
+        recorder.merge_export(run["latency_histograms"])
+        for endpoint in run.get("endpoints", []):
+            key = LatencyRecorder.key(endpoint["method"], endpoint["name"])
+            total = totals.setdefault(key, {"requests_per_second": 0.0, "requests": 0, "failures": 0})
+            total["requests_per_second"] += endpoint["requests_per_second"]
+            total["requests"] += endpoint["requests"]
+            total["failures"] += endpoint["failures"]
+
+    # Failed requests are not recorded in the histograms, so an endpoint whose requests all failed only has stats
+    pooled = {}
+    for key in set(recorder.histograms) | set(totals):
+        total = totals.get(key, {"requests_per_second": 0.0, "requests": 0, "failures": 0})
+        stats = {
+            "requests": total["requests"],
+            "requests_per_second": total["requests_per_second"] / max(num_runs, 1),
+            "failure_ratio": total["failures"] / total["requests"] if total["requests"] else 0.0,
+        }
+        pooled[key] = (recorder.histograms.get(key, HdrHistogram()), stats)
+    return pooled
+
+
+def _relative_change(baseline: float, candidate: float) -> float:
+    return (candidate - baseline) / baseline if baseline else 0.0
@@ -0,0 +1,147 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from ..stub import LatencyProfile, StubServerConfig, StubTileServer
+from .load_test import resolve_worker_count, run_load_test
+
+# The locustfile whose task mix is benchmarked
+TILE_SERVER_USER_LOCUSTFILE = os.path.join(os.path.dirname(__file__), "locust_ts_user.py")
+
+
+def run_self_benchmark(
+    users_per_generator: int = 500,
+    spawn_rate: float = 100.0,
+    run_time: str = "60s",
+    locust_workers: int = 0,
+    stub_processes: int = 0,
+) -> Dict[str, Any]:
+    """
+    Measure the highest request rate the load generator can produce with the :class:`TileServerUser` task mix by
+    running it against local stub tile servers that respond immediately. The harness monitor of every generator shows
+    whether it was saturated; if none were, the stubs limited the rate and it is only a lower bound.
+
+    :param users_per_generator: Simulated users run by each Locust process that hosts users.
+    :param spawn_rate: Users started per second, across all generators.
+    :param run_time: Duration of the benchmark, e.g. 60s.
+    :param locust_workers: Locust worker processes, 0 to run a single process or -1 for one per CPU core.
+    :param stub_processes: Stub server processes sharing one port, 0 for one per CPU core not used by a generator.
+    :return: The request rate achieved per generator, how saturated each generator was, and the full load results.
+    """
+    generators = max(resolve_worker_count(locust_workers), 1)
+    if stub_processes <= 0:
+        stub_processes = max((os.cpu_count() or 1) - generators, 1)
+    port = _free_port()
+    env = {
+        "LOCUST_LOCUSTFILE": TILE_SERVER_USER_LOCUSTFILE,
+        "LOCUST_HOST": f"http://127.0.0.1:{port}",
+        "LOCUST_HEADLESS": "true",
+        "LOCUST_USERS": str(users_per_generator * generators),
+        "LOCUST_SPAWN_RATE": str(spawn_rate),
+        "LOCUST_RUN_TIME": run_time,
+        "LOCUST_TEST_IMAGES_BUCKET": "self-benchmark",
+        "LOCUST_TEST_IMAGE_KEYS": '["self-benchmark.tif"]',
+        # Stub processes answer for viewpoints created on their siblings with 256 pixel tiles, which fails the
+        # validation of 512 pixel tiles, and the benchmark should not fail because of it
+        "LOCUST_TILE_VALIDATION_SAMPLE_RATE": "0",
+    }
+    logging.info(
+        f"Benchmarking {generators} load generators with {users_per_generator} users each against "
+        f"{stub_processes} stub tile server processes on port {port}"
+    )
+    with _stub_servers(port, stub_processes), _environment(env):
+        results = run_load_test(run_time, locust_workers=locust_workers)
+
+    total_rate = results.get("total", {}).get("requests_per_second", 0.0)
+    harness = results.get("harness", {}).get("generators", {})
+    saturated_fraction = (
+        sum(generator["saturated_fraction"] for generator in harness.values()) / len(harness) if harness else 0.0
+    )
+    return {
+        "load_generators": generators,
+        "users_per_generator": users_per_generator,
+        "stub_processes": stub_processes,
+        "requests_per_second": total_rate,
+        "requests_per_second_per_generator": total_rate / generators,
+        "generator_saturated_fraction": saturated_fraction,
+        # If the generators were rarely saturated the stubs, not the generators, limited the request rate
+        "limited_by": "load_generator" if saturated_fraction >= 0.5 else "stub_tile_server",
+        "generators": harness,
+        "results": results,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _serve_stub(port: int, config: StubServerConfig) -> None:
+    StubTileServer(config, port=port, reuse_port=True).serve_forever()
+
+
+@contextmanager
+def _stub_servers(port: int, num_processes: int) -> Iterator[List[multiprocessing.Process]]:
+    """
+    Run stub tile servers that respond immediately in separate processes sharing one port.
+
+    :param port: The port the servers listen on.
+    :param num_processes: The number of server processes.
+    :return: The server processes, which are terminated on exit.
+    """
+    config = StubServerConfig(readiness_delay=LatencyProfile(), assume_viewpoints_exist=True)
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_serve_stub, args=(port, config), daemon=True) for _ in range(num_processes)]
+    for process in processes:
+        process.start()
+    try:
+        _wait_for_port(port)
+        yield processes
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+def _wait_for_port(port: int, timeout: float = 30.0) -> None:
+    """
+    Wait until a server accepts connections on a local port.
+
+    :param port: The port to wait for.
+    :param timeout: Seconds to wait before giving up.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Stub tile servers did not start listening on port {port}")
+            time.sleep(0.1)
+
+
+@contextmanager
+def _environment(values: Dict[str, str]) -> Iterator[None]:
+    """
+    Set environment variables for the duration of the context, restoring their previous values on exit.
+
+    :param values: The environment variables to set.
+    """
+    previous = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
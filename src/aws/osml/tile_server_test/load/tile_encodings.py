@@ -0,0 +1,147 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .latency_histogram import HdrHistogram, LatencyRecorder
+
+# Context key attached to tile requests so their payloads can be attributed to an encoding
+TILE_ENCODING_CONTEXT = "tile_encoding"
+
+
+@dataclass(frozen=True)
+class TileEncoding:
+    """
+    The image format and compression a tile is requested with.
+
+    Attributes:
+        tile_format: The tile format, e.g. PNG.
+        compression: The compression applied within the format, e.g. NONE.
+    """
+
+    tile_format: str
+    compression: str
+
+    def __str__(self) -> str:
+        return f"{self.tile_format}:{self.compression}"
+
+
+# Every format and compression combination the tile server can encode tiles with
+TILE_ENCODING_MATRIX = [
+    TileEncoding("PNG", "NONE"),
+    TileEncoding("JPEG", "NONE"),
+    TileEncoding("GIF", "NONE"),
+    TileEncoding("GTIFF", "NONE"),
+    TileEncoding("GTIFF", "LZW"),
+    TileEncoding("GTIFF", "JPEG"),
+    TileEncoding("NITF", "NONE"),
+    TileEncoding("NITF", "JPEG"),
+    TileEncoding("NITF", "J2K"),
+]
+
+
+def parse_tile_encodings(tile_encodings: str) -> List[TileEncoding]:
+    """
+    Parse the --tile_encodings option, a comma separated list of FORMAT:COMPRESSION pairs or ALL for the whole
+    :data:`TILE_ENCODING_MATRIX`. A format given without a compression is requested uncompressed.
+
+    :param tile_encodings: The option value, e.g. "PNG:NONE,GTIFF:LZW".
+    :return: The tile encodings to sample from.
+    """
+    if tile_encodings.strip().upper() == "ALL":
+        return list(TILE_ENCODING_MATRIX)
+    encodings = []
+    for value in tile_encodings.split(","):
+        if not value.strip():
+            continue
+        tile_format, _, compression = value.strip().upper().partition(":")
+        encodings.append(TileEncoding(tile_format, compression or "NONE"))
+    if not encodings:
+        raise ValueError(f"No tile encodings specified by '{tile_encodings}'")
+    return encodings
+
+
+def choose_tile_encoding(encodings: List[TileEncoding], rng: Optional[random.Random] = None) -> TileEncoding:
+    """
+    Sample the encoding of a single tile request.
+
+    :param encodings: The configured tile encodings.
+    :param rng: Random number generator used to pick the encoding.
+    :return: The encoding to request.
+    """
+    return encodings[0] if len(encodings) == 1 else (rng or random).choice(encodings)
+
+
+def tile_encoding_context(encoding: TileEncoding, tile_size: int) -> Dict[str, str]:
+    """
+    Build the request context that attributes a tile payload to its encoding and size.
+
+    :param encoding: The encoding the tile was requested with.
+    :param tile_size: The width and height of the tile in pixels.
+    :return: The context to pass with the request.
+    """
+    return {TILE_ENCODING_CONTEXT: f"{encoding} {tile_size}"}
+
+
+class PayloadRecorder(LatencyRecorder):
+    """
+    :class:`PayloadRecorder` keeps one :class:`HdrHistogram` of response sizes in bytes for every request name,
+    tile encoding, and tile size, built from the context attached to tile requests. Combined with the duration of
+    the test this gives the bytes and pixels served per second by each encoding, and the mean bytes spent on every
+    pixel shows how well each format and compression compresses the imagery.
+    """
+
+    unit = "bytes"
+
+    def on_request(
+        self,
+        request_type: str,
+        name: str,
+        response_time: float,
+        response_length: int = 0,
+        exception: Any = None,
+        context: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> None:
+        """
+        Locust request event listener.
+
+        :param request_type: The HTTP method or other request type.
+        :param name: The name the request is reported under.
+        :param response_time: The response time in milliseconds (unused).
+        :param response_length: The size of the response body in bytes.
+        :param exception: The failure, if the request failed.
+        :param context: The request context, which identifies the encoding of tile requests.
+        :param kwargs: Additional keyword arguments (unused).
+        """
+        if not context or TILE_ENCODING_CONTEXT not in context:
+            return
+        key = f"{name} {context[TILE_ENCODING_CONTEXT]}"
+        if exception is not None:
+            self.failures[key] = self.failures.get(key, 0) + 1
+            return
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = HdrHistogram(unit_scale=1)
+        histogram.record(response_length)
+
+    def throughput(self, duration: float) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize the payloads served for every request name, encoding, and tile size.
+
+        :param duration: The length of the test in seconds.
+        :return: The payload size percentiles in bytes, bytes and pixels served per second, and mean bytes per pixel.
+        """
+        results = {}
+        for key, histogram in sorted(self.histograms.items()):
+            tile_size = int(key.rsplit(" ", 1)[1])
+            pixels = histogram.total_count * tile_size * tile_size
+            results[key] = {
+                **histogram.summary(),
+                "failures": self.failures.get(key, 0),
+                "bytes_per_second": histogram.total / duration if duration > 0 else 0.0,
+                "pixels_per_second": pixels / duration if duration > 0 else 0.0,
+                "bytes_per_pixel": histogram.total / pixels if pixels else 0.0,
+            }
+        return results
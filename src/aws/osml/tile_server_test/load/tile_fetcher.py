@@ -0,0 +1,103 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import random
+from typing import Callable, Iterable, Optional, TypeVar
+
+import gevent
+from gevent.lock import BoundedSemaphore
+from gevent.pool import Pool
+
+T = TypeVar("T")
+
+# Cache states of the two passes made by :meth:`TileFetchEngine.fetch_cold_then_warm`
+COLD = "cold"
+WARM = "warm"
+# Cache state of the first pass on a pooled viewpoint, whose tiles may already be cached for other users
+POOLED = "pooled"
+
+
+class TileFetchEngine:
+    """
+    :class:`TileFetchEngine` issues tile requests through a sliding window. Each call to :meth:`fetch` keeps up to
+    `window` requests in flight for the calling user and starts the next request as soon as any outstanding one
+    completes, so a single slow tile never stalls the rest of the plan. A single engine is shared by every user on a
+    worker and can optionally cap the total number of requests in flight across all of them.
+    """
+
+    def __init__(self, default_window: int = 5, max_in_flight_per_worker: int = 0) -> None:
+        """
+        Initialize the engine.
+
+        :param default_window: Number of requests each user keeps in flight when no window is given to :meth:`fetch`.
+        :param max_in_flight_per_worker: Maximum requests in flight across all users of this worker, 0 for no limit.
+        """
+        self.default_window = default_window
+        self._worker_slots: Optional[BoundedSemaphore] = (
+            BoundedSemaphore(max_in_flight_per_worker) if max_in_flight_per_worker > 0 else None
+        )
+
+    def fetch(self, items: Iterable[T], request: Callable[[T], None], window: Optional[int] = None) -> None:
+        """
+        Issue a request for every item, keeping the window full until the items are exhausted. Items are consumed
+        lazily so generators can be used to describe large tile plans.
+
+        :param items: The tiles (or any other request descriptors) to fetch.
+        :param request: Function that issues the request for a single item.
+        :param window: Number of requests to keep in flight for this call, defaults to the engine's window.
+        :return: None
+        """
+        pool = Pool(window or self.default_window)
+        for item in items:
+            # Pool.spawn blocks while the window is full and returns as soon as a slot frees up
+            pool.spawn(self._request, request, item)
+        pool.join()
+
+    def fetch_cold_then_warm(
+        self,
+        bursts: Iterable[Iterable[T]],
+        request: Callable[[T, str], None],
+        repeat_fraction: float,
+        window: Optional[int] = None,
+        rng: Optional[random.Random] = None,
+        think_time: float = 0.0,
+        first_state: str = COLD,
+    ) -> None:
+        """
+        Fetch every item once, then fetch a random fraction of the same items again so that the second requests can be
+        served from the server's cache. The request function is told which pass it belongs to so cache hits and
+        misses can be reported separately.
+
+        :param bursts: The tiles (or any other request descriptors) to fetch, in bursts fetched one after another
+            during the first pass. A single tile plan is one burst.
+        :param request: Function that issues the request for a single item, given the item and `first_state` or
+            :data:`WARM`.
+        :param repeat_fraction: Fraction of the items fetched again in the warm pass, between 0 and 1.
+        :param window: Number of requests to keep in flight for this call, defaults to the engine's window.
+        :param rng: Random number generator used to pick the repeated items.
+        :param think_time: Seconds to pause after each burst of the first pass.
+        :param first_state: Cache state the first pass is reported under, :data:`COLD` or :data:`POOLED`.
+        :return: None
+        """
+        items = []
+        for burst in bursts:
+            burst = list(burst)
+            self.fetch(burst, lambda item: request(item, first_state), window)
+            items.extend(burst)
+            if think_time > 0:
+                gevent.sleep(think_time)
+        repeated = (rng or random).sample(items, round(len(items) * min(repeat_fraction, 1.0)))
+        self.fetch(repeated, lambda item: request(item, WARM), window)
+
+    def _request(self, request: Callable[[T], None], item: T) -> None:
+        """
+        Issue a single request while holding one of the worker wide slots, if a worker limit is configured.
+
+        :param request: Function that issues the request for a single item.
+        :param item: The item to fetch.
+        :return: None
+        """
+        if self._worker_slots is None:
+            request(item)
+            return
+        with self._worker_slots:
+            request(item)
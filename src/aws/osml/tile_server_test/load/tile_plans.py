@@ -0,0 +1,138 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import random
+from math import ceil, log
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from hilbertcurve.hilbertcurve import HilbertCurve
+
+from .popularity import zipf_sampler
+
+# An image tile is identified by (tile x, tile y, zoom)
+ImageTile = Tuple[int, int, int]
+
+# The zoom levels of an image tile plan, requested from the lowest resolution to full resolution
+PLAN_ZOOM_LEVELS = [3, 2, 1, 0]
+
+
+class TilePlanCache:
+    """
+    :class:`TilePlanCache` computes the Hilbert curve tile plans used by simulated users once per worker. Each zoom
+    level of a plan is stored as a compact (N, 3) array of (x, y, z) coordinates keyed by the number of tiles, the
+    zoom level, and the order of the Hilbert curve covering the tile grid. Users read plans through lazy iterators so
+    that no per-request work beyond an array lookup happens on the greenlets issuing requests.
+    """
+
+    def __init__(self) -> None:
+        self._zoom_plans: Dict[Tuple[int, int, int], np.ndarray] = {}
+        self._plans: Dict[int, List[np.ndarray]] = {}
+        self._flat_plans: Dict[int, np.ndarray] = {}
+
+    def zoom_plan(self, num_tiles: int, zoom: int) -> np.ndarray:
+        """
+        Get the Hilbert ordered tiles requested at one zoom level.
+
+        :param num_tiles: number of tiles requested at the full resolution zoom level
+        :param zoom: the zoom level
+        :return: read-only (N, 3) array of (x, y, z) tiles
+        """
+        num_tiles_at_zoom = ceil(num_tiles / (4**zoom))
+        # Order of the Hilbert curve whose 2^p x 2^p grid covers the tiles at this zoom level
+        p = max(ceil(log(num_tiles_at_zoom) / (2 * log(2))), 1)
+        key = (num_tiles_at_zoom, zoom, p)
+        plan = self._zoom_plans.get(key)
+        if plan is None:
+            points = HilbertCurve(p, 2).points_from_distances(list(range(num_tiles_at_zoom)))
+            plan = np.empty((num_tiles_at_zoom, 3), dtype=np.uint32)
+            plan[:, :2] = np.asarray(points, dtype=np.uint32).reshape(-1, 2)
+            plan[:, 2] = zoom
+            plan.setflags(write=False)
+            self._zoom_plans[key] = plan
+        return plan
+
+    def plan(self, num_tiles: int) -> List[np.ndarray]:
+        """
+        Get the tile plan for an image, one array per zoom level from lowest to full resolution.
+
+        :param num_tiles: number of tiles requested at the full resolution zoom level
+        :return: the per zoom level plans
+        """
+        plan = self._plans.get(num_tiles)
+        if plan is None:
+            plan = self._plans[num_tiles] = [self.zoom_plan(num_tiles, zoom) for zoom in PLAN_ZOOM_LEVELS]
+        return plan
+
+    def iter_plan(self, num_tiles: int, rng: Optional[random.Random] = None) -> Iterator[ImageTile]:
+        """
+        Lazily iterate over an image tile plan. Each zoom level starts at a random position along its curve, and wraps
+        around, so concurrent users walking the same plan do not request identical tiles in lock step.
+
+        :param num_tiles: number of tiles requested at the full resolution zoom level
+        :param rng: random number generator used to pick the starting offsets
+        :return: iterator over (x, y, z) tiles
+        """
+        rng = rng or random
+        for zoom_plan in self.plan(num_tiles):
+            offset = rng.randrange(len(zoom_plan))
+            for x, y, z in zoom_plan[offset:].tolist():
+                yield x, y, z
+            for x, y, z in zoom_plan[:offset].tolist():
+                yield x, y, z
+
+    def random_tile(self, num_tiles: int, rng: Optional[random.Random] = None) -> ImageTile:
+        """
+        Pick a random tile from an image tile plan.
+
+        :param num_tiles: number of tiles requested at the full resolution zoom level
+        :param rng: random number generator used to pick the tile
+        :return: an (x, y, z) tile
+        """
+        rng = rng or random
+        flat_plan = self.flat_plan(num_tiles)
+        x, y, z = flat_plan[rng.randrange(len(flat_plan))].tolist()
+        return x, y, z
+
+    def popular_tile(self, num_tiles: int, skew: float, rng: Optional[random.Random] = None) -> ImageTile:
+        """
+        Pick a tile from an image tile plan following a Zipf popularity model. Tiles are ranked in plan order, so the
+        low resolution overview tiles that every client loads first are the most popular.
+
+        :param num_tiles: number of tiles requested at the full resolution zoom level
+        :param skew: the Zipf exponent, 0 to pick every tile with equal probability
+        :param rng: random number generator used to pick the tile
+        :return: an (x, y, z) tile
+        """
+        flat_plan = self.flat_plan(num_tiles)
+        x, y, z = flat_plan[zipf_sampler(len(flat_plan), skew).sample(rng)].tolist()
+        return x, y, z
+
+    def iter_popular_tiles(self, num_tiles: int, skew: float, rng: Optional[random.Random] = None) -> Iterator[ImageTile]:
+        """
+        Lazily draw as many tiles as the image tile plan contains from its Zipf popularity model. Unlike
+        :meth:`iter_plan` popular tiles are requested repeatedly and unpopular ones may not be requested at all.
+
+        :param num_tiles: number of tiles requested at the full resolution zoom level
+        :param skew: the Zipf exponent, 0 to pick every tile with equal probability
+        :param rng: random number generator used to pick the tiles
+        :return: iterator over (x, y, z) tiles
+        """
+        for _ in range(len(self.flat_plan(num_tiles))):
+            yield self.popular_tile(num_tiles, skew, rng)
+
+    def flat_plan(self, num_tiles: int) -> np.ndarray:
+        """
+        Get every tile of an image tile plan in a single array, ordered from the lowest to full resolution.
+
+        :param num_tiles: number of tiles requested at the full resolution zoom level
+        :return: read-only (N, 3) array of (x, y, z) tiles
+        """
+        flat_plan = self._flat_plans.get(num_tiles)
+        if flat_plan is None:
+            flat_plan = self._flat_plans[num_tiles] = np.concatenate(self.plan(num_tiles))
+            flat_plan.setflags(write=False)
+        return flat_plan
+
+
+# Shared by every user running on this worker
+tile_plan_cache = TilePlanCache()
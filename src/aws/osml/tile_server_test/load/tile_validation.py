@@ -0,0 +1,199 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import random
+import struct
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# Number of bands decoded from each PNG color type
+PNG_COLOR_TYPE_BANDS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+
+# JPEG start of frame markers, which carry the image dimensions
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# JPEG markers that are not followed by a segment length
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+# TIFF tags describing the first image in the file
+TIFF_IMAGE_WIDTH = 256
+TIFF_IMAGE_LENGTH = 257
+TIFF_SAMPLES_PER_PIXEL = 277
+
+# Bytes a complete image of each format ends with: the PNG IEND chunk, the JPEG end of image marker, and the GIF trailer
+IMAGE_TRAILERS = {"PNG": b"\x00\x00\x00\x00IEND\xaeB`\x82", "JPEG": b"\xff\xd9", "GIF": b"\x3b"}
+
+# Tile formats that may be requested from the tile server and the formats their payloads are parsed as
+TILE_FORMAT_ALIASES = {"PNG": "PNG", "JPEG": "JPEG", "JPG": "JPEG", "GIF": "GIF", "GTIFF": "TIFF", "TIFF": "TIFF"}
+
+
+@dataclass(frozen=True)
+class TileImageHeader:
+    """
+    The properties of a tile image read from its header.
+
+    Attributes:
+        image_format: The image format, one of PNG, JPEG, GIF, or TIFF.
+        width: The width of the image in pixels.
+        height: The height of the image in pixels.
+        bands: The number of bands in the image.
+    """
+
+    image_format: str
+    width: int
+    height: int
+    bands: int
+
+
+def read_tile_header(content: bytes) -> Optional[TileImageHeader]:
+    """
+    Read the format, dimensions, and band count of an image from its header without decoding any pixels.
+
+    :param content: The image payload.
+    :return: The image header, or None if the payload is not a complete PNG, JPEG, GIF, or TIFF header.
+    """
+    try:
+        if content.startswith(b"\x89PNG\r\n\x1a\n"):
+            return _read_png_header(content)
+        if content.startswith(b"\xff\xd8"):
+            return _read_jpeg_header(content)
+        if content.startswith((b"GIF87a", b"GIF89a")):
+            width, height = struct.unpack_from("<HH", content, 6)
+            return TileImageHeader("GIF", width, height, 3)
+        if content.startswith((b"II*\x00", b"MM\x00*")):
+            return _read_tiff_header(content)
+    except struct.error:
+        # The header was truncated
+        return None
+    return None
+
+
+def _read_png_header(content: bytes) -> Optional[TileImageHeader]:
+    """
+    Read the IHDR chunk, which the PNG specification requires to be the first chunk in the file.
+
+    :param content: The PNG payload.
+    :return: The image header, or None if the IHDR chunk is missing.
+    """
+    if content[12:16] != b"IHDR":
+        return None
+    width, height, _, color_type = struct.unpack_from(">IIBB", content, 16)
+    bands = PNG_COLOR_TYPE_BANDS.get(color_type)
+    return TileImageHeader("PNG", width, height, bands) if bands is not None else None
+
+
+def _read_jpeg_header(content: bytes) -> Optional[TileImageHeader]:
+    """
+    Walk the JPEG segments until the start of frame segment describing the image is found.
+
+    :param content: The JPEG payload.
+    :return: The image header, or None if no start of frame segment precedes the compressed data.
+    """
+    offset = 2
+    while offset + 4 <= len(content):
+        if content[offset] != 0xFF:
+            return None
+        marker = content[offset + 1]
+        if marker == 0xFF:
+            # Markers may be preceded by any number of fill bytes
+            offset += 1
+            continue
+        if marker in JPEG_STANDALONE_MARKERS:
+            offset += 2
+            continue
+        if marker == 0xDA:
+            # Start of scan, the compressed data that follows cannot contain a frame header
+            return None
+        (length,) = struct.unpack_from(">H", content, offset + 2)
+        if marker in JPEG_SOF_MARKERS:
+            height, width, components = struct.unpack_from(">HHB", content, offset + 5)
+            return TileImageHeader("JPEG", width, height, components)
+        offset += 2 + length
+    return None
+
+
+def _read_tiff_header(content: bytes) -> Optional[TileImageHeader]:
+    """
+    Read the dimensions and samples per pixel from the first image file directory of a TIFF.
+
+    :param content: The TIFF payload.
+    :return: The image header, or None if the directory does not describe the image dimensions.
+    """
+    byte_order = "<" if content.startswith(b"II") else ">"
+    (ifd_offset,) = struct.unpack_from(byte_order + "I", content, 4)
+    (num_entries,) = struct.unpack_from(byte_order + "H", content, ifd_offset)
+    tags = {}
+    for i in range(num_entries):
+        tag, field_type, _ = struct.unpack_from(byte_order + "HHI", content, ifd_offset + 2 + i * 12)
+        # Dimensions are stored inline as a SHORT (3) or LONG (4)
+        value_format = "H" if field_type == 3 else "I"
+        (tags[tag],) = struct.unpack_from(byte_order + value_format, content, ifd_offset + 10 + i * 12)
+    if TIFF_IMAGE_WIDTH not in tags or TIFF_IMAGE_LENGTH not in tags:
+        return None
+    return TileImageHeader("TIFF", tags[TIFF_IMAGE_WIDTH], tags[TIFF_IMAGE_LENGTH], tags.get(TIFF_SAMPLES_PER_PIXEL, 1))
+
+
+class TileValidator:
+    """
+    :class:`TileValidator` checks a sample of tile responses by reading the image header and the trailer the image
+    must end with, without decoding any pixels, so a server that quickly returns truncated, mis-sized, or wrongly
+    encoded tiles is reported as failing instead of fast. TIFF has no trailer, so TIFF tiles are only checked up to
+    the end of their header. Every response is still checked for content; the header and trailer are read for a
+    random `sample_rate` fraction of them.
+    """
+
+    def __init__(self, sample_rate: float = 0.01, expected_bands: int = 0, rng: Optional[random.Random] = None) -> None:
+        """
+        Initialize the validator.
+
+        :param sample_rate: Fraction of tile responses whose image header is validated, between 0 and 1.
+        :param expected_bands: Number of bands every tile must have, 0 to accept any band count.
+        :param rng: Random number generator used to sample responses.
+        """
+        self.sample_rate = sample_rate
+        self.expected_bands = expected_bands
+        self.rng = rng or random.Random()
+
+    def validate(self, content: bytes, tile_format: str, tile_size: int) -> Optional[str]:
+        """
+        Validate a tile image against the format and size it was requested with, and check that it is not truncated.
+
+        :param content: The tile payload.
+        :param tile_format: The requested tile format, e.g. PNG.
+        :param tile_size: The width and height the tile is expected to have.
+        :return: A description of the problem, or None if the tile is valid.
+        """
+        header = read_tile_header(content)
+        if header is None:
+            return f"Tile is not a complete PNG, JPEG, GIF, or TIFF image ({len(content)} bytes)"
+        expected_format = TILE_FORMAT_ALIASES.get(tile_format.upper(), tile_format.upper())
+        if header.image_format != expected_format:
+            return f"Expected a {expected_format} tile but received {header.image_format}"
+        trailer = IMAGE_TRAILERS.get(header.image_format)
+        if trailer is not None and not content.endswith(trailer):
+            return f"{header.image_format} tile is truncated, it does not end with its trailer ({len(content)} bytes)"
+        if header.width != tile_size or header.height != tile_size:
+            return f"Expected a {tile_size}x{tile_size} tile but received {header.width}x{header.height}"
+        if self.expected_bands and header.bands != self.expected_bands:
+            return f"Expected a tile with {self.expected_bands} bands but received {header.bands}"
+        return None
+
+    def check(self, response: Any, tile_format: str, tile_size: int) -> None:
+        """
+        Mark a tile response opened with catch_response=True as failed if it is empty or, when sampled, invalid.
+        Formats without a supported header, such as NITF, are only checked for content.
+
+        :param response: The Locust response context.
+        :param tile_format: The requested tile format, e.g. PNG.
+        :param tile_size: The width and height the tile is expected to have.
+        :return: None
+        """
+        if not response.content:
+            response.failure("Tile response contained no content")
+        elif (
+            response.status_code == 200
+            and tile_format.upper() in TILE_FORMAT_ALIASES
+            and self.rng.random() < self.sample_rate
+        ):
+            problem = self.validate(response.content, tile_format, tile_size)
+            if problem is not None:
+                response.failure(problem)
@@ -0,0 +1,92 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import json
+import re
+from typing import List, Optional, Tuple
+
+# Start of the array of viewpoints in a list viewpoints response
+ITEMS_START = re.compile(r'"items"\s*:\s*\[')
+
+# The pagination token of a list viewpoints response, found in the text around the array of viewpoints
+NEXT_TOKEN = re.compile(r'"next_token"\s*:\s*("(?:[^"\\]|\\.)*"|null)')
+
+_SEPARATORS = " \t\r\n,"
+
+
+class ViewpointListParser:
+    """
+    :class:`ViewpointListParser` incrementally parses a list viewpoints response as it is read from the connection.
+    Each viewpoint in the items array is decoded as soon as it has been received and reduced to its ID and status,
+    so memory use is bounded by the size of a single viewpoint rather than the size of the page. Text outside the
+    array is kept to find the pagination token.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._outside: List[str] = []
+        self._in_items = False
+        self._items_complete = False
+
+    def feed(self, text: str) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Parse the next chunk of the response.
+
+        :param text: The next chunk of the response body.
+        :return: The (viewpoint ID, viewpoint status) of every viewpoint completed by the chunk.
+        """
+        self._buffer += text
+        viewpoints: List[Tuple[Optional[str], Optional[str]]] = []
+        if not self._in_items and not self._items_complete:
+            match = ITEMS_START.search(self._buffer)
+            if match is None:
+                return viewpoints
+            items_start = match.end()
+            self._outside.append(self._buffer[: match.start()])
+            self._buffer = self._buffer[items_start:]
+            self._in_items = True
+        if self._in_items:
+            viewpoints = self._parse_items()
+        if self._items_complete:
+            self._outside.append(self._buffer)
+            self._buffer = ""
+        return viewpoints
+
+    def _parse_items(self) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Decode every viewpoint that has been completely received, leaving a partial viewpoint in the buffer.
+
+        :return: The (viewpoint ID, viewpoint status) of every decoded viewpoint.
+        """
+        viewpoints = []
+        position = 0
+        while True:
+            while position < len(self._buffer) and self._buffer[position] in _SEPARATORS:
+                position += 1
+            if position >= len(self._buffer):
+                break
+            if self._buffer[position] == "]":
+                position += 1
+                self._in_items = False
+                self._items_complete = True
+                break
+            try:
+                viewpoint, position = self._decoder.raw_decode(self._buffer, position)
+            except json.JSONDecodeError:
+                # The rest of the viewpoint has not been received yet
+                break
+            if isinstance(viewpoint, dict):
+                viewpoints.append((viewpoint.get("viewpoint_id"), viewpoint.get("viewpoint_status")))
+        self._buffer = self._buffer[position:]
+        return viewpoints
+
+    def close(self) -> Optional[str]:
+        """
+        Finish parsing once the whole response has been fed.
+
+        :return: The token of the next page, or None if this was the last page.
+        """
+        if not self._items_complete:
+            raise ValueError("List viewpoints response ended before its items were complete")
+        match = NEXT_TOKEN.search("".join(self._outside))
+        return json.loads(match.group(1)) if match else None
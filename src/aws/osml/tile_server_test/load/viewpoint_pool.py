@@ -0,0 +1,326 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import logging
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from secrets import token_hex
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import gevent
+from gevent.event import Event
+from gevent.pool import Pool
+
+from .viewpoint_watcher import ViewpointReadinessWatcher
+
+VIEWPOINT_ID = "viewpoint_id"
+
+
+@dataclass(frozen=True)
+class ViewpointConfig:
+    """
+    The combination of source image and viewpoint options that identifies interchangeable pooled viewpoints.
+
+    Attributes:
+        image_key: The S3 object key of the source image.
+        tile_size: The tile size the viewpoint is created with.
+        range_adjustment: The range adjustment the viewpoint is created with.
+    """
+
+    image_key: str
+    tile_size: int
+    range_adjustment: str
+
+
+def pooled_image_keys(
+    image_keys: Sequence[str], max_images: int, image_zipf_skew: float, worker_index: int = 0, worker_count: int = 1
+) -> List[str]:
+    """
+    Choose the images a worker keeps pooled viewpoints of. At most `max_images` images are pooled across all of the
+    workers: the most popular images when they are chosen following a Zipf popularity model, otherwise a random sample
+    that every worker draws alike. The images are then dealt out across the workers so each is pooled by one of them,
+    and a worker left without one shares an image with another.
+
+    :param image_keys: The keys of the test images, in popularity order.
+    :param max_images: The most images pooled across all of the workers, 0 for no limit.
+    :param image_zipf_skew: The skew of the image popularity model, 0 for uniform.
+    :param worker_index: The index of this worker.
+    :param worker_count: The number of workers the images are split across.
+    :return: The keys of the images this worker pools, in popularity order.
+    """
+    image_keys = list(image_keys)
+    if 0 < max_images < len(image_keys):
+        if image_zipf_skew > 0:
+            image_keys = image_keys[:max_images]
+        else:
+            # Seeded so every worker draws the same sample
+            sample = random.Random(len(image_keys)).sample(range(len(image_keys)), max_images)
+            image_keys = [image_keys[index] for index in sorted(sample)]
+    if worker_count <= 1 or not image_keys:
+        return image_keys
+    first = worker_index % worker_count
+    share = image_keys[first::worker_count]
+    return share or [image_keys[worker_index % len(image_keys)]]
+
+
+@dataclass
+class ViewpointLease:
+    """
+    A time limited claim on a pooled viewpoint. A viewpoint will not be retired while it has unexpired leases.
+
+    Attributes:
+        viewpoint_id: The ID of the leased viewpoint.
+        config: The configuration the viewpoint was created with.
+        expires_at: Monotonic time after which the lease no longer protects the viewpoint from retirement.
+        token: Unique identifier of this lease.
+    """
+
+    viewpoint_id: str
+    config: ViewpointConfig
+    expires_at: float
+    token: str = field(default_factory=lambda: token_hex(8))
+
+
+@dataclass
+class _PooledViewpoint:
+    viewpoint_id: str
+    config: ViewpointConfig
+    state: str = "CREATING"
+    ready_at: float = 0.0
+    leases: Dict[str, float] = field(default_factory=dict)
+
+    def active_leases(self, now: float) -> int:
+        return sum(1 for expires_at in self.leases.values() if expires_at > now)
+
+
+class ViewpointPool:
+    """
+    :class:`ViewpointPool` keeps a fixed number of READY viewpoints for every :class:`ViewpointConfig` so that
+    simulated users can fetch tiles without paying the cost of viewpoint ingest on every task. Viewpoints are handed
+    out with leases; once a viewpoint has been READY for longer than `viewpoint_ttl` a replacement is created in the
+    background, and the old viewpoint is deleted after the replacement is READY and its outstanding leases are released
+    or expire.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        watcher: ViewpointReadinessWatcher,
+        test_images_bucket: str,
+        configs: List[ViewpointConfig],
+        size_per_config: int = 1,
+        viewpoint_ttl: float = 900.0,
+        lease_ttl: float = 300.0,
+        maintenance_interval: float = 5.0,
+        max_concurrent_creates: int = 10,
+    ) -> None:
+        """
+        Initialize the pool.
+
+        :param client: The Locust HTTP client used to create and delete pooled viewpoints.
+        :param watcher: The readiness watcher used to wait for new viewpoints.
+        :param test_images_bucket: Bucket containing the test images.
+        :param configs: Every viewpoint configuration the pool should keep viewpoints for.
+        :param size_per_config: Number of viewpoints to keep for each configuration.
+        :param viewpoint_ttl: Seconds a viewpoint may serve leases before it is retired and replaced.
+        :param lease_ttl: Seconds after which an unreleased lease stops protecting a viewpoint from retirement.
+        :param maintenance_interval: Seconds between background checks for viewpoints to retire or replace.
+        :param max_concurrent_creates: Maximum number of viewpoints being created at the same time.
+        """
+        self.client = client
+        self.watcher = watcher
+        self.test_images_bucket = test_images_bucket
+        self.configs = configs
+        self.size_per_config = size_per_config
+        self.viewpoint_ttl = viewpoint_ttl
+        self.lease_ttl = lease_ttl
+        self.maintenance_interval = maintenance_interval
+        self._viewpoints: Dict[str, _PooledViewpoint] = {}
+        self._workers = Pool(max_concurrent_creates)
+        self._changed = Event()
+        self._greenlet: Optional[gevent.Greenlet] = None
+
+    def start(self) -> None:
+        """
+        Start the background greenlet that fills, retires, and replaces pooled viewpoints.
+        """
+        if self._greenlet is None or self._greenlet.dead:
+            self._greenlet = gevent.spawn(self._maintain)
+
+    def stop(self) -> None:
+        """
+        Stop background maintenance and delete every viewpoint owned by the pool.
+        """
+        if self._greenlet is not None:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+        self._workers.kill(block=True)
+        for pooled in list(self._viewpoints.values()):
+            self._retire(pooled)
+
+    def acquire(self, config: ViewpointConfig, timeout: Optional[float] = None) -> Optional[ViewpointLease]:
+        """
+        Lease a READY viewpoint for the given configuration, blocking until one is available.
+
+        :param config: The configuration of the viewpoint to lease.
+        :param timeout: Maximum seconds to wait for a viewpoint, or None to wait indefinitely.
+        :return: The lease, or None if no viewpoint became available before the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self._changed
+            now = time.monotonic()
+            candidates = [
+                pooled for pooled in self._viewpoints.values() if pooled.config == config and pooled.state == "READY"
+            ]
+            if not candidates:
+                # Keep serving from viewpoints that are waiting to be retired until their replacements are READY
+                candidates = [
+                    pooled for pooled in self._viewpoints.values() if pooled.config == config and pooled.state == "RETIRING"
+                ]
+            if candidates:
+                # Spread users across the pooled viewpoints by preferring the least leased one
+                fewest = min(pooled.active_leases(now) for pooled in candidates)
+                pooled = random.choice([p for p in candidates if p.active_leases(now) == fewest])
+                lease = ViewpointLease(pooled.viewpoint_id, config, now + self.lease_ttl)
+                pooled.leases[lease.token] = lease.expires_at
+                return lease
+            if deadline is not None and now >= deadline:
+                return None
+            changed.wait(timeout=None if deadline is None else deadline - now)
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every configuration has at least one READY viewpoint.
+
+        :param timeout: Maximum seconds to wait, or None to wait indefinitely.
+        :return: True if the pool is ready, False if the timeout expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self._changed
+            ready_configs = {pooled.config for pooled in self._viewpoints.values() if pooled.state == "READY"}
+            if all(config in ready_configs for config in self.configs):
+                return True
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return False
+            changed.wait(timeout=None if deadline is None else deadline - now)
+
+    def release(self, lease: ViewpointLease) -> None:
+        """
+        Return a leased viewpoint to the pool.
+
+        :param lease: The lease returned by :meth:`acquire`.
+        """
+        pooled = self._viewpoints.get(lease.viewpoint_id)
+        if pooled is not None:
+            pooled.leases.pop(lease.token, None)
+
+    @contextmanager
+    def lease(self, config: ViewpointConfig, timeout: Optional[float] = None) -> Iterator[Optional[str]]:
+        """
+        Context manager that leases a viewpoint for the duration of the block.
+
+        :param config: The configuration of the viewpoint to lease.
+        :param timeout: Maximum seconds to wait for a viewpoint, or None to wait indefinitely.
+        :return: The ID of the leased viewpoint, or None if no viewpoint became available before the timeout.
+        """
+        lease = self.acquire(config, timeout)
+        try:
+            yield lease.viewpoint_id if lease is not None else None
+        finally:
+            if lease is not None:
+                self.release(lease)
+
+    def _maintain(self) -> None:
+        """
+        Background loop that retires expired viewpoints and tops up every configuration to its target size.
+        """
+        while True:
+            now = time.monotonic()
+            for pooled in list(self._viewpoints.values()):
+                if pooled.state == "READY" and now - pooled.ready_at >= self.viewpoint_ttl:
+                    pooled.state = "RETIRING"
+                if (
+                    pooled.state == "RETIRING"
+                    and pooled.active_leases(now) == 0
+                    and any(p.config == pooled.config and p.state == "READY" for p in self._viewpoints.values())
+                ):
+                    pooled.state = "DELETING"
+                    self._workers.spawn(self._retire, pooled)
+
+            for config in self.configs:
+                live = sum(
+                    1
+                    for pooled in self._viewpoints.values()
+                    if pooled.config == config and pooled.state in ["CREATING", "READY"]
+                )
+                for _ in range(self.size_per_config - live):
+                    pooled = _PooledViewpoint(viewpoint_id=token_hex(16), config=config)
+                    self._viewpoints[pooled.viewpoint_id] = pooled
+                    self._workers.spawn(self._create, pooled)
+
+            gevent.sleep(self.maintenance_interval)
+
+    def _create(self, pooled: _PooledViewpoint) -> None:
+        """
+        Create a pooled viewpoint and make it available for leases once it is READY.
+
+        :param pooled: The pool entry to create a viewpoint for.
+        """
+        created = False
+        with self.client.post(
+            "/viewpoints",
+            name="CreateViewpoint",
+            catch_response=True,
+            json={
+                "viewpoint_id": pooled.viewpoint_id,
+                "viewpoint_name": "LocustPool-Viewpoint-" + pooled.viewpoint_id,
+                "bucket_name": self.test_images_bucket,
+                "object_key": pooled.config.image_key,
+                "tile_size": pooled.config.tile_size,
+                "range_adjustment": pooled.config.range_adjustment,
+            },
+        ) as response:
+            try:
+                created = VIEWPOINT_ID in response.json()
+            except Exception:
+                pass
+            if not created:
+                response.failure(f"'{VIEWPOINT_ID}' missing from response {response.text}")
+
+        if not created:
+            self._viewpoints.pop(pooled.viewpoint_id, None)
+            return
+
+        final_status = self.watcher.wait(self.client, pooled.viewpoint_id)
+        if final_status == "READY":
+            pooled.state = "READY"
+            pooled.ready_at = time.monotonic()
+            self._notify()
+        else:
+            logging.warning(f"Pooled viewpoint {pooled.viewpoint_id} finished with status {final_status}")
+            self._retire(pooled)
+
+    def _retire(self, pooled: _PooledViewpoint) -> None:
+        """
+        Remove a viewpoint from the pool and delete it from the tile server.
+
+        :param pooled: The pool entry to retire.
+        """
+        self._viewpoints.pop(pooled.viewpoint_id, None)
+        with self.client.delete(
+            f"/viewpoints/{pooled.viewpoint_id}", name="DeleteViewpoint", catch_response=True
+        ) as response:
+            if response.status_code == 404:
+                # The viewpoint was never created or has already been removed
+                response.success()
+
+    def _notify(self) -> None:
+        """
+        Wake every greenlet blocked in :meth:`acquire` so it can look for a newly available viewpoint.
+        """
+        changed, self._changed = self._changed, Event()
+        changed.set()
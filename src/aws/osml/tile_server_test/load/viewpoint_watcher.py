@@ -0,0 +1,193 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import gevent
+from gevent.event import AsyncResult, Event
+from gevent.pool import Pool
+
+VIEWPOINT_STATUS = "viewpoint_status"
+
+TERMINAL_VIEWPOINT_STATUSES = ["READY", "FAILED", "DELETED"]
+
+READINESS_POLL_REQUEST_NAME = "DescribeViewpoint (readiness poll)"
+
+
+@dataclass
+class _PendingViewpoint:
+    """
+    Book-keeping for a single viewpoint the watcher is polling on behalf of one or more waiting users.
+    """
+
+    viewpoint_id: str
+    client: Any
+    deadline: float
+    next_poll: float
+    interval: float
+    result: AsyncResult = field(default_factory=AsyncResult)
+    last_status: str = "NOT_FOUND"
+    waiters: int = 0
+
+
+class ViewpointReadinessWatcher:
+    """
+    :class:`ViewpointReadinessWatcher` polls the status of every pending viewpoint from a single greenlet per Locust
+    worker. Each viewpoint is polled on its own adaptive schedule that starts at `initial_interval` and grows by
+    `backoff` up to `max_interval`, so freshly created viewpoints are detected quickly while long-running ingests
+    do not flood the server. Users block on a gevent event until the viewpoint reaches a terminal status.
+
+    The describe calls are reported under :data:`READINESS_POLL_REQUEST_NAME` so they do not skew the latency
+    statistics of the `DescribeViewpoint` operation.
+    """
+
+    def __init__(
+        self,
+        initial_interval: float = 1.0,
+        max_interval: float = 15.0,
+        backoff: float = 1.5,
+        timeout: float = 1800.0,
+        max_concurrency: int = 10,
+    ) -> None:
+        """
+        Initialize the watcher.
+
+        :param initial_interval: Seconds to wait before the first status poll of a new viewpoint.
+        :param max_interval: Upper bound on the seconds between polls of a single viewpoint.
+        :param backoff: Multiplier applied to a viewpoint's polling interval after each non-terminal poll.
+        :param timeout: Seconds to wait for a viewpoint to reach a terminal status before giving up.
+        :param max_concurrency: Maximum number of describe requests the watcher will have in flight at once.
+        """
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self._pending: Dict[str, _PendingViewpoint] = {}
+        self._pool = Pool(max_concurrency)
+        self._wakeup = Event()
+        self._greenlet: Optional[gevent.Greenlet] = None
+
+    def start(self) -> None:
+        """
+        Start the polling greenlet if it is not already running.
+        """
+        if self._greenlet is None or self._greenlet.dead:
+            self._greenlet = gevent.spawn(self._run)
+
+    def stop(self) -> None:
+        """
+        Stop the polling greenlet and release every waiting user with the last status observed.
+        """
+        if self._greenlet is not None:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+        self._pool.kill(block=False)
+        for pending in list(self._pending.values()):
+            self._resolve(pending, pending.last_status)
+
+    def wait(self, client: Any, viewpoint_id: str, timeout: Optional[float] = None) -> str:
+        """
+        Block the calling greenlet until the viewpoint reaches a terminal status or the timeout expires.
+
+        :param client: The Locust HTTP client to issue describe requests with.
+        :param viewpoint_id: ID of the viewpoint to wait for.
+        :param timeout: Optional override for the watcher's default timeout in seconds.
+        :return: The final status of the viewpoint, or the last observed status if the wait timed out.
+        """
+        self.start()
+        pending = self._pending.get(viewpoint_id)
+        if pending is None:
+            now = time.monotonic()
+            pending = _PendingViewpoint(
+                viewpoint_id=viewpoint_id,
+                client=client,
+                deadline=now + (timeout if timeout is not None else self.timeout),
+                next_poll=now + self.initial_interval,
+                interval=self.initial_interval,
+            )
+            self._pending[viewpoint_id] = pending
+            self._wakeup.set()
+
+        pending.waiters += 1
+        try:
+            return pending.result.get()
+        finally:
+            pending.waiters -= 1
+            if pending.waiters <= 0 and not pending.result.ready():
+                # The last waiting user was stopped, no reason to keep polling for this viewpoint
+                self._pending.pop(viewpoint_id, None)
+
+    def is_timed_out(self, status: str) -> bool:
+        """
+        Determine if a status returned by :meth:`wait` means the watcher gave up on the viewpoint.
+
+        :param status: Status returned by :meth:`wait`.
+        :return: True if the status is not a terminal viewpoint status.
+        """
+        return status not in TERMINAL_VIEWPOINT_STATUSES
+
+    def _run(self) -> None:
+        """
+        Main polling loop. Sleeps until the next viewpoint is due, or a new viewpoint is registered, and then
+        describes every viewpoint that is due in parallel.
+        """
+        while True:
+            now = time.monotonic()
+            due = []
+            next_wakeup = None
+            for pending in list(self._pending.values()):
+                if now >= pending.deadline:
+                    logging.warning(
+                        f"Gave up waiting for {pending.viewpoint_id} to become ready. "
+                        f"Final Status was {pending.last_status}"
+                    )
+                    self._resolve(pending, pending.last_status)
+                elif now >= pending.next_poll:
+                    due.append(pending)
+                else:
+                    next_wakeup = min(next_wakeup or pending.next_poll, pending.next_poll)
+
+            for pending in due:
+                self._pool.spawn(self._poll, pending)
+            if due:
+                self._pool.join()
+                continue
+
+            self._wakeup.clear()
+            self._wakeup.wait(timeout=None if next_wakeup is None else max(next_wakeup - now, 0))
+
+    def _poll(self, pending: _PendingViewpoint) -> None:
+        """
+        Describe a single viewpoint and either resolve its waiters or schedule the next poll.
+
+        :param pending: The viewpoint to poll.
+        """
+        status = None
+        with pending.client.get(
+            f"/viewpoints/{pending.viewpoint_id}", name=READINESS_POLL_REQUEST_NAME, catch_response=True
+        ) as response:
+            try:
+                status = response.json().get(VIEWPOINT_STATUS)
+            except Exception:
+                response.failure(f"'{VIEWPOINT_STATUS}' missing from response {response.text}")
+
+        if status is not None:
+            pending.last_status = status
+        if status in TERMINAL_VIEWPOINT_STATUSES:
+            self._resolve(pending, status)
+        else:
+            pending.interval = min(pending.interval * self.backoff, self.max_interval)
+            pending.next_poll = time.monotonic() + pending.interval
+
+    def _resolve(self, pending: _PendingViewpoint, status: str) -> None:
+        """
+        Release every user waiting on a viewpoint and stop polling it.
+
+        :param pending: The viewpoint to resolve.
+        :param status: The status to hand back to the waiting users.
+        """
+        self._pending.pop(pending.viewpoint_id, None)
+        if not pending.result.ready():
+            pending.result.set(status)
@@ -0,0 +1,491 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+# State shared by every simulated user running on a Locust worker. Importing this module registers the custom command
+# line options and the test start/stop listeners that create the shared helpers, so every locustfile in this package
+# can rely on them.
+
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from locust import events
+from locust.contrib.fasthttp import FastHttpSession
+from locust.runners import MasterRunner, WorkerRunner
+
+from .crop_scaling import CropScalingRecorder
+from .dimensions import DimensionRecorder, image_size_class
+from .harness_monitor import HarnessMonitor, HarnessReport
+from .image_discovery import (
+    default_manifest_path,
+    discover_option_test_images,
+    read_manifest_images,
+    test_images_env_options,
+)
+from .latency_histogram import LatencyRecorder
+from .load_results import summarize_load_test, test_duration
+from .tile_encodings import PayloadRecorder
+from .tile_fetcher import TileFetchEngine
+from .tile_validation import TileValidator
+from .viewpoint_pool import ViewpointConfig, ViewpointPool, pooled_image_keys
+from .viewpoint_watcher import ViewpointReadinessWatcher
+
+TILE_SIZES = [256, 512]
+
+RANGE_ADJUSTMENTS = ["NONE", "DRA", "MINMAX"]
+
+# Name of the failed request reported when no pooled viewpoint could be leased in time
+LEASE_VIEWPOINT_REQUEST_NAME = "LeaseViewpoint"
+
+# Shared by every user running on this worker, created when the test starts
+viewpoint_watcher: Optional[ViewpointReadinessWatcher] = None
+viewpoint_pool: Optional[ViewpointPool] = None
+# The images the viewpoint pool of this worker holds viewpoints of, the only images its users may lease
+viewpoint_pool_image_keys: List[str] = []
+tile_fetch_engine: Optional[TileFetchEngine] = None
+tile_validator: Optional[TileValidator] = None
+harness_monitor: Optional[HarnessMonitor] = None
+
+# Additional sections of the load test results contributed by the locustfile, e.g. by its load shape
+load_results_extras: Dict[str, Any] = {}
+
+# Records every request on this process, workers forward their histograms to the master with each stats report
+latency_recorder = LatencyRecorder()
+events.request.add_listener(latency_recorder.on_request)
+
+# Records the size of every tile payload by encoding and tile size, forwarded to the master like the latencies
+payload_recorder = PayloadRecorder()
+events.request.add_listener(payload_recorder.on_request)
+
+# Records the latency of tagged requests by image, tile size, range adjustment, format, and zoom
+dimension_recorder = DimensionRecorder()
+events.request.add_listener(dimension_recorder.on_request)
+
+# Records the latency of crop requests by output format and window size
+crop_recorder = CropScalingRecorder()
+events.request.add_listener(crop_recorder.on_request)
+
+# Size in bytes of every test image whose size is known from image discovery
+test_image_sizes: Dict[str, int] = {}
+# Keys of the test images this process discovered or read from the manifest. They are not stored in the options
+# because the master replaces the options of a worker with its own when the test starts.
+discovered_test_image_keys: List[str] = []
+
+# Width and height in pixels of every test image whose statistics have been fetched by a user on this worker
+test_image_dimensions: Dict[str, Tuple[int, int]] = {}
+
+# Saturation samples of every load generator process, collected where the results are written
+harness_report = HarnessReport()
+
+
+@events.init_command_line_parser.add_listener
+def _(parser):
+    test_images = test_images_env_options()
+    parser.add_argument("--test_images_bucket", type=str, default=test_images.test_images_bucket)
+    parser.add_argument("--test_image_keys", type=str, default=os.environ.get("LOCUST_TEST_IMAGE_KEYS", "[]"))
+    parser.add_argument("--test_images_prefix", type=str, default=test_images.test_images_prefix)
+    parser.add_argument("--test_images_extensions", type=str, default=test_images.test_images_extensions)
+    parser.add_argument("--test_images_min_size", type=int, default=test_images.test_images_min_size)
+    parser.add_argument("--test_images_max_size", type=int, default=test_images.test_images_max_size)
+    parser.add_argument("--test_images_manifest", type=str, default=test_images.test_images_manifest)
+    parser.add_argument("--test_images_manifest_max_age", type=float, default=test_images.test_images_manifest_max_age)
+    parser.add_argument(
+        "--test_images_from_manifest",
+        action="store_true",
+        default=os.environ.get("LOCUST_TEST_IMAGES_FROM_MANIFEST", "false").lower() == "true",
+    )
+    parser.add_argument("--latency_histogram_file", type=str, default=os.environ.get("LOCUST_LATENCY_HISTOGRAM_FILE", ""))
+    parser.add_argument("--load_results_file", type=str, default=os.environ.get("LOCUST_LOAD_RESULTS_FILE", ""))
+    parser.add_argument(
+        "--viewpoint_poll_initial_interval",
+        type=float,
+        default=float(os.environ.get("LOCUST_VIEWPOINT_POLL_INITIAL_INTERVAL", "1.0")),
+    )
+    parser.add_argument(
+        "--viewpoint_poll_max_interval",
+        type=float,
+        default=float(os.environ.get("LOCUST_VIEWPOINT_POLL_MAX_INTERVAL", "15.0")),
+    )
+    parser.add_argument(
+        "--viewpoint_poll_backoff", type=float, default=float(os.environ.get("LOCUST_VIEWPOINT_POLL_BACKOFF", "1.5"))
+    )
+    parser.add_argument(
+        "--viewpoint_ready_timeout", type=float, default=float(os.environ.get("LOCUST_VIEWPOINT_READY_TIMEOUT", "1800"))
+    )
+    parser.add_argument("--viewpoint_pool_size", type=int, default=int(os.environ.get("LOCUST_VIEWPOINT_POOL_SIZE", "0")))
+    parser.add_argument(
+        "--viewpoint_pool_ttl", type=float, default=float(os.environ.get("LOCUST_VIEWPOINT_POOL_TTL", "900"))
+    )
+    parser.add_argument(
+        "--viewpoint_pool_lease_ttl", type=float, default=float(os.environ.get("LOCUST_VIEWPOINT_POOL_LEASE_TTL", "300"))
+    )
+    parser.add_argument(
+        "--viewpoint_pool_lease_timeout",
+        type=float,
+        default=float(os.environ.get("LOCUST_VIEWPOINT_POOL_LEASE_TIMEOUT", "300")),
+    )
+    parser.add_argument(
+        "--viewpoint_pool_images", type=int, default=int(os.environ.get("LOCUST_VIEWPOINT_POOL_IMAGES", "20"))
+    )
+    parser.add_argument(
+        "--viewpoint_pool_workers", type=int, default=int(os.environ.get("LOCUST_VIEWPOINT_POOL_WORKERS", "1"))
+    )
+    parser.add_argument("--image_zipf_skew", type=float, default=float(os.environ.get("LOCUST_IMAGE_ZIPF_SKEW", "0")))
+    parser.add_argument("--tile_zipf_skew", type=float, default=float(os.environ.get("LOCUST_TILE_ZIPF_SKEW", "0")))
+    parser.add_argument("--tile_window", type=int, default=int(os.environ.get("LOCUST_TILE_WINDOW", "5")))
+    parser.add_argument(
+        "--tile_worker_max_in_flight", type=int, default=int(os.environ.get("LOCUST_TILE_WORKER_MAX_IN_FLIGHT", "0"))
+    )
+    parser.add_argument("--tile_encodings", type=str, default=os.environ.get("LOCUST_TILE_ENCODINGS", "PNG:NONE"))
+    parser.add_argument(
+        "--tile_cache_repeat_fraction",
+        type=float,
+        default=float(os.environ.get("LOCUST_TILE_CACHE_REPEAT_FRACTION", "0")),
+    )
+    parser.add_argument(
+        "--tile_validation_sample_rate",
+        type=float,
+        default=float(os.environ.get("LOCUST_TILE_VALIDATION_SAMPLE_RATE", "0.01")),
+    )
+    parser.add_argument("--tile_expected_bands", type=int, default=int(os.environ.get("LOCUST_TILE_EXPECTED_BANDS", "0")))
+    parser.add_argument("--map_viewport_width", type=int, default=int(os.environ.get("LOCUST_MAP_VIEWPORT_WIDTH", "4")))
+    parser.add_argument("--map_viewport_height", type=int, default=int(os.environ.get("LOCUST_MAP_VIEWPORT_HEIGHT", "3")))
+    parser.add_argument("--map_prefetch_ring", type=int, default=int(os.environ.get("LOCUST_MAP_PREFETCH_RING", "1")))
+    parser.add_argument("--map_session_steps", type=int, default=int(os.environ.get("LOCUST_MAP_SESSION_STEPS", "10")))
+    parser.add_argument(
+        "--map_session_think_time",
+        type=float,
+        default=float(os.environ.get("LOCUST_MAP_SESSION_THINK_TIME", "0.5")),
+    )
+    parser.add_argument("--dimension_max_values", type=int, default=int(os.environ.get("LOCUST_DIMENSION_MAX_VALUES", "50")))
+    parser.add_argument(
+        "--dimension_max_combinations",
+        type=int,
+        default=int(os.environ.get("LOCUST_DIMENSION_MAX_COMBINATIONS", "500")),
+    )
+    parser.add_argument("--dimension_table_file", type=str, default=os.environ.get("LOCUST_DIMENSION_TABLE_FILE", ""))
+    parser.add_argument("--list_page_size", type=int, default=int(os.environ.get("LOCUST_LIST_PAGE_SIZE", "100")))
+    parser.add_argument("--discover_fan_out", type=int, default=int(os.environ.get("LOCUST_DISCOVER_FAN_OUT", "5")))
+    parser.add_argument(
+        "--discover_max_viewpoints", type=int, default=int(os.environ.get("LOCUST_DISCOVER_MAX_VIEWPOINTS", "0"))
+    )
+    parser.add_argument("--crop_min_size", type=int, default=int(os.environ.get("LOCUST_CROP_MIN_SIZE", "64")))
+    parser.add_argument("--crop_max_size", type=int, default=int(os.environ.get("LOCUST_CROP_MAX_SIZE", "2048")))
+    parser.add_argument("--crop_size_steps", type=int, default=int(os.environ.get("LOCUST_CROP_SIZE_STEPS", "6")))
+    parser.add_argument("--crop_formats", type=str, default=os.environ.get("LOCUST_CROP_FORMATS", "PNG,JPEG"))
+    parser.add_argument("--crops_per_viewpoint", type=int, default=int(os.environ.get("LOCUST_CROPS_PER_VIEWPOINT", "0")))
+    parser.add_argument(
+        "--harness_monitor_interval",
+        type=float,
+        default=float(os.environ.get("LOCUST_HARNESS_MONITOR_INTERVAL", "1.0")),
+    )
+    parser.add_argument(
+        "--harness_cpu_threshold", type=float, default=float(os.environ.get("LOCUST_HARNESS_CPU_THRESHOLD", "90"))
+    )
+    parser.add_argument(
+        "--harness_lag_threshold_ms",
+        type=float,
+        default=float(os.environ.get("LOCUST_HARNESS_LAG_THRESHOLD_MS", "100")),
+    )
+
+
+def parse_test_image_keys(test_image_keys) -> List[str]:
+    """
+    Normalize the --test_image_keys option, which is a list when set programmatically and a JSON string when set on
+    the command line or through the environment.
+
+    :param test_image_keys: The parsed option value.
+    :return: The list of test image keys.
+    """
+    if isinstance(test_image_keys, list):
+        return test_image_keys
+    return json.loads(test_image_keys)
+
+
+def viewpoint_dimensions(config: ViewpointConfig) -> Dict[str, Any]:
+    """
+    The dimensions every request to a viewpoint is tagged with, so its latency can be broken down by image, image
+    size class, tile size, and range adjustment.
+
+    :param config: The configuration the viewpoint was created with.
+    :return: The dimensions of the viewpoint.
+    """
+    return {
+        "image": config.image_key,
+        "image_size_class": image_size_class(test_image_sizes.get(config.image_key)),
+        "tile_size": config.tile_size,
+        "range_adjustment": config.range_adjustment,
+    }
+
+
+@contextmanager
+def lease_pooled_viewpoint(environment, config: ViewpointConfig) -> Iterator[Optional[str]]:
+    """
+    Lease a viewpoint from the worker's pool for the duration of the block, waiting at most
+    --viewpoint_pool_lease_timeout seconds, 0 to wait indefinitely. When none becomes available in time, e.g.
+    because the viewpoints of the configuration keep failing, a failed LeaseViewpoint request is reported so the lost
+    load shows up in the results.
+
+    :param environment: The Locust environment.
+    :param config: The configuration of the viewpoint to lease.
+    :return: The ID of the leased viewpoint, or None if none became available in time.
+    """
+    timeout = environment.parsed_options.viewpoint_pool_lease_timeout
+    start = time.perf_counter()
+    with viewpoint_pool.lease(config, timeout if timeout > 0 else None) as viewpoint_id:
+        if viewpoint_id is None:
+            environment.events.request.fire(
+                request_type="POOL",
+                name=LEASE_VIEWPOINT_REQUEST_NAME,
+                response_time=(time.perf_counter() - start) * 1000,
+                response_length=0,
+                response=None,
+                context={},
+                exception=TimeoutError(f"No READY viewpoint of {config} became available within {timeout:g}s"),
+            )
+        yield viewpoint_id
+
+
+def resolve_test_image_keys(options) -> List[str]:
+    """
+    :param options: The parsed options.
+    :return: The --test_image_keys, or the keys of the images this process discovered when none were given.
+    """
+    return parse_test_image_keys(options.test_image_keys) or discovered_test_image_keys
+
+
+def discover_test_image_keys(options) -> List[str]:
+    """
+    Find the test images in the --test_images_bucket under --test_images_prefix, reusing the local manifest written by
+    an earlier run when the images are unchanged. The size of every image is kept in :data:`test_image_sizes`.
+
+    :param options: The parsed options.
+    :return: The keys of the test images, ordered by key.
+    """
+    images = discover_option_test_images(options)
+    test_image_sizes.update({image.key: image.size for image in images})
+    return [image.key for image in images]
+
+
+@events.init.add_listener
+def _(environment, **kwargs):
+    """
+    Discover the test images when no --test_image_keys were given, once per process before any user starts. With
+    --test_images_from_manifest, e.g. when the load test processor discovered the images itself, the keys are read
+    from the manifest as written instead. When the keys were given the image sizes are read from the manifest if
+    there is one.
+
+    :param environment: The environment object containing parsed options.
+    :param kwargs: Additional keyword arguments (unused).
+    :return: None
+    """
+    global discovered_test_image_keys
+    options = environment.parsed_options
+    if options is None or isinstance(environment.runner, MasterRunner) or not options.test_images_bucket:
+        return
+    manifest_path = options.test_images_manifest or default_manifest_path(
+        options.test_images_bucket, options.test_images_prefix
+    )
+    if parse_test_image_keys(options.test_image_keys):
+        test_image_sizes.update({image.key: image.size for image in read_manifest_images(manifest_path)})
+    elif options.test_images_from_manifest:
+        images = read_manifest_images(manifest_path)
+        if not images:
+            logging.warning(f"No test images found in the manifest {manifest_path}")
+        test_image_sizes.update({image.key: image.size for image in images})
+        discovered_test_image_keys = [image.key for image in images]
+    else:
+        discovered_test_image_keys = discover_test_image_keys(options)
+
+
+@events.test_start.add_listener
+def _(environment, **kwargs):
+    """
+    This method logs the test images bucket and object prefix from the given environment and starts the shared
+    viewpoint readiness watcher on every runner that hosts users.
+
+    :param environment: The environment object containing parsed options.
+    :param kwargs: Additional keyword arguments (unused).
+    :return: None
+    """
+    global viewpoint_watcher, viewpoint_pool, viewpoint_pool_image_keys, tile_fetch_engine, tile_validator, harness_monitor
+    logging.info(f"Using bucket: {environment.parsed_options.test_images_bucket}")
+    if not isinstance(environment.runner, MasterRunner):
+        options = environment.parsed_options
+        logging.info(f"Using {len(resolve_test_image_keys(options))} images")
+        viewpoint_watcher = ViewpointReadinessWatcher(
+            initial_interval=options.viewpoint_poll_initial_interval,
+            max_interval=options.viewpoint_poll_max_interval,
+            backoff=options.viewpoint_poll_backoff,
+            timeout=options.viewpoint_ready_timeout,
+        )
+        viewpoint_watcher.start()
+        tile_fetch_engine = TileFetchEngine(
+            default_window=options.tile_window, max_in_flight_per_worker=options.tile_worker_max_in_flight
+        )
+        tile_validator = TileValidator(
+            sample_rate=options.tile_validation_sample_rate, expected_bands=options.tile_expected_bands
+        )
+        dimension_recorder.max_values = options.dimension_max_values
+        dimension_recorder.max_combinations = options.dimension_max_combinations
+        if options.harness_monitor_interval > 0:
+            harness_monitor = HarnessMonitor(
+                interval=options.harness_monitor_interval,
+                cpu_threshold=options.harness_cpu_threshold,
+                lag_threshold_ms=options.harness_lag_threshold_ms,
+                # A standalone process reports its samples directly, workers send them with their stats reports
+                on_sample=(
+                    None
+                    if isinstance(environment.runner, WorkerRunner)
+                    else lambda sample: harness_report.add("local", sample)
+                ),
+            )
+            harness_monitor.start()
+
+        if options.viewpoint_pool_size > 0:
+            viewpoint_pool_image_keys = pooled_image_keys(
+                resolve_test_image_keys(options),
+                options.viewpoint_pool_images,
+                options.image_zipf_skew,
+                environment.runner.worker_index,
+                options.viewpoint_pool_workers,
+            )
+            logging.info(f"Pooling viewpoints of {len(viewpoint_pool_image_keys)} test images")
+            viewpoint_pool = ViewpointPool(
+                client=FastHttpSession(base_url=environment.host, request_event=environment.events.request, user=None),
+                watcher=viewpoint_watcher,
+                test_images_bucket=options.test_images_bucket,
+                configs=[
+                    ViewpointConfig(image_key, tile_size, range_adjustment)
+                    for image_key in viewpoint_pool_image_keys
+                    for tile_size in TILE_SIZES
+                    for range_adjustment in RANGE_ADJUSTMENTS
+                ],
+                size_per_config=options.viewpoint_pool_size,
+                viewpoint_ttl=options.viewpoint_pool_ttl,
+                lease_ttl=options.viewpoint_pool_lease_ttl,
+            )
+            viewpoint_pool.start()
+
+
+@events.test_stop.add_listener
+def _(environment, **kwargs):
+    """
+    This method deletes any pooled viewpoints, stops the shared viewpoint readiness watcher, releasing any users
+    still waiting on it, and stops the harness monitor.
+
+    :param environment: The environment object containing parsed options.
+    :param kwargs: Additional keyword arguments (unused).
+    :return: None
+    """
+    global viewpoint_watcher, viewpoint_pool
+    if viewpoint_pool is not None:
+        viewpoint_pool.stop()
+        viewpoint_pool = None
+    if viewpoint_watcher is not None:
+        viewpoint_watcher.stop()
+        viewpoint_watcher = None
+    if harness_monitor is not None:
+        harness_monitor.stop()
+
+
+@events.report_to_master.add_listener
+def _(client_id, data, **kwargs):
+    """
+    This method attaches the latency, payload, dimension, and crop histograms, and the harness monitor samples,
+    recorded since the previous report to the worker's stats report.
+
+    :param client_id: The ID of the worker sending the report.
+    :param data: The report sent to the master.
+    :param kwargs: Additional keyword arguments (unused).
+    :return: None
+    """
+    data["latency_histograms"] = latency_recorder.export(reset=True)
+    data["payload_histograms"] = payload_recorder.export(reset=True)
+    data["dimension_histograms"] = dimension_recorder.export(reset=True)
+    data["crop_histograms"] = crop_recorder.export(reset=True)
+    if harness_monitor is not None:
+        data["harness_samples"] = harness_monitor.export(reset=True)
+
+
+@events.worker_report.add_listener
+def _(client_id, data, **kwargs):
+    """
+    This method merges the latency, payload, dimension, and crop histograms, and the harness monitor samples,
+    reported by a worker into the master's totals.
+
+    :param client_id: The ID of the worker that sent the report.
+    :param data: The report received from the worker.
+    :param kwargs: Additional keyword arguments (unused).
+    :return: None
+    """
+    if "latency_histograms" in data:
+        latency_recorder.merge_export(data["latency_histograms"])
+    if "payload_histograms" in data:
+        payload_recorder.merge_export(data["payload_histograms"])
+    if "dimension_histograms" in data:
+        dimension_recorder.merge_export(data["dimension_histograms"])
+    if "crop_histograms" in data:
+        crop_recorder.merge_export(data["crop_histograms"])
+    if "harness_samples" in data:
+        harness_report.merge_export(client_id, data["harness_samples"])
+
+
+@events.quitting.add_listener
+def _(environment, **kwargs):
+    """
+    This method logs the high resolution latency percentiles of every request, the tile payload throughput of every
+    encoding, the crop latency of every window size, and how long each load generator was saturated. It writes the
+    mergeable histograms to --latency_histogram_file, the latency by dimension to --dimension_table_file, and the
+    per-endpoint throughput and latency results to --load_results_file, when they are set.
+
+    :param environment: The environment object containing parsed options.
+    :param kwargs: Additional keyword arguments (unused).
+    :return: None
+    """
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    for key, summary in latency_recorder.summary().items():
+        logging.info(
+            f"{key}: count={summary['count']} failures={summary['failures']} p50={summary['p50']:.2f}ms "
+            f"p99={summary['p99']:.2f}ms p99.9={summary['p99.9']:.2f}ms max={summary['max']:.2f}ms"
+        )
+    for key, summary in payload_recorder.throughput(test_duration(environment.stats)).items():
+        logging.info(
+            f"{key}: count={summary['count']} p50={summary['p50']:.0f}B p99={summary['p99']:.0f}B "
+            f"throughput={summary['bytes_per_second'] / 1e6:.2f}MB/s bytes/pixel={summary['bytes_per_pixel']:.3f}"
+        )
+    for crop_format, curve in crop_recorder.curve().items():
+        for point in curve:
+            exponent = point["scaling_exponent"]
+            logging.info(
+                f"GetCrop {crop_format} {point['window_size']}px: count={point['count']} p50={point['p50']:.2f}ms "
+                f"p99={point['p99']:.2f}ms {point['megapixels_per_second']:.2f}MP/s "
+                f"scaling exponent={'-' if exponent is None else f'{exponent:.2f}'}"
+            )
+    harness = harness_report.summary()
+    for generator_id, generator in harness["generators"].items():
+        logging.info(
+            f"Load generator {generator_id}: saturated {generator['saturated_intervals']}/{generator['intervals']} "
+            f"intervals, mean cpu={generator['mean_cpu_percent']:.0f}% "
+            f"max event loop lag={generator['max_event_loop_lag_ms']:.0f}ms"
+        )
+    histogram_file = environment.parsed_options.latency_histogram_file
+    if histogram_file:
+        with open(histogram_file, "w") as output:
+            json.dump(latency_recorder.export(), output)
+        logging.info(f"Wrote latency histograms to {histogram_file}")
+    table_file = environment.parsed_options.dimension_table_file
+    if table_file:
+        dimension_recorder.write_table(table_file)
+        logging.info(f"Wrote latency by dimension to {table_file}")
+    results_file = environment.parsed_options.load_results_file
+    if results_file:
+        with open(results_file, "w") as output:
+            results = summarize_load_test(
+                environment.stats, latency_recorder, payload_recorder, dimension_recorder, crop_recorder
+            )
+            json.dump({**results, "harness": harness, **load_results_extras}, output)
+        logging.info(f"Wrote load test results to {results_file}")
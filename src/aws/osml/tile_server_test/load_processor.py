@@ -1,5 +1,6 @@
 # Copyright 2024 Amazon.com, Inc. or its affiliates.
 import asyncio
+import json
 import os
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
@@ -8,6 +9,7 @@ from typing import Any, Dict, List
 from gevent import monkey
 
 from .load import run_load_test
+from .load.image_discovery import default_manifest_path, discover_option_test_images, test_images_env_options
 from .processor_base import ProcessorBase
 from .utils.logger import logger
 
@@ -28,6 +30,10 @@ class TSLoadTestRequest:
         locust_run_time: The duration to run the load test.
         locust_spawn_rate: The rate at which users are spawned (users per second).
         locust_image_keys: A list of image keys to use for the load test.
+        locust_workers: The number of Locust worker processes to distribute the test across, 0 to run a single
+            process or -1 to start one worker per CPU core.
+        locust_capacity_search: Whether to search for the highest GetTile arrival rate the server sustains within the
+            p99 latency objective, using the open-loop locustfile, instead of running a fixed number of users.
     """
 
     image_uri: str
@@ -37,6 +43,8 @@ class TSLoadTestRequest:
     locust_run_time: str = field(default="5m")
     locust_spawn_rate: str = field(default="1")
     locust_image_keys: List[str] = field(default_factory=list)
+    locust_workers: int = field(default=0)
+    locust_capacity_search: bool = field(default=False)
 
 
 class TSLoadTestProcessor(ProcessorBase):
@@ -52,14 +60,54 @@ class TSLoadTestProcessor(ProcessorBase):
         """
         Process the runtime arguments, determine the test type, and execute the appropriate test.
 
-        :returns: A response indicating the status of the process.
+        :returns: A response indicating the status of the process, with the per-endpoint throughput, failures, and
+            latency percentiles of the test. Failed requests are reported in the results rather than as a failure of
+            the process, which only fails when Locust itself does.
         """
         try:
-            run_load_test(os.environ.get("LOCUST_RUN_TIME", ""))
-            return self.success_message("Load test executed successfully")
+            if self.request.locust_capacity_search:
+                self.set_capacity_search_env()
+            self.set_test_images_env()
+            results = run_load_test(os.environ.get("LOCUST_RUN_TIME", ""), locust_workers=self.request.locust_workers)
+            failures = results.get("total", {}).get("failures", 0)
+            if failures:
+                return self.success_message(f"Load test executed with {failures} failed requests", results)
+            return self.success_message("Load test executed successfully", results)
         except Exception as e:
             return self.failure_message(e)
 
+    @staticmethod
+    def set_capacity_search_env() -> None:
+        """
+        Set up the environment variables for a capacity search, which offers open-loop GetTile traffic against pooled
+        viewpoints. The search objectives and steps are configured with the LOCUST_CAPACITY_* environment variables.
+        """
+        os.environ["LOCUST_LOCUSTFILE"] = os.path.join(os.path.dirname(__file__), "load", "locust_ts_open_loop.py")
+        os.environ["LOCUST_CAPACITY_SEARCH"] = "true"
+        os.environ.setdefault("LOCUST_VIEWPOINT_POOL_SIZE", "1")
+
+    def set_test_images_env(self) -> None:
+        """
+        Set LOCUST_TEST_IMAGE_KEYS to the requested image keys or, when none were requested or configured, discover
+        the images in LOCUST_TEST_IMAGES_BUCKET under LOCUST_TEST_IMAGES_PREFIX and point the Locust workers at the
+        manifest they were written to. Discovering them here once means the workers read the keys from the manifest
+        instead of each listing the bucket, and the keys of thousands of images are not passed through the
+        environment, whose variables are limited in size.
+        """
+        if self.request.locust_image_keys:
+            os.environ["LOCUST_TEST_IMAGE_KEYS"] = json.dumps(self.request.locust_image_keys)
+            return
+        options = test_images_env_options()
+        if not options.test_images_bucket or json.loads(os.environ.get("LOCUST_TEST_IMAGE_KEYS") or "[]"):
+            return
+        options.test_images_manifest = options.test_images_manifest or default_manifest_path(
+            options.test_images_bucket, options.test_images_prefix
+        )
+        images = discover_option_test_images(options)
+        logger.info(f"Discovered {len(images)} test images in s3://{options.test_images_bucket}")
+        os.environ["LOCUST_TEST_IMAGES_MANIFEST"] = options.test_images_manifest
+        os.environ["LOCUST_TEST_IMAGES_FROM_MANIFEST"] = "true"
+
     def set_load_test_env(self) -> None:
         """
         Set up the environment variables for running the Locust load test.
@@ -67,7 +115,7 @@ class TSLoadTestProcessor(ProcessorBase):
         datetime_now_string = datetime.now(timezone.utc).isoformat(timespec="seconds").replace(":", "")
 
         # https://stackoverflow.com/questions/46397580/how-to-invoke-locust-tests-programmatically
-        os.environ["LOCUST_LOCUSTFILE"] = "src/aws/osml/load/locust_ts_user.py"
+        os.environ["LOCUST_LOCUSTFILE"] = os.path.join(os.path.dirname(__file__), "load", "locust_ts_user.py")
         if self.request.locust_headless:
             os.environ["LOCUST_HEADLESS"] = str(self.request.locust_headless)
             os.environ["LOCUST_RUN_TIME"] = self.request.locust_run_time
@@ -76,11 +124,11 @@ class TSLoadTestProcessor(ProcessorBase):
         else:
             os.environ["LOCUST_CSV"] = datetime_now_string
             os.environ["LOCUST_HTML"] = datetime_now_string
-        os.environ["LOCUST_HOST"] = os.environ.get("TS_ENDPOINT")
+        os.environ["LOCUST_HOST"] = os.environ.get("TS_ENDPOINT", "")
 
         # custom Locust params
-        os.environ["LOCUST_TEST_IMAGES_BUCKET"] = os.environ.get("TEST_BUCKET")
-        os.environ["LOCUST_TEST_IMAGE_KEYS"] = "GET LIST OF OBJECTS IN BUCKET"
+        os.environ["LOCUST_TEST_IMAGES_BUCKET"] = os.environ.get("TEST_BUCKET", "")
+        self.set_test_images_env()
         logger.info(f"Setup Locust Test Environment: {os.environ}")
 
 
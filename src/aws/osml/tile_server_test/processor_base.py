@@ -3,7 +3,7 @@
 import json
 import traceback
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from .utils import logger
 
@@ -14,15 +14,19 @@ class ProcessorBase(ABC):
     """
 
     @staticmethod
-    def success_message(message: str) -> Dict[str, Any]:
+    def success_message(message: str, results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Returns a success message in the form of a dictionary, intended for an HTTP response.
 
         :param message: The success message to send when complete.
-        :returns: A dictionary with 'statusCode' set to 200 and a 'body' containing a success message.
+        :param results: Optional structured results to return alongside the message.
+        :returns: A dictionary with 'statusCode' set to 200 and a 'body' containing a success message, and the results
+            when they are given.
         """
         logger.info(message)
-        return {"statusCode": 200, "body": json.dumps(message)}
+        if results is None:
+            return {"statusCode": 200, "body": json.dumps(message)}
+        return {"statusCode": 200, "body": json.dumps({"message": message, "results": results})}
 
     @staticmethod
     def failure_message(err: Exception) -> Dict[str, Any]:
@@ -0,0 +1,4 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+# flake8: noqa
+from .stub_tile_server import LatencyProfile, StubServerConfig, StubTileServer
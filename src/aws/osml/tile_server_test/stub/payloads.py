@@ -0,0 +1,75 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import struct
+import zlib
+
+# Content types the tile server returns for each image format
+IMAGE_CONTENT_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "JPG": "image/jpeg",
+    "GIF": "image/gif",
+    "GTIFF": "image/tiff",
+    "TIFF": "image/tiff",
+    "NITF": "image/nitf",
+}
+
+# Bytes a complete image of each format ends with: the PNG IEND chunk, the JPEG end of image marker, and the GIF trailer
+IMAGE_TRAILERS = {"PNG": b"\x00\x00\x00\x00IEND\xaeB`\x82", "JPEG": b"\xff\xd9", "JPG": b"\xff\xd9", "GIF": b"\x3b"}
+
+# PNG color type for each supported band count
+PNG_BAND_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+
+
+def image_content_type(image_format: str) -> str:
+    """
+    :param image_format: The requested image format, e.g. PNG.
+    :return: The content type the tile server responds with for the format.
+    """
+    return IMAGE_CONTENT_TYPES.get(image_format.upper(), "application/octet-stream")
+
+
+def synthesize_image(image_format: str, width: int, height: int, bands: int = 3, payload_bytes: int = 0) -> bytes:
+    """
+    Build an image payload with a valid header describing the requested dimensions, followed by filler bytes and the
+    trailer the format ends with. Only the header and trailer are meaningful, which is all the load test validates, so
+    the size of the payload can be set independently of its dimensions to model how well a format compresses.
+
+    :param image_format: The image format, one of PNG, JPEG, GIF, GTIFF, TIFF, or NITF.
+    :param width: The width of the image in pixels.
+    :param height: The height of the image in pixels.
+    :param bands: The number of bands in the image.
+    :param payload_bytes: The total size of the payload, or 0 for just the header.
+    :return: The image payload.
+    """
+    image_format = image_format.upper()
+    if image_format == "PNG":
+        ihdr = struct.pack(">IIBBBBB", width, height, 8, PNG_BAND_COLOR_TYPES.get(bands, 2), 0, 0, 0)
+        header = b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", ihdr)
+    elif image_format in ("JPEG", "JPG"):
+        components = b"".join(struct.pack(">BBB", i + 1, 0x11, 0) for i in range(bands))
+        sof = struct.pack(">BHHB", 8, height, width, bands) + components
+        header = b"\xff\xd8" + b"\xff\xc0" + struct.pack(">H", len(sof) + 2) + sof
+    elif image_format == "GIF":
+        header = b"GIF89a" + struct.pack("<HHBBB", width, height, 0, 0, 0)
+    elif image_format in ("GTIFF", "TIFF"):
+        entries = [(256, 4, width), (257, 4, height), (277, 3, bands)]
+        header = b"II*\x00" + struct.pack("<I", 8) + struct.pack("<H", len(entries))
+        for tag, field_type, value in entries:
+            value_bytes = struct.pack("<HH", value, 0) if field_type == 3 else struct.pack("<I", value)
+            header += struct.pack("<HHI", tag, field_type, 1) + value_bytes
+        header += struct.pack("<I", 0)
+    else:
+        # NITF file header, the image subheader is not modelled
+        header = b"NITF02.10" + f"{width:08d}{height:08d}{bands:02d}".encode()
+    trailer = IMAGE_TRAILERS.get(image_format, b"")
+    return header + b"\x00" * max(payload_bytes - len(header) - len(trailer), 0) + trailer
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """
+    :param chunk_type: The four character PNG chunk type.
+    :param data: The chunk data.
+    :return: The chunk with its length and CRC.
+    """
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
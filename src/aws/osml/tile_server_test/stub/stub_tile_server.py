@@ -0,0 +1,642 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import json
+import logging
+import math
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .payloads import image_content_type, synthesize_image
+
+# Viewpoint IDs must be URL safe and contain no whitespace
+VIEWPOINT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.~-]+$")
+
+# Message returned for viewpoint IDs that were never created
+INVALID_KEY_DETAIL = "Invalid Key, it does not exist in ViewpointStatusTable. Please create a new request!"
+
+
+@dataclass
+class LatencyProfile:
+    """
+    The distribution a stub response delay is drawn from.
+
+    Attributes:
+        distribution: One of fixed, uniform, exponential, or lognormal.
+        median_ms: The median delay in milliseconds.
+        spread: For uniform delays the half width of the range in milliseconds, for lognormal delays the standard
+            deviation of the underlying normal distribution, e.g. 0.5 puts the p99 at about 3.2 times the median.
+            Unused by fixed and exponential delays.
+    """
+
+    distribution: str = "fixed"
+    median_ms: float = 0.0
+    spread: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        """
+        :param rng: Random number generator used to draw the delay.
+        :return: A delay in milliseconds.
+        """
+        if self.median_ms <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            return rng.uniform(max(self.median_ms - self.spread, 0.0), self.median_ms + self.spread)
+        if self.distribution == "exponential":
+            return rng.expovariate(math.log(2) / self.median_ms)
+        if self.distribution == "lognormal":
+            return self.median_ms * math.exp(rng.gauss(0.0, self.spread))
+        return self.median_ms
+
+
+@dataclass
+class StubServerConfig:
+    """
+    The behavior of a :class:`StubTileServer`. Latencies and error rates are keyed by the operation names the load test
+    reports requests under, e.g. GetTile or CreateViewpoint, with "default" applying to every other operation.
+    Payload sizes are keyed by image format, e.g. PNG, with "default" applying to every other format.
+
+    Attributes:
+        readiness_delay: Time a new viewpoint stays REQUESTED before it becomes READY or FAILED.
+        readiness_failure_rate: Fraction of new viewpoints that become FAILED instead of READY.
+        latency: The response delay of each operation.
+        error_rates: Fraction of the requests to each operation that fail with `error_status`.
+        error_status: HTTP status of injected failures.
+        payload_bytes: Size of the image payloads of each format, 0 to return only a valid image header.
+        payload_jitter: Payload sizes vary uniformly by up to this fraction.
+        image_width: Width in pixels of the image behind every viewpoint.
+        image_height: Height in pixels of the image behind every viewpoint.
+        image_bands: Number of bands in the image behind every viewpoint.
+        map_max_zoom: Zoom level of the WebMercatorQuad tile matrix that matches the image resolution.
+        assume_viewpoints_exist: Answer requests for viewpoints that were never created as if they were READY with
+            256 pixel tiles, so several stub processes can share a port without sharing their viewpoints.
+        seed: Seed of the random number generator, None for a random seed.
+    """
+
+    readiness_delay: LatencyProfile = field(default_factory=lambda: LatencyProfile(median_ms=3000.0))
+    readiness_failure_rate: float = 0.0
+    latency: Dict[str, LatencyProfile] = field(default_factory=dict)
+    error_rates: Dict[str, float] = field(default_factory=dict)
+    error_status: int = 500
+    payload_bytes: Dict[str, int] = field(default_factory=dict)
+    payload_jitter: float = 0.0
+    image_width: int = 10240
+    image_height: int = 10240
+    image_bands: int = 3
+    map_max_zoom: int = 16
+    assume_viewpoints_exist: bool = False
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "StubServerConfig":
+        """
+        Build a configuration from its JSON representation, where latency profiles are objects with the attributes of
+        :class:`LatencyProfile`.
+
+        :param values: The configuration values, any attribute left out keeps its default.
+        :return: The configuration.
+        """
+        unknown = set(values) - {f.name for f in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown stub server settings {sorted(unknown)}")
+        values = dict(values)
+        if "readiness_delay" in values:
+            values["readiness_delay"] = LatencyProfile(**values["readiness_delay"])
+        if "latency" in values:
+            values["latency"] = {name: LatencyProfile(**profile) for name, profile in values["latency"].items()}
+        return cls(**values)
+
+    @classmethod
+    def from_file(cls, path: str) -> "StubServerConfig":
+        """
+        :param path: Path to a JSON configuration file.
+        :return: The configuration.
+        """
+        with open(path, "r") as config_file:
+            return cls.from_dict(json.load(config_file))
+
+    def latency_for(self, operation: str) -> LatencyProfile:
+        return self.latency.get(operation) or self.latency.get("default") or LatencyProfile()
+
+    def error_rate_for(self, operation: str) -> float:
+        return self.error_rates.get(operation, self.error_rates.get("default", 0.0))
+
+    def payload_bytes_for(self, image_format: str, rng: random.Random) -> int:
+        payload_bytes = self.payload_bytes.get(image_format.upper(), self.payload_bytes.get("default", 0))
+        if payload_bytes and self.payload_jitter:
+            payload_bytes = int(payload_bytes * rng.uniform(1 - self.payload_jitter, 1 + self.payload_jitter))
+        return payload_bytes
+
+
+class StubTileServer:
+    """
+    :class:`StubTileServer` is a local stand-in for the tile server's viewpoint API, built only on the standard
+    library. Viewpoints are kept in memory and become READY after a configurable delay without reading any imagery.
+    Every image endpoint returns a synthesized payload whose header matches the requested format and dimensions.
+    Response delays, payload sizes, and injected failures follow the :class:`StubServerConfig`, so the integration
+    and load tests can be checked, and their own overhead measured, without a deployed tile server or S3.
+    """
+
+    def __init__(
+        self, config: Optional[StubServerConfig] = None, host: str = "127.0.0.1", port: int = 0, reuse_port: bool = False
+    ) -> None:
+        """
+        Bind the server, it does not handle requests until it is started.
+
+        :param config: The stub behavior, defaults to :class:`StubServerConfig`.
+        :param host: The address to listen on.
+        :param port: The port to listen on, 0 to pick a free port.
+        :param reuse_port: Let several stub processes listen on the same port, the kernel balances connections
+            between them. Each process keeps its own viewpoints, so this is only suitable for stateless benchmarks.
+        """
+        self.config = config or StubServerConfig()
+        self.rng = random.Random(self.config.seed)
+        self.viewpoints: Dict[str, Dict[str, Any]] = {}
+        self.request_counts: Counter = Counter()
+        self.lock = threading.Lock()
+        self.httpd = _StubHTTPServer((host, port), _StubRequestHandler, bind_and_activate=False)
+        self.httpd.stub = self
+        if reuse_port:
+            self.httpd.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        try:
+            self.httpd.server_bind()
+            self.httpd.server_activate()
+        except OSError:
+            self.httpd.server_close()
+            raise
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubTileServer":
+        """
+        Handle requests on a background thread.
+
+        :return: The server.
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-tile-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """
+        Handle requests on the calling thread until the server is shut down.
+        """
+        self.httpd.serve_forever()
+
+    def shutdown(self) -> None:
+        """
+        Stop handling requests and release the port.
+        """
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StubTileServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def create_viewpoint(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        invalid = [
+            {"type": "string_type", "loc": ["body", name], "msg": "Input should be a valid string"}
+            for name in ("bucket_name", "object_key", "viewpoint_id", "viewpoint_name")
+            if not isinstance(body.get(name), str)
+        ]
+        if invalid:
+            return 422, {"detail": invalid}
+        if not VIEWPOINT_ID_PATTERN.match(body["viewpoint_id"]):
+            return 422, {"detail": "Invalid viewpoint_id: must not contain whitespace and be URL safe."}
+
+        viewpoint = _new_viewpoint(
+            body["viewpoint_id"],
+            body["viewpoint_name"],
+            body["bucket_name"],
+            body["object_key"],
+            int(body.get("tile_size", 512)),
+            body.get("range_adjustment", "NONE"),
+        )
+        ready_at = time.monotonic() + self.config.readiness_delay.sample(self.rng) / 1000
+        fails = self.rng.random() < self.config.readiness_failure_rate
+        with self.lock:
+            self.viewpoints[viewpoint["viewpoint_id"]] = {"viewpoint": viewpoint, "ready_at": ready_at, "fails": fails}
+        return 201, dict(viewpoint)
+
+    def describe_viewpoint(self, viewpoint_id: str) -> Optional[Dict[str, Any]]:
+        """
+        :param viewpoint_id: The viewpoint to describe.
+        :return: The current state of the viewpoint, or None if it was never created.
+        """
+        with self.lock:
+            record = self.viewpoints.get(viewpoint_id)
+            if record is None and self.config.assume_viewpoints_exist:
+                viewpoint = _new_viewpoint(viewpoint_id, viewpoint_id, "", "", 256, "NONE")
+                record = self.viewpoints[viewpoint_id] = {"viewpoint": viewpoint, "ready_at": 0.0, "fails": False}
+            if record is None:
+                return None
+            viewpoint = record["viewpoint"]
+            if viewpoint["viewpoint_status"] == "REQUESTED" and time.monotonic() >= record["ready_at"]:
+                if record["fails"]:
+                    viewpoint["viewpoint_status"] = "FAILED"
+                    viewpoint["error_message"] = "Injected viewpoint failure"
+                else:
+                    viewpoint["viewpoint_status"] = "READY"
+                    viewpoint["local_object_path"] = f"/tmp/viewpoints/{viewpoint_id}"
+            return dict(viewpoint)
+
+    def list_viewpoints(self, max_results: int = 0, next_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        List the viewpoints in creation order, a page at a time when `max_results` is set.
+
+        :param max_results: Viewpoints per page, 0 to return every viewpoint.
+        :param next_token: The token returned with the previous page.
+        :return: The page of viewpoints, with the token of the next page when there is one.
+        """
+        start = int(next_token) if next_token else 0
+        with self.lock:
+            viewpoint_ids = list(self.viewpoints)
+        end = start + max_results if max_results > 0 else len(viewpoint_ids)
+        page = {"items": [self.describe_viewpoint(viewpoint_id) for viewpoint_id in viewpoint_ids[start:end]]}
+        if end < len(viewpoint_ids):
+            page["next_token"] = str(end)
+        return page
+
+    def update_viewpoint(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        missing = [
+            {"type": "missing", "loc": ["body", name], "msg": "Field required"}
+            for name in ("viewpoint_id", "viewpoint_name")
+            if name not in body
+        ]
+        if missing:
+            return 422, {"detail": missing}
+        viewpoint = self.describe_viewpoint(body["viewpoint_id"])
+        if viewpoint is None:
+            return 500, {"detail": INVALID_KEY_DETAIL}
+        if viewpoint["viewpoint_status"] == "DELETED":
+            return 404, {"detail": _deleted_detail("UPDATE")}
+        with self.lock:
+            stored = self.viewpoints[body["viewpoint_id"]]["viewpoint"]
+            stored["viewpoint_name"] = body["viewpoint_name"]
+            stored["tile_size"] = int(body.get("tile_size", stored["tile_size"]))
+            stored["range_adjustment"] = body.get("range_adjustment", stored["range_adjustment"])
+            return 201, dict(stored)
+
+    def delete_viewpoint(self, viewpoint_id: str) -> Tuple[int, Any]:
+        viewpoint = self.describe_viewpoint(viewpoint_id)
+        if viewpoint is None or viewpoint["viewpoint_status"] == "DELETED":
+            return 404, {"detail": f"viewpoint_id {viewpoint_id} not found."}
+        with self.lock:
+            stored = self.viewpoints[viewpoint_id]["viewpoint"]
+            stored["viewpoint_status"] = "DELETED"
+            stored["local_object_path"] = None
+        return 204, None
+
+    def tile_matrix_set_limits(self) -> List[Dict[str, str]]:
+        """
+        Place the image near the origin of the WebMercatorQuad tile matrix set at the zoom level that matches its
+        resolution and report the tiles it covers at every zoom level.
+
+        :return: The tile limits of every zoom level.
+        """
+        max_zoom = self.config.map_max_zoom
+        origin = 2 ** (max_zoom - 1) if max_zoom else 0
+        cols = max(math.ceil(self.config.image_width / 256), 1)
+        rows = max(math.ceil(self.config.image_height / 256), 1)
+        limits = []
+        for zoom in range(max_zoom + 1):
+            scale = 2 ** (max_zoom - zoom)
+            limits.append(
+                {
+                    "tileMatrix": str(zoom),
+                    "minTileRow": origin // scale,
+                    "maxTileRow": (origin + rows - 1) // scale,
+                    "minTileCol": origin // scale,
+                    "maxTileCol": (origin + cols - 1) // scale,
+                }
+            )
+        return limits
+
+    def image_statistics(self) -> Dict[str, Any]:
+        width, height = self.config.image_width, self.config.image_height
+        return {
+            "image_statistics": {
+                "size": [width, height],
+                "geoTransform": [0.0, 1.0, 0.0, 0.0, 0.0, -1.0],
+                "cornerCoordinates": {
+                    "upperLeft": [0.0, 0.0],
+                    "lowerLeft": [0.0, float(-height)],
+                    "lowerRight": [float(width), float(-height)],
+                    "upperRight": [float(width), 0.0],
+                    "center": [width / 2, -height / 2],
+                },
+                "bands": [
+                    {"band": band + 1, "minimum": 0, "maximum": 255, "mean": 127.5, "stdDev": 50.0}
+                    for band in range(self.config.image_bands)
+                ],
+            }
+        }
+
+    def image_info(self) -> Dict[str, Any]:
+        width, height = self.config.image_width, self.config.image_height
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Polygon",
+                        "coordinates": [[[0, 0], [width, 0], [width, height], [0, height], [0, 0]]],
+                    },
+                    "properties": {"width": width, "height": height, "bands": self.config.image_bands},
+                }
+            ],
+        }
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+    stub: StubTileServer
+
+    def handle_error(self, request: Any, client_address: Tuple[str, int]) -> None:
+        # Load generators close kept alive connections abruptly when they stop
+        logging.debug(f"Stub tile server connection from {client_address} failed", exc_info=True)
+
+
+def _new_viewpoint(
+    viewpoint_id: str, viewpoint_name: str, bucket_name: str, object_key: str, tile_size: int, range_adjustment: str
+) -> Dict[str, Any]:
+    return {
+        "viewpoint_id": viewpoint_id,
+        "viewpoint_name": viewpoint_name,
+        "bucket_name": bucket_name,
+        "object_key": object_key,
+        "tile_size": tile_size,
+        "range_adjustment": range_adjustment,
+        "viewpoint_status": "REQUESTED",
+        "local_object_path": None,
+        "error_message": None,
+        "expire_time": None,
+    }
+
+
+def _deleted_detail(api_name: str) -> str:
+    return f"Cannot view ViewpointApiNames.{api_name} for this image since this has already been deleted."
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes each request to the operation it names, applies the configured delay and failure injection, and writes
+    the response. HTTP/1.1 keeps connections alive between requests, as the tile server's load balancer does.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; with Nagle's algorithm the body of a keep-alive response would wait
+    # for the client's delayed ACK of the headers, adding about 40 ms to every response
+    disable_nagle_algorithm = True
+    server: _StubHTTPServer
+
+    # (method, path pattern, operation name, handler)
+    ROUTES = [
+        ("POST", r"/viewpoints/?", "CreateViewpoint", "_create"),
+        ("GET", r"/viewpoints/?", "ListViewpoints", "_list"),
+        ("PUT", r"/viewpoints/?", "UpdateViewpoint", "_update"),
+        ("GET", r"/viewpoints/(?P<viewpoint_id>[^/]+)", "DescribeViewpoint", "_describe"),
+        ("DELETE", r"/viewpoints/(?P<viewpoint_id>[^/]+)", "DeleteViewpoint", "_delete"),
+        ("GET", r"/viewpoints/(?P<viewpoint_id>[^/]+)/image/metadata", "GetMetadata", "_metadata"),
+        ("GET", r"/viewpoints/(?P<viewpoint_id>[^/]+)/image/bounds", "GetBounds", "_bounds"),
+        ("GET", r"/viewpoints/(?P<viewpoint_id>[^/]+)/image/info", "GetInfo", "_info"),
+        ("GET", r"/viewpoints/(?P<viewpoint_id>[^/]+)/image/statistics", "GetStatistics", "_statistics"),
+        ("GET", r"/viewpoints/(?P<viewpoint_id>[^/]+)/image/preview\.(?P<fmt>\w+)", "GetPreview", "_preview"),
+        (
+            "GET",
+            r"/viewpoints/(?P<viewpoint_id>[^/]+)/image/tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.(?P<fmt>\w+)",
+            "GetTile",
+            "_tile",
+        ),
+        (
+            "GET",
+            r"/viewpoints/(?P<viewpoint_id>[^/]+)/image/crop/"
+            r"(?P<minx>-?\d+),(?P<miny>-?\d+),(?P<maxx>-?\d+),(?P<maxy>-?\d+)(?:\.(?P<fmt>\w+))?",
+            "GetCrop",
+            "_crop",
+        ),
+        ("GET", r"/viewpoints/(?P<viewpoint_id>[^/]+)/map/tiles/?", "GetMapTilesets", "_map_tilesets"),
+        ("GET", r"/viewpoints/(?P<viewpoint_id>[^/]+)/map/tiles/(?P<tms>[^/]+)", "GetMapTilesetMetadata", "_map_tileset"),
+        (
+            "GET",
+            r"/viewpoints/(?P<viewpoint_id>[^/]+)/map/tiles/(?P<tms>[^/]+)/(?P<z>\d+)/(?P<row>\d+)/(?P<col>\d+)"
+            r"\.(?P<fmt>\w+)",
+            "GetMapTile",
+            "_map_tile",
+        ),
+    ]
+    COMPILED_ROUTES = [(method, re.compile(f"^{path}$"), operation, handler) for method, path, operation, handler in ROUTES]
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_PUT(self) -> None:
+        self._dispatch("PUT")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def log_message(self, format: str, *args) -> None:
+        logging.debug(f"Stub tile server: {format % args}")
+
+    def _dispatch(self, method: str) -> None:
+        stub = self.server.stub
+        url = urlsplit(self.path)
+        self.query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        body = self._read_body()
+        for route_method, pattern, operation, handler in self.COMPILED_ROUTES:
+            match = pattern.match(url.path)
+            if route_method == method and match:
+                break
+        else:
+            self._send_json(404, {"detail": "Not Found"})
+            return
+
+        with stub.lock:
+            stub.request_counts[operation] += 1
+        delay_ms = stub.config.latency_for(operation).sample(stub.rng)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+        if stub.rng.random() < stub.config.error_rate_for(operation):
+            self._send_json(stub.config.error_status, {"detail": f"Injected {operation} failure"})
+            return
+        if body is _INVALID_JSON:
+            self._send_json(422, {"detail": [{"type": "json_invalid", "msg": "JSON decode error"}]})
+            return
+        getattr(self, handler)(stub, body=body, **match.groupdict())
+
+    def _read_body(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return _INVALID_JSON
+
+    def _send(self, status: int, content: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        self._send(status, b"" if payload is None else json.dumps(payload).encode(), "application/json")
+
+    def _send_image(self, stub: StubTileServer, image_format: str, width: int, height: int) -> None:
+        payload_bytes = stub.config.payload_bytes_for(image_format, stub.rng)
+        content = synthesize_image(image_format, width, height, stub.config.image_bands, payload_bytes)
+        self._send(200, content, image_content_type(image_format))
+
+    def _readable_viewpoint(self, stub: StubTileServer, viewpoint_id: str, api_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a viewpoint whose image is being read, responding with the tile server's error if it cannot be.
+
+        :return: The viewpoint, or None if an error response was sent.
+        """
+        viewpoint = stub.describe_viewpoint(viewpoint_id)
+        if viewpoint is None:
+            self._send_json(500, {"detail": INVALID_KEY_DETAIL})
+        elif viewpoint["viewpoint_status"] == "DELETED":
+            self._send_json(404, {"detail": _deleted_detail(api_name)})
+        elif viewpoint["viewpoint_status"] != "READY":
+            self._send_json(
+                404, {"detail": f"Viewpoint {viewpoint_id} is not READY, its status is {viewpoint['viewpoint_status']}."}
+            )
+        else:
+            return viewpoint
+        return None
+
+    def _create(self, stub: StubTileServer, body: Any) -> None:
+        self._send_json(*stub.create_viewpoint(body if isinstance(body, dict) else {}))
+
+    def _list(self, stub: StubTileServer, body: Any) -> None:
+        try:
+            page = stub.list_viewpoints(int(self.query.get("max_results") or 0), self.query.get("next_token"))
+        except ValueError:
+            self._send_json(400, {"detail": "Invalid pagination parameters"})
+            return
+        self._send_json(200, page)
+
+    def _update(self, stub: StubTileServer, body: Any) -> None:
+        self._send_json(*stub.update_viewpoint(body if isinstance(body, dict) else {}))
+
+    def _describe(self, stub: StubTileServer, body: Any, viewpoint_id: str) -> None:
+        viewpoint = stub.describe_viewpoint(viewpoint_id)
+        if viewpoint is None:
+            self._send_json(500, {"detail": INVALID_KEY_DETAIL})
+        else:
+            self._send_json(200, viewpoint)
+
+    def _delete(self, stub: StubTileServer, body: Any, viewpoint_id: str) -> None:
+        self._send_json(*stub.delete_viewpoint(viewpoint_id))
+
+    def _metadata(self, stub: StubTileServer, body: Any, viewpoint_id: str) -> None:
+        if self._readable_viewpoint(stub, viewpoint_id, "METADATA") is not None:
+            self._send_json(
+                200, {"metadata": {"IMAGE_WIDTH": stub.config.image_width, "IMAGE_HEIGHT": stub.config.image_height}}
+            )
+
+    def _bounds(self, stub: StubTileServer, body: Any, viewpoint_id: str) -> None:
+        if self._readable_viewpoint(stub, viewpoint_id, "BOUNDS") is not None:
+            self._send_json(200, {"bounds": [0, 0, stub.config.image_width, stub.config.image_height]})
+
+    def _info(self, stub: StubTileServer, body: Any, viewpoint_id: str) -> None:
+        if self._readable_viewpoint(stub, viewpoint_id, "INFO") is not None:
+            self._send_json(200, stub.image_info())
+
+    def _statistics(self, stub: StubTileServer, body: Any, viewpoint_id: str) -> None:
+        if self._readable_viewpoint(stub, viewpoint_id, "STATISTICS") is not None:
+            self._send_json(200, stub.image_statistics())
+
+    def _preview(self, stub: StubTileServer, body: Any, viewpoint_id: str, fmt: str) -> None:
+        if self._readable_viewpoint(stub, viewpoint_id, "PREVIEW") is None:
+            return
+        scale = 1024 / max(stub.config.image_width, stub.config.image_height)
+        width = int(self.query.get("width") or max(round(stub.config.image_width * scale), 1))
+        height = int(self.query.get("height") or max(round(stub.config.image_height * scale), 1))
+        self._send_image(stub, fmt, width, height)
+
+    def _tile(self, stub: StubTileServer, body: Any, viewpoint_id: str, z: str, x: str, y: str, fmt: str) -> None:
+        viewpoint = stub.describe_viewpoint(viewpoint_id)
+        if viewpoint is not None and viewpoint["viewpoint_status"] == "DELETED":
+            self._send_json(500, {"detail": "Failed to fetch tile for image."})
+            return
+        viewpoint = self._readable_viewpoint(stub, viewpoint_id, "TILE")
+        if viewpoint is not None:
+            self._send_image(stub, fmt, viewpoint["tile_size"], viewpoint["tile_size"])
+
+    def _crop(
+        self,
+        stub: StubTileServer,
+        body: Any,
+        viewpoint_id: str,
+        minx: str,
+        miny: str,
+        maxx: str,
+        maxy: str,
+        fmt: Optional[str],
+    ) -> None:
+        # The tile server reports crops of deleted viewpoints as PREVIEW requests
+        if self._readable_viewpoint(stub, viewpoint_id, "PREVIEW") is None:
+            return
+        width, height = int(maxx) - int(minx), int(maxy) - int(miny)
+        if width <= 0 or height <= 0:
+            self._send_json(400, {"detail": f"Invalid crop window {minx},{miny},{maxx},{maxy}"})
+            return
+        self._send_image(stub, fmt or "NITF", int(self.query.get("width") or width), int(self.query.get("height") or height))
+
+    def _map_tilesets(self, stub: StubTileServer, body: Any, viewpoint_id: str) -> None:
+        if self._readable_viewpoint(stub, viewpoint_id, "MAP_TILESETS") is not None:
+            self._send_json(
+                200,
+                {
+                    "tilesets": [
+                        {"title": "WebMercatorQuad", "dataType": "map", "crs": "http://www.opengis.net/def/crs/EPSG/0/3857"}
+                    ]
+                },
+            )
+
+    def _map_tileset(self, stub: StubTileServer, body: Any, viewpoint_id: str, tms: str) -> None:
+        if self._readable_viewpoint(stub, viewpoint_id, "MAP_TILESET_METADATA") is None:
+            return
+        if tms != "WebMercatorQuad":
+            self._send_json(404, {"detail": f"Tile matrix set {tms} is not supported."})
+            return
+        self._send_json(
+            200, {"tileMatrixSetId": tms, "dataType": "map", "tileMatrixSetLimits": stub.tile_matrix_set_limits()}
+        )
+
+    def _map_tile(
+        self, stub: StubTileServer, body: Any, viewpoint_id: str, tms: str, z: str, row: str, col: str, fmt: str
+    ) -> None:
+        viewpoint = self._readable_viewpoint(stub, viewpoint_id, "MAP_TILE")
+        if viewpoint is not None:
+            self._send_image(stub, fmt, viewpoint["tile_size"], viewpoint["tile_size"])
+
+
+# Marker for request bodies that are not valid JSON
+_INVALID_JSON = object()
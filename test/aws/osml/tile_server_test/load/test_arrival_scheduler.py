@@ -0,0 +1,70 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import random
+import time
+import unittest
+
+import gevent
+
+from aws.osml.tile_server_test.load.arrival_scheduler import ArrivalScheduler, ramped_rate, schedule_lag_ms
+
+
+class TestRampedRate(unittest.TestCase):
+    def test_ramps_then_holds(self):
+        rate = ramped_rate(100.0, ramp_time=10.0)
+
+        self.assertEqual([rate(0), rate(2.5), rate(10), rate(60)], [0.0, 25.0, 100.0, 100.0])
+        self.assertEqual(ramped_rate(100.0)(0), 100.0)
+
+
+class TestScheduleLag(unittest.TestCase):
+    def test_lag_is_never_negative(self):
+        self.assertEqual(schedule_lag_ms(time.perf_counter() + 10), 0.0)
+        self.assertGreaterEqual(schedule_lag_ms(time.perf_counter() - 0.5), 500.0)
+
+
+class TestArrivalScheduler(unittest.TestCase):
+    def test_constant_rate_arrivals_are_evenly_spaced(self):
+        intended_times = []
+
+        ArrivalScheduler(ramped_rate(50.0)).run(intended_times.append, duration=0.2)
+
+        self.assertIn(len(intended_times), (9, 10))
+        for earlier, later in zip(intended_times, intended_times[1:]):
+            self.assertAlmostEqual(later - earlier, 0.02, places=6)
+
+    def test_follows_a_ramp(self):
+        intended_times = []
+
+        # Ramping from 0 to 200 requests per second over 0.5 seconds expects 50 arrivals
+        ArrivalScheduler(ramped_rate(200.0, ramp_time=0.5), max_step=0.01).run(intended_times.append, duration=0.5)
+
+        self.assertIn(len(intended_times), (49, 50))
+        gaps = [later - earlier for earlier, later in zip(intended_times, intended_times[1:])]
+        self.assertGreater(gaps[0], gaps[-1])
+
+    def test_slow_requests_do_not_delay_the_schedule(self):
+        intended_times = []
+
+        def issue(intended_time):
+            intended_times.append(intended_time)
+            gevent.sleep(0.05)
+
+        start = time.perf_counter()
+        ArrivalScheduler(ramped_rate(100.0), max_outstanding=2).run(issue, duration=0.1)
+
+        # Only two requests are in flight at once, so arrivals queue behind them but keep their intended times
+        self.assertIn(len(intended_times), (9, 10))
+        self.assertAlmostEqual(intended_times[-1] - intended_times[0], 0.01 * (len(intended_times) - 1), places=6)
+        self.assertGreater(time.perf_counter() - start, 0.2)
+
+    def test_poisson_arrivals_average_the_rate(self):
+        intended_times = []
+
+        ArrivalScheduler(ramped_rate(1000.0), poisson=True, rng=random.Random(3)).run(intended_times.append, duration=0.5)
+
+        self.assertAlmostEqual(len(intended_times), 500, delta=75)
+
+
+if __name__ == "__main__":
+    unittest.main()
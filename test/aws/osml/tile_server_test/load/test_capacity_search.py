@@ -0,0 +1,90 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import unittest
+
+from locust.stats import RequestStats
+
+from aws.osml.tile_server_test.load.capacity_search import CapacitySearch, StatsWindow
+
+
+def run_search(search, capacity):
+    """
+    Drive a search against a simulated server that serves up to `capacity` requests per second within the objective.
+
+    :param search: The capacity search.
+    :param capacity: The highest rate the simulated server sustains.
+    :return: The rates offered, in order.
+    """
+    offered = []
+    rate = search.current_rate
+    while rate is not None:
+        offered.append(rate)
+        if rate <= capacity:
+            rate = search.record_step(rate, 50.0, 200.0, 0.0)
+        else:
+            rate = search.record_step(capacity, 400.0, 5000.0, 0.0)
+    return offered
+
+
+class TestCapacitySearch(unittest.TestCase):
+    def test_grows_geometrically_then_bisects(self):
+        search = CapacitySearch(start_rate=10.0, p99_slo_ms=1000.0, resolution=0.05)
+
+        offered = run_search(search, capacity=300.0)
+
+        self.assertEqual(offered[:6], [10.0, 20.0, 40.0, 80.0, 160.0, 320.0])
+        self.assertEqual(offered[6], 240.0)
+        self.assertLessEqual(search.sustainable_rate, 300.0)
+        self.assertLessEqual(search.unsustainable_rate - search.sustainable_rate, 0.05 * search.sustainable_rate)
+        self.assertEqual(search.summary()["max_sustainable_rate"], search.sustainable_rate)
+
+    def test_errors_and_falling_behind_are_unsustainable(self):
+        search = CapacitySearch(start_rate=100.0, max_error_rate=0.01, min_achieved_fraction=0.9)
+
+        search.record_step(100.0, 50.0, 200.0, 0.02)
+        self.assertEqual(search.unsustainable_rate, 100.0)
+        self.assertEqual(search.current_rate, 50.0)
+        search.record_step(44.0, 50.0, 200.0, 0.0)
+        self.assertEqual(search.unsustainable_rate, 50.0)
+        self.assertFalse(any(step.sustainable for step in search.steps))
+
+    def test_stops_at_max_rate(self):
+        search = CapacitySearch(start_rate=10.0, max_rate=30.0)
+
+        offered = run_search(search, capacity=1000.0)
+
+        self.assertEqual(offered, [10.0, 20.0, 30.0])
+        self.assertEqual(search.sustainable_rate, 30.0)
+        self.assertIsNone(search.unsustainable_rate)
+
+    def test_stops_after_max_steps(self):
+        search = CapacitySearch(start_rate=1.0, step_factor=1.01, max_steps=5)
+
+        self.assertEqual(len(run_search(search, capacity=1000.0)), 5)
+
+    def test_rejects_invalid_growth(self):
+        with self.assertRaises(ValueError):
+            CapacitySearch(step_factor=1.0)
+
+
+class TestStatsWindow(unittest.TestCase):
+    def test_measures_only_requests_inside_the_window(self):
+        entry = RequestStats().get("tiles", "GET")
+        for _ in range(10):
+            entry.log(1000, 0)
+        window = StatsWindow(entry, start_time=100.0)
+        for response_time in [20] * 98 + [300] * 2:
+            entry.log(response_time, 0)
+        for _ in range(25):
+            entry.log_error(None)
+
+        measured = window.measure(end_time=110.0)
+
+        self.assertEqual(measured["achieved_rate"], 10.0)
+        self.assertEqual(measured["p50"], 20)
+        self.assertEqual(measured["p99"], 300)
+        self.assertEqual(measured["error_rate"], 0.25)
+
+
+if __name__ == "__main__":
+    unittest.main()
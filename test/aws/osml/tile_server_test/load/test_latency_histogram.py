@@ -0,0 +1,80 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import unittest
+
+from aws.osml.tile_server_test.load.latency_histogram import HdrHistogram, LatencyRecorder
+
+
+class TestHdrHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        histogram = HdrHistogram()
+        for latency in range(1, 1001):
+            histogram.record(latency)
+
+        self.assertEqual(histogram.total_count, 1000)
+        self.assertAlmostEqual(histogram.mean, 500.5)
+        # Values are kept to 1 part in 1024 of their true value
+        self.assertAlmostEqual(histogram.value_at_percentile(50), 500, delta=500 / 1024)
+        self.assertAlmostEqual(histogram.value_at_percentile(99), 990, delta=990 / 1024)
+        self.assertEqual(histogram.value_at_percentile(100), 1000)
+        self.assertEqual(HdrHistogram().value_at_percentile(99), 0.0)
+
+    def test_tail_is_not_rounded_away(self):
+        histogram = HdrHistogram()
+        histogram.record(5, count=9990)
+        histogram.record(2000, count=10)
+
+        self.assertAlmostEqual(histogram.value_at_percentile(99.8), 5, delta=5 / 1024)
+        self.assertAlmostEqual(histogram.value_at_percentile(99.95), 2000, delta=2000 / 1024)
+
+    def test_encode_round_trip(self):
+        histogram = HdrHistogram()
+        for latency in (0.5, 3, 3, 75, 12000):
+            histogram.record(latency)
+
+        decoded = HdrHistogram.decode(histogram.encode())
+
+        self.assertEqual(decoded.counts, histogram.counts)
+        self.assertEqual(decoded.summary(), histogram.summary())
+
+    def test_merge_matches_recording_into_one_histogram(self):
+        first, second, combined = HdrHistogram(), HdrHistogram(), HdrHistogram()
+        for latency in (1, 2, 3):
+            first.record(latency)
+            combined.record(latency)
+        for latency in (250, 4000):
+            second.record(latency)
+            combined.record(latency)
+
+        first.merge(second)
+
+        self.assertEqual(first.counts, combined.counts)
+        self.assertEqual(first.summary(), combined.summary())
+
+    def test_merge_rejects_different_precision(self):
+        with self.assertRaises(ValueError):
+            HdrHistogram().merge(HdrHistogram(sub_bucket_bits=8))
+
+
+class TestLatencyRecorder(unittest.TestCase):
+    def test_export_merge_and_summary(self):
+        worker = LatencyRecorder()
+        worker.on_request("GET", "tiles", 10)
+        worker.on_request("GET", "tiles", 0, exception=Exception("failed"))
+        worker.on_request("GET", "metadata", 0, exception=Exception("failed"))
+        master = LatencyRecorder()
+
+        master.merge_export(worker.export(reset=True))
+        master.merge_export(worker.export())
+
+        self.assertEqual(worker.histograms, {})
+        summary = master.summary()
+        self.assertEqual(summary["GET tiles"]["count"], 1)
+        self.assertEqual(summary["GET tiles"]["failures"], 1)
+        # Endpoints whose requests all failed are still summarized
+        self.assertEqual(summary["GET metadata"]["count"], 0)
+        self.assertEqual(summary["GET metadata"]["failures"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
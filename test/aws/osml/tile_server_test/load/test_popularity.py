@@ -0,0 +1,50 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import random
+import unittest
+from collections import Counter
+
+from aws.osml.tile_server_test.load.popularity import ZipfSampler, zipf_sampler
+
+
+class TestZipfSampler(unittest.TestCase):
+    def test_probabilities_follow_zipf(self):
+        sampler = ZipfSampler(4, 1.0)
+
+        harmonic = 1 + 1 / 2 + 1 / 3 + 1 / 4
+        for actual, expected in zip(sampler.probabilities(), [1 / rank / harmonic for rank in range(1, 5)]):
+            self.assertAlmostEqual(actual, expected)
+
+    def test_zero_skew_is_uniform(self):
+        for probability in ZipfSampler(5, 0.0).probabilities():
+            self.assertAlmostEqual(probability, 0.2)
+
+    def test_samples_match_probabilities(self):
+        sampler = ZipfSampler(10, 1.2)
+        rng = random.Random(7)
+
+        counts = Counter(sampler.sample(rng) for _ in range(100000))
+
+        self.assertEqual(set(counts), set(range(10)))
+        for rank, probability in enumerate(sampler.probabilities()):
+            self.assertAlmostEqual(counts[rank] / 100000, probability, delta=0.01)
+
+    def test_choice_uses_sequence_order_as_ranking(self):
+        sampler = ZipfSampler(3, 3.0)
+        rng = random.Random(1)
+
+        counts = Counter(sampler.choice(["hot", "warm", "cold"], rng) for _ in range(1000))
+
+        self.assertEqual(counts.most_common(1)[0][0], "hot")
+        self.assertGreater(counts["warm"], counts["cold"])
+
+    def test_rejects_empty_model(self):
+        with self.assertRaises(ValueError):
+            ZipfSampler(0, 1.0)
+
+    def test_samplers_are_shared(self):
+        self.assertIs(zipf_sampler(8, 0.9), zipf_sampler(8, 0.9))
+
+
+if __name__ == "__main__":
+    unittest.main()
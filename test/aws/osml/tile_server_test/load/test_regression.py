@@ -0,0 +1,138 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import unittest
+from math import erfc, sqrt
+
+from aws.osml.tile_server_test.load.latency_histogram import HdrHistogram, LatencyRecorder
+from aws.osml.tile_server_test.load.regression import (
+    RegressionTolerances,
+    _pool_runs,
+    compare_result_sets,
+    mann_whitney_u,
+)
+
+
+def build_histogram(latencies_ms):
+    histogram = HdrHistogram()
+    for latency in latencies_ms:
+        histogram.record(latency)
+    return histogram
+
+
+def build_run(latencies_ms, failures=None, requests_per_second=None):
+    """
+    Build the results of a load test run the way the load test writes them.
+
+    :param latencies_ms: The successful request latencies of each endpoint, keyed by request name.
+    :param failures: The failed request count of each endpoint, keyed by request name.
+    :param requests_per_second: The throughput of each endpoint, keyed by request name, defaults to 10.
+    :return: The run results.
+    """
+    failures = failures or {}
+    requests_per_second = requests_per_second or {}
+    recorder = LatencyRecorder()
+    for name, latencies in latencies_ms.items():
+        for latency in latencies:
+            recorder.on_request("GET", name, latency)
+    for name, count in failures.items():
+        for _ in range(count):
+            recorder.on_request("GET", name, 0, exception=Exception("failed"))
+    endpoints = [
+        {
+            "method": "GET",
+            "name": name,
+            "requests": len(latencies_ms.get(name, [])) + failures.get(name, 0),
+            "failures": failures.get(name, 0),
+            "requests_per_second": requests_per_second.get(name, 10.0),
+        }
+        for name in set(latencies_ms) | set(failures)
+    ]
+    return {"latency_histograms": recorder.export(), "endpoints": endpoints}
+
+
+class TestMannWhitneyU(unittest.TestCase):
+    def test_hand_computed_example_with_ties(self):
+        # Each candidate value counts the baseline values below it plus half of those it ties with:
+        # 2 -> 1 + 2 * 0.5, 3 -> 3 + 0.5 twice and 4 -> 4, so U = 13 of the 16 pairs
+        effect_size, p_value = mann_whitney_u(build_histogram([1, 2, 2, 3]), build_histogram([2, 3, 3, 4]))
+
+        self.assertAlmostEqual(effect_size, 2 * 13 / 16 - 1)
+        # Tie groups of sizes 1, 3, 3, 1 give sum(t^3 - t) = 48, so the variance is 16 / 12 * (9 - 48 / 56) = 76 / 7
+        self.assertAlmostEqual(p_value, erfc((13 - 8) / sqrt(76 / 7) / sqrt(2)))
+        self.assertAlmostEqual(p_value, 0.12916, places=4)
+
+    def test_is_antisymmetric(self):
+        baseline = build_histogram([1, 2, 2, 3])
+        candidate = build_histogram([2, 3, 3, 4])
+
+        effect_size, p_value = mann_whitney_u(baseline, candidate)
+        reverse_effect_size, reverse_p_value = mann_whitney_u(candidate, baseline)
+
+        self.assertAlmostEqual(reverse_effect_size, -effect_size)
+        self.assertAlmostEqual(reverse_p_value, p_value)
+
+    def test_empty_histogram_is_not_significant(self):
+        self.assertEqual(mann_whitney_u(HdrHistogram(), build_histogram([1, 2])), (0.0, 1.0))
+
+
+class TestCompareResultSets(unittest.TestCase):
+    def test_missing_candidate_endpoint_is_flagged(self):
+        baseline = build_run({"tiles": [10] * 5, "metadata": [5] * 5})
+        candidate = build_run({"tiles": [10] * 5})
+
+        comparisons = {c.endpoint: c for c in compare_result_sets([baseline], [candidate])}
+
+        self.assertEqual(comparisons["GET metadata"].regressions, ["requested by the baseline but not by the candidate"])
+        self.assertFalse(comparisons["GET tiles"].regressed)
+
+    def test_all_failures_endpoint_is_flagged(self):
+        baseline = build_run({"tiles": [10] * 200})
+        candidate = build_run({}, failures={"tiles": 200})
+
+        (comparison,) = compare_result_sets([baseline], [candidate])
+
+        self.assertEqual(comparison.candidate_requests, 0)
+        self.assertEqual(comparison.candidate_failure_ratio, 1.0)
+        self.assertTrue(comparison.regressed)
+        self.assertTrue(comparison.regressions[0].startswith("failure ratio increased by 100.00%"))
+
+    def test_min_requests_cutoff(self):
+        baseline = build_run({"tiles": [10] * 50})
+        candidate = build_run({"tiles": [20] * 50})
+
+        (uncompared,) = compare_result_sets([baseline], [candidate], RegressionTolerances(min_requests=51))
+        (compared,) = compare_result_sets([baseline], [candidate], RegressionTolerances(min_requests=50))
+
+        self.assertFalse(uncompared.regressed)
+        self.assertEqual(uncompared.candidate_p99, 0.0)
+        self.assertEqual(compared.candidate_p99, 20.0)
+        self.assertAlmostEqual(compared.effect_size, 1.0)
+        self.assertEqual(len(compared.regressions), 2)
+
+    def test_throughput_decrease_is_flagged(self):
+        baseline = build_run({"tiles": [10] * 5}, requests_per_second={"tiles": 100.0})
+        candidate = build_run({"tiles": [10] * 5}, requests_per_second={"tiles": 50.0})
+
+        (comparison,) = compare_result_sets([baseline], [candidate])
+
+        self.assertAlmostEqual(comparison.throughput_change, -0.5)
+        self.assertEqual(comparison.regressions, ["throughput decreased by 50.0% > 10.0%"])
+
+
+class TestPoolRuns(unittest.TestCase):
+    def test_pools_runs(self):
+        first = build_run({"tiles": [10, 20]}, failures={"tiles": 2}, requests_per_second={"tiles": 30.0})
+        second = build_run({"tiles": [30]}, failures={"metadata": 4}, requests_per_second={"tiles": 10.0})
+
+        pooled = _pool_runs([first, second])
+
+        histogram, stats = pooled["GET tiles"]
+        self.assertEqual(histogram.total_count, 3)
+        self.assertEqual(stats, {"requests": 5, "requests_per_second": 20.0, "failure_ratio": 0.4})
+        histogram, stats = pooled["GET metadata"]
+        self.assertEqual(histogram.total_count, 0)
+        self.assertEqual(stats["failure_ratio"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
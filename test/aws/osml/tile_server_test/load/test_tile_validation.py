@@ -0,0 +1,83 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import unittest
+
+from aws.osml.tile_server_test.load.tile_validation import TileImageHeader, TileValidator, read_tile_header
+from aws.osml.tile_server_test.stub.payloads import synthesize_image
+
+
+class FakeResponse:
+    """
+    The parts of a Locust response context opened with catch_response=True that the validator uses.
+    """
+
+    def __init__(self, content: bytes, status_code: int = 200) -> None:
+        self.content = content
+        self.status_code = status_code
+        self.failures = []
+
+    def failure(self, message: str) -> None:
+        self.failures.append(message)
+
+
+class TestReadTileHeader(unittest.TestCase):
+    def test_reads_every_format(self):
+        for image_format, expected_format in [("PNG", "PNG"), ("JPEG", "JPEG"), ("GIF", "GIF"), ("GTIFF", "TIFF")]:
+            with self.subTest(image_format=image_format):
+                header = read_tile_header(synthesize_image(image_format, 512, 256, bands=3, payload_bytes=2048))
+                self.assertEqual(header, TileImageHeader(expected_format, 512, 256, 3))
+
+    def test_truncated_or_unknown_header(self):
+        self.assertIsNone(read_tile_header(synthesize_image("PNG", 256, 256)[:20]))
+        self.assertIsNone(read_tile_header(synthesize_image("GTIFF", 256, 256)[:16]))
+        self.assertIsNone(read_tile_header(synthesize_image("NITF", 256, 256)))
+
+
+class TestTileValidator(unittest.TestCase):
+    def test_valid_tiles(self):
+        validator = TileValidator(expected_bands=3)
+
+        for image_format in ("PNG", "JPEG", "JPG", "GIF", "GTIFF"):
+            with self.subTest(image_format=image_format):
+                tile = synthesize_image(image_format, 256, 256, bands=3, payload_bytes=4096)
+                self.assertIsNone(validator.validate(tile, image_format, 256))
+
+    def test_truncated_after_header(self):
+        validator = TileValidator()
+
+        for image_format in ("PNG", "JPEG", "GIF"):
+            with self.subTest(image_format=image_format):
+                tile = synthesize_image(image_format, 256, 256, payload_bytes=4096)[:2048]
+                self.assertIn("is truncated", validator.validate(tile, image_format, 256))
+
+    def test_wrong_format_size_or_bands(self):
+        validator = TileValidator(expected_bands=1)
+
+        self.assertEqual(
+            validator.validate(synthesize_image("JPEG", 256, 256, bands=1), "PNG", 256),
+            "Expected a PNG tile but received JPEG",
+        )
+        self.assertEqual(
+            validator.validate(synthesize_image("PNG", 512, 512, bands=1), "PNG", 256),
+            "Expected a 256x256 tile but received 512x512",
+        )
+        self.assertEqual(
+            validator.validate(synthesize_image("PNG", 256, 256, bands=3), "PNG", 256),
+            "Expected a tile with 1 bands but received 3",
+        )
+
+    def test_check_samples_responses(self):
+        truncated = synthesize_image("PNG", 256, 256, payload_bytes=4096)[:100]
+
+        skipped, sampled, empty = FakeResponse(truncated), FakeResponse(truncated), FakeResponse(b"")
+        TileValidator(sample_rate=0.0).check(skipped, "PNG", 256)
+        TileValidator(sample_rate=1.0).check(sampled, "PNG", 256)
+        TileValidator(sample_rate=0.0).check(empty, "PNG", 256)
+
+        self.assertEqual(skipped.failures, [])
+        self.assertEqual(len(sampled.failures), 1)
+        self.assertEqual(empty.failures, ["Tile response contained no content"])
+
+
+if __name__ == "__main__":
+    unittest.main()
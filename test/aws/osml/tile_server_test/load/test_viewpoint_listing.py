@@ -0,0 +1,57 @@
+#  Copyright 2024 Amazon.com, Inc. or its affiliates.
+
+import json
+import unittest
+
+from aws.osml.tile_server_test.load.viewpoint_listing import ViewpointListParser
+
+VIEWPOINTS = [
+    {"viewpoint_id": "a", "viewpoint_status": "READY", "bucket_name": "b", "object_key": "x ] } , y.tif"},
+    {"viewpoint_id": "b", "viewpoint_status": "REQUESTED", "range_adjustment": "NONE", "local": {"nested": [1, 2]}},
+    {"viewpoint_id": "c", "viewpoint_status": "FAILED"},
+]
+
+
+def parse_in_chunks(body, chunk_size):
+    """
+    Feed a response body to a parser in fixed size chunks.
+
+    :param body: The response body.
+    :param chunk_size: Number of characters in each chunk.
+    :return: The parsed viewpoints and the next page token.
+    """
+    parser = ViewpointListParser()
+    viewpoints = []
+    for start in range(0, len(body), chunk_size):
+        end = start + chunk_size
+        viewpoints.extend(parser.feed(body[start:end]))
+    return viewpoints, parser.close()
+
+
+class TestViewpointListParser(unittest.TestCase):
+    def test_viewpoints_split_across_chunks(self):
+        body = json.dumps({"items": VIEWPOINTS, "next_token": 'token "3"'}, indent=2)
+        expected = [("a", "READY"), ("b", "REQUESTED"), ("c", "FAILED")]
+
+        for chunk_size in range(1, len(body) + 1):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(parse_in_chunks(body, chunk_size), (expected, 'token "3"'))
+
+    def test_next_token_before_items(self):
+        body = json.dumps({"next_token": "abc", "items": VIEWPOINTS[:1]})
+
+        self.assertEqual(parse_in_chunks(body, 7), ([("a", "READY")], "abc"))
+
+    def test_last_page(self):
+        self.assertEqual(parse_in_chunks('{"items": [], "next_token": null}', 5), ([], None))
+        self.assertEqual(parse_in_chunks('{"items": []}', 5), ([], None))
+
+    def test_truncated_response(self):
+        body = json.dumps({"items": VIEWPOINTS})
+
+        with self.assertRaises(ValueError):
+            parse_in_chunks(body[: len(body) // 2], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()